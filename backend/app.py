@@ -1,12 +1,23 @@
-from datetime import datetime
 import os
-from flask import Flask, jsonify, request
+import json
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-from utils.model_loader import ModelLoader
-from utils.predictor import predict_with_models
-from utils.helper import preprocessing
-from utils.shap import generate_waterfall_plot
-from utils.model_downloader import download_models_from_gdrive, check_models_available
+from utils.model_loader import ModelLoader, DEFAULT_MODEL_PATHS, MODEL_LOADING_STRATEGY
+from utils.predictor import predict_with_models, predict_batch_with_models, reset_inference_executor
+from utils.ensemble import ensemble_predict
+from utils.helper import preprocessing, preprocessing_batch
+from utils.shap import generate_waterfall_plot, explain_sample, explanation_to_dict
+from utils.reason_codes import iter_reason_codes
+from utils.render_pool import start_render_pool, reset_render_pool, render
+from utils.static_plots import SHAP_PLOT_NAMES
+from utils.cache import ResultCache, make_key
+from utils.warmup import WarmupState, start_warmup, smoke_test
+from utils.model_watcher import ModelWatcher
+from utils.dataset_profile import ProfileCache
+from utils.dataset_index import IndexCache
+from utils.columnar import dataset_version
+from utils.exploratory import PLOTS as EXPLORATORY_PLOTS, PLOT_FORMATS, render_plot_from_dataset
+from utils.model_downloader import download_models, check_models_available, MODEL_SOURCE
 import pandas as pd
 import numpy as np
 import matplotlib
@@ -28,48 +39,312 @@ files_available, missing_files = check_models_available()
 
 if not files_available:
     logger.warning(f"⚠️  Missing model files: {missing_files}")
-    logger.info("🚀 Models not found in image - downloading from Google Drive...")
+    logger.info(f"🚀 Models not found in image - downloading from {MODEL_SOURCE}...")
     logger.info("💡 Tip: To improve startup performance, include models in Docker image during build")
-    download_success = download_models_from_gdrive()
+    download_success = download_models(missing_files)
     
     if not download_success:
-        logger.error("❌ Failed to download files from Google Drive")
-        logger.error("Please check your Google Drive folder ID in utils/model_downloader.py")
+        logger.error("❌ Failed to download files")
+        logger.error("Please check MODEL_SOURCE (or the Google Drive folder ID in utils/model_downloader.py)")
     else:
         logger.info("✅ Files download completed!")
 else:
     logger.info("✅ All models are available! (loaded from Docker image)")
 
-model_paths = {
-    "logistic-regression": "saved_models/logistic_regression.pkl",
-    "random-forest": "saved_models/random_forest.pkl",
-    "xg-boost": "saved_models/xgboost.pkl",
-    "mlp": "saved_models/mlp.pkl",
-}
+model_paths = DEFAULT_MODEL_PATHS
 
-logger.info("🔄 Initializing model loader (eager loading)...")
+# Upper bound on applicants accepted by a single /predict/batch request
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 250000))
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+# Explanations and rendered waterfalls keyed by model + hash of the encoded feature row
+shap_cache = ResultCache(
+    maxsize=int(os.environ.get("SHAP_CACHE_SIZE", 1024)),
+    ttl=float(os.environ.get("SHAP_CACHE_TTL", 3600)),
+    spill_dir=os.environ.get("SHAP_CACHE_DIR") or None,
+    spill_max_files=int(os.environ.get("SHAP_CACHE_DIR_MAX_FILES", 4096)),
+    spill_max_bytes=int(float(os.environ.get("SHAP_CACHE_DIR_MAX_MB", 256)) * 1024 * 1024),
+    spill_sweep_interval=float(os.environ.get("SHAP_CACHE_DIR_SWEEP_SECONDS", 60))
+)
+
+# Dataset behind /analyze; its distributions are computed once and cached until the file changes
+ANALYZE_DATASET = os.environ.get("ANALYZE_DATASET", 'data/syntetic_sample.csv')
+dataset_profiles = ProfileCache()
+dataset_indexes = IndexCache()
+
+# Exploratory plots rendered on demand, cached per dataset version + plot parameters
+exploratory_cache = ResultCache(
+    maxsize=int(os.environ.get("EXPLORATORY_CACHE_SIZE", 64)),
+    ttl=float(os.environ.get("EXPLORATORY_CACHE_TTL", 86400))
+)
+EXPLORATORY_MAX_AGE = int(os.environ.get("EXPLORATORY_MAX_AGE", 300))
+
+# Browser cache lifetime of the precomputed SHAP plots (they are revalidated by ETag afterwards)
+SHAP_PLOTS_MAX_AGE = int(os.environ.get("SHAP_PLOTS_MAX_AGE", 86400))
+
+# MODEL_LOADING_STRATEGY: eager (default), lazy or lru with MODEL_MEMORY_BUDGET_MB
+logger.info(f"🔄 Initializing model loader ({MODEL_LOADING_STRATEGY} loading)...")
 model_loader = ModelLoader(model_paths)
-if model_loader.all_loaded:
+if model_loader.strategy != 'eager':
+    logger.info("✅ Model loader ready; models load on first use")
+elif model_loader.all_loaded:
     logger.info("✅ All models loaded successfully and ready for predictions!")
 else:
     logger.warning("⚠️ Some models failed to load. Check logs above.")
 
+# Build SHAP explainers at startup so /shap/waterfall only pays for computing SHAP values
+if os.environ.get("PRELOAD_SHAP_EXPLAINERS", "true").lower() == "true":
+    logger.info("🔄 Building SHAP explainers...")
+    model_loader.build_explainers()
+
+# Under gunicorn with preload_app (see gunicorn.conf.py) this module is imported once in the
+# master and the workers are forked from it, sharing the loaded models copy-on-write.
+# Process and thread pools are then started in each worker by init_worker, not here.
+PRELOADED_IN_MASTER = os.environ.get("GUNICORN_PRELOAD_APP", "false").lower() == "true"
+
+# Synthetic requests through preprocessing, models, explainers and the renderers before
+# /readyz reports ready. Runs in each worker (XGBoost/OpenMP threads do not survive fork).
+WARMUP = os.environ.get("WARMUP", "true").lower() == "true"
+WARMUP_BACKGROUND = os.environ.get("WARMUP_BACKGROUND", "true").lower() == "true"
+warmup_state = WarmupState()
+
+# Poll saved_models/ every MODEL_WATCH_INTERVAL seconds and hot-reload changed models (0 disables)
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", 0))
+
+def start_model_watcher():
+    if MODEL_WATCH_INTERVAL > 0:
+        ModelWatcher(model_loader, MODEL_WATCH_INTERVAL, validate=smoke_test).start()
+
+def start_app_warmup():
+    if WARMUP:
+        start_warmup(model_loader, warmup_state, background=WARMUP_BACKGROUND)
+    else:
+        warmup_state.status = "ready"
+
+def init_worker():
+    """Per-worker setup after fork: fresh locks and pools (the inherited ones belong to the master)"""
+    reset_inference_executor()
+    reset_render_pool()
+    model_loader.reset_locks()
+    shap_cache.reset_lock()
+    dataset_profiles.reset_lock()
+    dataset_indexes.reset_lock()
+    exploratory_cache.reset_lock()
+    start_render_pool()
+    start_app_warmup()
+    start_model_watcher()
+
+# Waterfall plots are drawn in a dedicated pool of renderer processes (RENDER_PROCESSES=0 renders inline).
+# Skipped when multiprocessing imports this script as __mp_main__ in a renderer (python app.py,
+# after the pool was restarted through the fork server)
+if not PRELOADED_IN_MASTER and __name__ != '__mp_main__':
+    start_render_pool()
+    start_app_warmup()
+    start_model_watcher()
+
 @app.route('/')
 def home():
     return "TCC Grupo 6 - Credit Risk Prediction API"
 
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the process is up and answering"""
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: 503 until the warm-up has finished, so no traffic reaches a cold worker"""
+    state = warmup_state.to_dict()
+    state["loaded_models"] = model_loader.get_loaded_models()
+    return jsonify(state), 200 if warmup_state.ready else 503
+
+def parse_threshold_args():
+    """
+    Read decision thresholds from query params: `threshold` applies to every model and
+    `threshold_<model_name>` (e.g. threshold_xg-boost=0.6) overrides a single model.
+    """
+    thresholds = {}
+    default = request.args.get("threshold", default=None, type=float)
+    for name in model_loader.model_paths.keys():
+        threshold = request.args.get(f"threshold_{name}", default=default, type=float)
+        if threshold is not None:
+            thresholds[name] = threshold
+    return thresholds
+
+
+def parse_cutoff_args():
+    """Read the optional comma-separated list of extra cut-offs (e.g. cutoffs=0.3,0.5,0.7)"""
+    cutoffs = request.args.get("cutoffs", default="")
+    return [float(cutoff) for cutoff in cutoffs.split(",") if cutoff.strip()]
+
+
+def parse_parallel_arg():
+    """`parallel=true|false` overrides the PARALLEL_INFERENCE default for one request"""
+    return request.args.get("parallel", default=None, type=lambda x: x.lower() == 'true')
+
+
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
         data = request.get_json()
 
         preprocessed_data = preprocessing(data)
-                
-        predictions = predict_with_models(model_loader, preprocessed_data)
+        
+        details = request.args.get("details", default=False, type=lambda x: x.lower() == 'true')
+        predictions = predict_with_models(
+            model_loader,
+            preprocessed_data,
+            thresholds=parse_threshold_args(),
+            details=details,
+            cutoffs=parse_cutoff_args(),
+            parallel=parse_parallel_arg()
+        )
         
         return jsonify(predictions)
     except Exception as e:
         return jsonify({"error": str(e)}), 400
+
+
+def parse_ensemble_args():
+    """Ensemble method and decision threshold (`method`, `ensemble_threshold`) from query params"""
+    method = request.args.get("method", default="mean")
+    threshold = request.args.get("ensemble_threshold", default=0.5, type=float)
+    if not 0.0 <= threshold <= 1.0:
+        raise ValueError(f"Ensemble threshold must be between 0 and 1, got {threshold}")
+    return method, threshold
+
+
+@app.route('/predict/ensemble', methods=['POST'])
+def predict_ensemble():
+    try:
+        data = request.get_json()
+
+        preprocessed_data = preprocessing(data)
+        
+        method, threshold = parse_ensemble_args()
+        details = request.args.get("details", default=False, type=lambda x: x.lower() == 'true')
+        ensemble = ensemble_predict(
+            model_loader,
+            preprocessed_data,
+            method=method,
+            threshold=threshold,
+            model_thresholds=parse_threshold_args(),
+            parallel=parse_parallel_arg()
+        )
+        
+        result = {
+            "method": ensemble["method"],
+            "prediction": ensemble["predictions"][0],
+            "probability": ensemble["probabilities"][0],
+            "threshold": ensemble["threshold"],
+            "weights": ensemble["weights"],
+        }
+        if details:
+            result["models"] = {
+                name: None if probabilities is None else probabilities[0]
+                for name, probabilities in ensemble["models"].items()
+            }
+            result["timings_ms"] = ensemble["timings_ms"]
+        
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def parse_batch_records():
+    """Read a batch of applicants from a JSON array or an NDJSON body"""
+    if request.mimetype in NDJSON_MIMETYPES:
+        body = request.get_data(as_text=True)
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+    
+    data = request.get_json()
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array of applicants")
+    return data
+
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    try:
+        records = parse_batch_records()
+        if not records:
+            return jsonify({"error": "No data provided"}), 400
+        if len(records) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"Batch too large ({len(records)} > {MAX_BATCH_SIZE})"}), 413
+        
+        preprocessed_data = preprocessing_batch(records)
+        
+        if request.args.get("ensemble"):
+            return predict_batch_ensemble(records, preprocessed_data)
+        
+        batch_predictions = predict_batch_with_models(
+            model_loader,
+            preprocessed_data,
+            thresholds=parse_threshold_args(),
+            cutoffs=parse_cutoff_args(),
+            parallel=parse_parallel_arg()
+        )
+        
+        def row(i):
+            result = {}
+            for name, predictions in batch_predictions.items():
+                result[name] = {
+                    "prediction": predictions["predictions"][i],
+                    "probability": predictions["probabilities"][i],
+                    "threshold": predictions["threshold"],
+                }
+                if "cutoffs" in predictions:
+                    result[name]["cutoffs"] = {
+                        cutoff: labels[i] for cutoff, labels in predictions["cutoffs"].items()
+                    }
+            return result
+        
+        if request.mimetype in NDJSON_MIMETYPES:
+            def generate():
+                for i in range(len(records)):
+                    yield json.dumps(row(i)) + "\n"
+            return Response(generate(), mimetype='application/x-ndjson')
+        
+        return jsonify({
+            "count": len(records),
+            "timings_ms": {name: predictions["elapsed_ms"] for name, predictions in batch_predictions.items()},
+            "results": [row(i) for i in range(len(records))]
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def predict_batch_ensemble(records, preprocessed_data):
+    """One ensemble score per applicant instead of four per-model payloads"""
+    ensemble = ensemble_predict(
+        model_loader,
+        preprocessed_data,
+        method=request.args.get("ensemble"),
+        threshold=parse_ensemble_args()[1],
+        model_thresholds=parse_threshold_args(),
+        parallel=parse_parallel_arg()
+    )
+    
+    def row(i):
+        return {
+            "prediction": ensemble["predictions"][i],
+            "probability": ensemble["probabilities"][i],
+        }
+    
+    if request.mimetype in NDJSON_MIMETYPES:
+        def generate():
+            for i in range(len(records)):
+                yield json.dumps(row(i)) + "\n"
+        return Response(generate(), mimetype='application/x-ndjson')
+    
+    return jsonify({
+        "count": len(records),
+        "method": ensemble["method"],
+        "threshold": ensemble["threshold"],
+        "weights": ensemble["weights"],
+        "timings_ms": ensemble["timings_ms"],
+        "results": [row(i) for i in range(len(records))]
+    })
     
 @app.route('/metrics', methods=['GET'])
 def metrics():
@@ -89,23 +364,44 @@ def metrics_of_model(model_name):
         return jsonify({"error": str(e)}), 400
     
     
+def cacheable(response, etag, max_age=None):
+    """Strong ETag + Cache-Control on a static response; answers 304 when If-None-Match matches"""
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = SHAP_PLOTS_MAX_AGE if max_age is None else max_age
+    return response.make_conditional(request)
+
+
 @app.route('/shap/plots/<model_name>', methods=['GET'])
 def shap_plots(model_name):
     try:
-        shap_data = model_loader.get_shap(model_name)
-        if shap_data is None:
+        plots = model_loader.get_plots(model_name)
+        if plots is None:
             return jsonify({"error": "Model not found"}), 404
         
-        summary_plot_b64 = shap_data.get('summary_plot')
-        shap_importance_b64 = shap_data.get('shap_importance')
+        summary_plot = plots.get('summary_plot')
+        shap_importance = plots.get('shap_importance')
 
-        return jsonify({
-            "summary_plot": summary_plot_b64,
-            "shap_importance": shap_importance_b64
+        response = jsonify({
+            "summary_plot": summary_plot.b64() if summary_plot else None,
+            "shap_importance": shap_importance.b64() if shap_importance else None
         })
+        return cacheable(response, "-".join(plot.etag for _, plot in sorted(plots.items())) or "empty")
     except Exception as e:
         return jsonify({"error": str(e)}), 400
+
+
+@app.route('/shap/plots/<model_name>/<plot_name>', methods=['GET'])
+def shap_plot_image(model_name, plot_name):
+    if model_loader.get_plots(model_name) is None:
+        return jsonify({"error": "Model not found"}), 404
+    plot = model_loader.get_plot(model_name, plot_name)
+    if plot is None:
+        return jsonify({"error": f"Plot not found. Use one of {', '.join(SHAP_PLOT_NAMES)}"}), 404
     
+    return cacheable(Response(plot.data, mimetype=plot.mimetype), plot.etag)
+
+
 @app.route('/shap/waterfall/<model_name>', methods=['POST'])
 def shap_waterfall(model_name):
     try:
@@ -118,20 +414,9 @@ def shap_waterfall(model_name):
         if not data:
             return jsonify({"error": "No data provided"}), 400
         
-        validated_sample_df = preprocessing(data)
-        validated_sample = validated_sample_df.values[0]  # Convert DataFrame to numpy array
-        
-        # Get the model (already loaded)
-        trained_model = model_loader.get_model(model_name)
-        scaler = model_loader.get_scaler(model_name)
+        validated_sample = preprocessing(data)[0]
         
-        waterfall_plot_b64 = generate_waterfall_plot(
-            trained_model, 
-            validated_sample, 
-            model_name, 
-            None,  # masker will be created in the SHAP function if needed
-            scaler
-        )
+        waterfall_plot_b64 = cached_waterfall(model_name, validated_sample)
         
         return jsonify({"waterfall_plot": waterfall_plot_b64})
     except Exception as e:
@@ -146,26 +431,13 @@ def shap_waterfall_all():
         if not data:
             return jsonify({"error": "No data provided"}), 400
         
-        validated_sample_df = preprocessing(data)
-        validated_sample = validated_sample_df.values[0]  # Convert DataFrame to numpy array
+        validated_sample = preprocessing(data)[0]
         
         waterfall_plots = {}
         
         for model_name in model_loader.model_paths.keys():
             try:
-                # Get the model (already loaded)
-                trained_model = model_loader.get_model(model_name)
-                scaler = model_loader.get_scaler(model_name)
-                shap_data = model_loader.get_shap(model_name)
-                
-                waterfall_plot_b64 = generate_waterfall_plot(
-                    trained_model, 
-                    validated_sample, 
-                    model_name, 
-                    shap_data.get('masker'), 
-                    scaler
-                )
-                waterfall_plots[model_name] = waterfall_plot_b64
+                waterfall_plots[model_name] = cached_waterfall(model_name, validated_sample)
                 
             except Exception as e:
                 logger.error(f"Error generating SHAP waterfall plot for {model_name}: {e}")
@@ -177,65 +449,205 @@ def shap_waterfall_all():
         return jsonify({"error": str(e)}), 400
 
 
-def get_value_counts(df, columns, top_n=None):
-    result = {}
-    for col in columns:
-        counts = df[col].value_counts()
-        if top_n:
-            counts = counts.head(top_n)
-        result[col] = {str(k): int(v) for k, v in counts.items()}
-    return result
+def explain_with_model(model_name, sample, entry=None):
+    """SHAP explanation of a preprocessed sample with an already loaded model and explainer (cached)"""
+    # Keys carry the model version, so results of a replaced model are never served
+    entry = entry or model_loader.get_entry(model_name, with_explainer=True)
+    return shap_cache.get_or_compute(
+        make_key(model_name, 'explanation', sample, entry.version),
+        lambda: explain_sample(entry.model, sample, model_name, entry.explainer, entry.scaler)
+    )
+
+
+def cached_waterfall(model_name, sample):
+    """Base64 waterfall plot of a preprocessed sample, reusing cached explanations and renders"""
+    entry = model_loader.get_entry(model_name, with_explainer=True)
+    return shap_cache.get_or_compute(
+        make_key(model_name, 'waterfall', sample, entry.version),
+        lambda: generate_waterfall_plot(
+            entry.model,
+            sample,
+            model_name,
+            entry.explainer,
+            entry.scaler,
+            explanation=explain_with_model(model_name, sample, entry)
+        )
+    )
+
 
+@app.route('/shap/cache', methods=['GET'])
+def shap_cache_stats():
+    return jsonify(shap_cache.stats())
 
-def bin_numeric_column(series, bins=10):
-    return pd.cut(series, bins=bins).astype(str)
+
+@app.route('/shap/cache', methods=['DELETE'])
+def shap_cache_clear():
+    shap_cache.clear()
+    return jsonify({"message": "SHAP cache cleared", **shap_cache.stats()})
+
+
+@app.route('/shap/values/<model_name>', methods=['POST'])
+def shap_values_of_model(model_name):
+    try:
+        if model_name not in model_loader.model_paths:
+            return jsonify({"error": "Model not found"}), 404
+        
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+        
+        validated_sample = preprocessing(data)[0]
+        max_display = request.args.get("max_display", default=None, type=int)
+        
+        explanation = explain_with_model(model_name, validated_sample)
+        
+        return jsonify(explanation_to_dict(explanation, max_display))
+    except Exception as e:
+        logger.error(f"Error computing SHAP values: {e}")
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route('/shap/values', methods=['POST'])
+def shap_values_all():
+    try:
+        data = request.get_json()
+        
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+        
+        validated_sample = preprocessing(data)[0]
+        max_display = request.args.get("max_display", default=None, type=int)
+        
+        shap_values = {}
+        for model_name in model_loader.model_paths.keys():
+            try:
+                explanation = explain_with_model(model_name, validated_sample)
+                shap_values[model_name] = explanation_to_dict(explanation, max_display)
+            except Exception as e:
+                logger.error(f"Error computing SHAP values for {model_name}: {e}")
+                shap_values[model_name] = None
+        
+        return jsonify({"shap_values": shap_values})
+    except Exception as e:
+        logger.error(f"Error computing SHAP values: {e}")
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route('/shap/reasons/<model_name>', methods=['POST'])
+def shap_reasons(model_name):
+    try:
+        if model_name not in model_loader.model_paths:
+            return jsonify({"error": "Model not found"}), 404
+        
+        records = parse_batch_records()
+        if not records:
+            return jsonify({"error": "No data provided"}), 400
+        if len(records) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"Batch too large ({len(records)} > {MAX_BATCH_SIZE})"}), 413
+        top_k = request.args.get("top_k", default=4, type=int)
+        if top_k < 1:
+            return jsonify({"error": f"top_k must be at least 1, got {top_k}"}), 400
+        
+        preprocessed_data = preprocessing_batch(records)
+        reason_codes = iter_reason_codes(
+            model_loader,
+            model_name,
+            preprocessed_data,
+            top_k=top_k,
+            direction=request.args.get("direction", default="negative"),
+            declined_only=request.args.get("declined_only", "false").lower() == "true",
+            threshold=parse_threshold_args().get(model_name),
+            chunk_size=request.args.get("chunk_size", default=1024, type=int)
+        )
+        # The first chunk is explained here so argument errors still produce a 400
+        first = next(reason_codes, None)
+        
+        def generate():
+            if first is None:
+                return
+            yield json.dumps(first) + "\n"
+            for result in reason_codes:
+                yield json.dumps(result) + "\n"
+        return Response(generate(), mimetype='application/x-ndjson')
+    except Exception as e:
+        logger.error(f"Error computing reason codes: {e}")
+        return jsonify({"error": str(e)}), 400
 
 
 @app.route('/analyze', methods=['GET'])
 def analyze():
     try:
-        # Try to read from local data directory first, then from models directory
-        path = 'data/syntetic_sample.csv'
-        df = None
+        # Distributions come from the cached profile; the file is only read again when it changes
+        path = ANALYZE_DATASET
         try:
-            df = pd.read_csv(path)
-            logger.info(f"📊 Loaded data from {path}")
+            profile = dataset_profiles.get(path)
         except FileNotFoundError:
             return jsonify({"error": "Data file not found. Please ensure syntetic_sample.csv is available in the data folder."}), 404
-        
-        if df is None:
-            return jsonify({"error": "Data file not found. Please ensure syntetic_sample.csv is available in the data folder."}), 404
 
         top_n = request.args.get("top_n", default=None, type=int)
         include_bins = request.args.get("include_bins", default=False, type=lambda x: x.lower() == 'true')
 
-        non_numerical_cols = df.select_dtypes(exclude=[np.number]).columns.tolist()
-        numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+        return jsonify(profile.to_dict(top_n=top_n, include_bins=include_bins))
 
-        categorical_distributions = get_value_counts(df, non_numerical_cols, top_n=top_n)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        if include_bins:
-            df_binned = df.copy()
-            for col in numeric_cols:
-                df_binned[col] = bin_numeric_column(df[col])
-            numeric_distributions = get_value_counts(df_binned, numeric_cols, top_n=top_n)
-        else:
-            numeric_distributions = get_value_counts(df, numeric_cols, top_n=top_n)
 
-        result = {
-            "meta": {
-                "total_rows": len(df),
-                "columns_count": len(df.columns),
-                "generated_at": datetime.utcnow().isoformat()
-            },
-            "categorical_distributions": categorical_distributions,
-            "numerical": numeric_distributions,
-        }
+@app.route('/analyze/query', methods=['POST'])
+def analyze_query():
+    """
+    Counts and bad-risk rates of a slice of the dataset, optionally per group.
+    Body: {"filters": {"age": {"min": 25, "max": 40}, "purpose": ["new car"]}, "group_by": ["sex"], "bins": {"age": [18, 25, 40, 100]}}
+    """
+    try:
+        data = request.get_json(silent=True)
+        if data is None:
+            return jsonify({"error": "No data provided"}), 400
+        
+        try:
+            index = dataset_indexes.get(ANALYZE_DATASET)
+        except FileNotFoundError:
+            return jsonify({"error": "Data file not found. Please ensure syntetic_sample.csv is available in the data folder."}), 404
+        
+        return jsonify(index.query(data.get("filters"), data.get("group_by"), data.get("bins")))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
 
-        return jsonify(result)
 
+@app.route('/exploratory/<plot_name>', methods=['GET'])
+def exploratory_plot(plot_name):
+    """
+    One exploratory analysis plot of the current dataset, rendered on first request in the
+    renderer pool and cached by dataset version, dpi and format (?dpi=150&format=svg)
+    """
+    try:
+        if plot_name not in EXPLORATORY_PLOTS:
+            return jsonify({"error": f"Plot not found. Use one of {', '.join(EXPLORATORY_PLOTS)}"}), 404
+        
+        dpi = request.args.get("dpi", default=300, type=int)
+        fmt = request.args.get("format", default='png')
+        if not 50 <= dpi <= 600:
+            return jsonify({"error": "dpi must be between 50 and 600"}), 400
+        if fmt not in PLOT_FORMATS:
+            return jsonify({"error": f"Unknown format. Use one of {', '.join(PLOT_FORMATS)}"}), 400
+        
+        try:
+            version = dataset_version(ANALYZE_DATASET)
+        except FileNotFoundError:
+            return jsonify({"error": "Data file not found. Please ensure syntetic_sample.csv is available in the data folder."}), 404
+        
+        etag = f"{plot_name}-{version}-{dpi}-{fmt}"
+        if request.if_none_match.contains(etag):
+            return cacheable(Response(status=304), etag, EXPLORATORY_MAX_AGE)
+        
+        image = exploratory_cache.get_or_compute(
+            etag,
+            lambda: render(render_plot_from_dataset, os.path.abspath(ANALYZE_DATASET), plot_name, dpi, fmt)
+        )
+        return cacheable(Response(image, mimetype=PLOT_FORMATS[fmt]), etag, EXPLORATORY_MAX_AGE)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return jsonify({"error": str(e)}), 400
 
 
 @app.route('/memory', methods=['GET'])
@@ -255,6 +667,11 @@ def memory_status():
         
         return jsonify({
             "memory_usage_mb": round(memory_mb, 2),
+            "memory_breakdown_mb": memory_breakdown(process),
+            "pid": os.getpid(),
+            "parent_pid": os.getppid(),
+            "preloaded": PRELOADED_IN_MASTER,
+            "model_cache": model_loader.memory_stats(),
             "loaded_models": loaded_models,
             "total_models": len(model_loader.model_paths),
             "available_models": list(model_loader.model_paths.keys())
@@ -264,14 +681,76 @@ def memory_status():
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+
+def memory_breakdown(process):
+    """
+    Private vs shared resident memory of this process. With preload, pages inherited from the
+    gunicorn master stay shared until written, so `private` is what each extra worker costs.
+    """
+    try:
+        # uss: pages only this process maps; pss: rss with shared pages split among their users
+        info = process.memory_full_info()
+    except Exception:
+        return None
+    to_mb = lambda value: round(value / 1024 / 1024, 2)
+    return {
+        "rss": to_mb(info.rss),
+        "private": to_mb(info.uss),
+        "shared": to_mb(info.rss - info.uss),
+        "proportional": to_mb(info.pss) if hasattr(info, 'pss') else None,
+    }
+
 @app.route('/memory/unload', methods=['POST'])
 def unload_all_models():
-    """Unload all models (disabled - models are kept in memory for optimal performance)"""
-    return jsonify({
-        "message": "Models are kept in memory for optimal performance. Eager loading mode enabled.",
-        "loaded_models": model_loader.get_loaded_models(),
-        "total_models": len(model_loader.model_paths)
-    })
+    """Unload one model (?model=<model_name>) or all of them; they are loaded again on next use"""
+    try:
+        model_name = request.args.get("model")
+        if model_name:
+            if model_name not in model_loader.model_paths:
+                return jsonify({"error": "Model not found"}), 404
+            unloaded = [model_name] if model_loader.unload_model(model_name) else []
+        else:
+            unloaded = model_loader.unload_all_models()
+        
+        return jsonify({
+            "message": f"Unloaded {len(unloaded)} model(s)",
+            "unloaded_models": unloaded,
+            "loaded_models": model_loader.get_loaded_models(),
+            "total_models": len(model_loader.model_paths),
+            "model_cache": model_loader.memory_stats()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route('/models/reload', methods=['POST'])
+def reload_models():
+    """
+    Hot-reload one model (?model=<model_name>) or all of them from saved_models/ without a restart.
+    Each new version is validated with a smoke prediction before it replaces the current one.
+    Only this worker is reloaded; with several workers use the file watcher (MODEL_WATCH_INTERVAL).
+    """
+    try:
+        model_name = request.args.get("model")
+        if model_name and model_name not in model_loader.model_paths:
+            return jsonify({"error": "Model not found"}), 404
+        
+        reloaded, errors = [], {}
+        for name in [model_name] if model_name else list(model_loader.model_paths.keys()):
+            try:
+                reloaded.append(model_loader.reload_model(name, validate=smoke_test))
+            except Exception as e:
+                errors[name] = str(e)
+        
+        return jsonify({
+            "message": f"Reloaded {len(reloaded)} model(s)",
+            "reloaded": reloaded,
+            "errors": errors,
+            "pid": os.getpid(),
+            "model_cache": model_loader.memory_stats()
+        }), 200 if not errors else 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
 
 
 if __name__ == '__main__':
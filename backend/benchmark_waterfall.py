@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark SHAP waterfall rendering: credit palette applied at draw time vs the
+previous post-hoc color swap over every collection, patch and text of the figure.
+
+Usage: python benchmark_waterfall.py [iterations]
+"""
+
+import sys
+import time
+import numpy as np
+from utils.helper import TRAINED_FEATURES
+from utils.waterfall import CREDIT_PALETTE, draw_waterfall, figure_to_png
+
+
+def legacy_apply_credit_colors(fig):
+    """
+    Previous approach, kept here for comparison: invert the default SHAP colors
+    by walking every collection, patch and text of an already drawn figure.
+    Default: red = positive, blue = negative
+    We want: blue = positive (good credit), red = negative (bad credit)
+    """
+    BLUE_NORMALIZED = [0., 0.54337757, 0.98337906]
+    RED_NORMALIZED = [1., 0., 0.31796406]
+
+    def swap_colors(color):
+        """Helper function to swap red and blue colors"""
+        try:
+            if len(color) >= 3:
+                r, g, b = color[0], color[1], color[2]
+                alpha = color[3] if len(color) > 3 else 1.0
+                
+                # Check if this is a red-ish color (positive SHAP value)
+                if r > g and r > b and r > 0.5:
+                    # Convert red to blue
+                    if len(color) > 3:
+                        return BLUE_NORMALIZED + [alpha]
+                    else:
+                        return BLUE_NORMALIZED
+                # Check if this is a blue-ish color (negative SHAP value)
+                elif b > r and b > g and b > 0.5:
+                    # Convert blue to red
+                    if len(color) > 3:
+                        return RED_NORMALIZED + [alpha]
+                    else:
+                        return RED_NORMALIZED
+        except (IndexError, TypeError):
+            pass
+        return color
+    
+    for ax in fig.get_axes():
+        # Handle collections (bars, lines, etc.)
+        for collection in ax.collections:
+            try:
+                if hasattr(collection, 'get_facecolors'):
+                    colors = collection.get_facecolors()
+                    if len(colors) > 0:
+                        new_colors = [swap_colors(color) for color in colors]
+                        collection.set_facecolors(new_colors)
+                
+                if hasattr(collection, 'get_edgecolors'):
+                    colors = collection.get_edgecolors()
+                    if len(colors) > 0:
+                        new_colors = [swap_colors(color) for color in colors]
+                        collection.set_edgecolors(new_colors)
+            except Exception:
+                continue
+        
+        # Handle patches (rectangles in waterfall plots)
+        for patch in ax.patches:
+            try:
+                if hasattr(patch, 'get_facecolor'):
+                    color = patch.get_facecolor()
+                    new_color = swap_colors(color)
+                    # Use numpy array comparison to avoid ambiguity
+                    if not np.array_equal(new_color, color):
+                        patch.set_facecolor(new_color)
+                
+                if hasattr(patch, 'get_edgecolor'):
+                    color = patch.get_edgecolor()
+                    new_color = swap_colors(color)
+                    if not np.array_equal(new_color, color):
+                        patch.set_edgecolor(new_color)
+            except Exception:
+                continue
+        
+        # Handle text elements
+        for text in ax.texts:
+            try:
+                if hasattr(text, 'get_color'):
+                    color = text.get_color()
+                    # Handle matplotlib color objects properly
+                    if hasattr(color, '__len__') and len(color) >= 3:
+                        new_color = swap_colors(color)
+                        # Use numpy array comparison to avoid ambiguity
+                        if not np.array_equal(new_color, color):
+                            text.set_color(new_color)
+                    elif isinstance(color, str):
+                        # Handle named colors like 'red', 'blue', etc.
+                        if color.lower() in ['red', 'darkred', 'crimson']:
+                            text.set_color('blue')
+                        elif color.lower() in ['blue', 'darkblue', 'navy']:
+                            text.set_color('red')
+            except Exception:
+                continue
+
+
+def random_explanation(rng):
+    """Synthetic single-row explanation shaped like the API's (34 features)"""
+    values = rng.normal(0, 0.05, len(TRAINED_FEATURES))
+    data = rng.integers(0, 5, len(TRAINED_FEATURES)).astype(float)
+    return values, 0.7, data, TRAINED_FEATURES
+
+
+def time_ms(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def benchmark(iterations=50):
+    rng = np.random.default_rng(42)
+    explanations = [random_explanation(rng) for _ in range(iterations)]
+    
+    def post_hoc(explanation):
+        fig = draw_waterfall(*explanation, max_display=10)
+        legacy_apply_credit_colors(fig)
+        return fig
+    
+    def draw_time(explanation):
+        return draw_waterfall(*explanation, max_display=10, palette=CREDIT_PALETTE)
+    
+    # Warm up font caches and mathtext before timing
+    figure_to_png(draw_time(explanations[0]))
+    
+    print(f"🔄 Rendering {iterations} waterfalls per approach...")
+    results = {}
+    for name, draw in (("post-hoc color swap", post_hoc), ("palette at draw time", draw_time)):
+        queue = iter(explanations)
+        draw_ms = time_ms(lambda: draw(next(queue)), iterations)
+        queue = iter(explanations)
+        total_ms = time_ms(lambda: figure_to_png(draw(next(queue))), iterations)
+        results[name] = (draw_ms, total_ms)
+        print(f"   📊 {name:<22} draw: {draw_ms:7.2f} ms   draw + PNG: {total_ms:7.2f} ms")
+    
+    # Cost of the traversal alone, on figures that are already drawn
+    figures = [draw_waterfall(*explanation, max_display=10) for explanation in explanations]
+    queue = iter(figures)
+    swap_ms = time_ms(lambda: legacy_apply_credit_colors(next(queue)), iterations)
+    print(f"   📊 {'color traversal alone':<22} {swap_ms:7.2f} ms per plot (0 ms with the palette at draw time)")
+    
+    (old_draw, old_total), (new_draw, new_total) = results.values()
+    print(f"✅ Draw step {old_draw / new_draw:.2f}x, end to end {old_total / new_total:.2f}x (post-hoc / draw time)")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
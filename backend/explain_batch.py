@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Batch SHAP reason codes for many applicants, without rendering any plot.
+
+Reads applicants from a CSV or NDJSON file (same fields as the /predict payload),
+explains them in chunks and writes one NDJSON line per applicant with the top-k
+features that pushed the prediction towards "Mau Pagador".
+
+Usage:
+    python explain_batch.py applicants.csv --model xg-boost --top-k 4 --declined-only -o reasons.ndjson
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+import pandas as pd
+from utils.model_loader import ModelLoader, DEFAULT_MODEL_PATHS
+from utils.helper import preprocessing_batch
+from utils.reason_codes import REASON_DIRECTIONS, iter_reason_codes
+
+
+def read_records(path):
+    """Applicants from a CSV or NDJSON file (NaN becomes None, like a JSON null)"""
+    if path.endswith('.csv'):
+        df = pd.read_csv(path)
+        return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Top-k SHAP reason codes for a batch of applicants")
+    parser.add_argument("input", help="CSV or NDJSON file with one applicant per row")
+    parser.add_argument("--model", default="xg-boost", choices=list(DEFAULT_MODEL_PATHS.keys()))
+    parser.add_argument("--top-k", type=positive_int, default=4)
+    parser.add_argument("--direction", default="negative", choices=REASON_DIRECTIONS)
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--declined-only", action="store_true", help="Only write applicants predicted as Mau Pagador")
+    parser.add_argument("--chunk-size", type=positive_int, default=1024)
+    parser.add_argument("-o", "--output", default="-", help="Output NDJSON file (default: stdout)")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    start = time.perf_counter()
+    records = read_records(args.input)
+    preprocessed_data = preprocessing_batch(records)
+    
+    model_loader = ModelLoader({args.model: DEFAULT_MODEL_PATHS[args.model]})
+    if not model_loader.all_loaded:
+        print(f"❌ Could not load model {args.model}", file=sys.stderr)
+        sys.exit(1)
+    
+    output = sys.stdout if args.output == "-" else open(args.output, 'w')
+    written = 0
+    try:
+        for result in iter_reason_codes(
+            model_loader,
+            args.model,
+            preprocessed_data,
+            top_k=args.top_k,
+            direction=args.direction,
+            declined_only=args.declined_only,
+            threshold=args.threshold,
+            chunk_size=args.chunk_size
+        ):
+            output.write(json.dumps(result) + "\n")
+            written += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    
+    elapsed = time.perf_counter() - start
+    print(f"✅ {written} of {len(records)} applicants explained with {args.model} in {elapsed:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,19 +4,61 @@ Extract metadata (metrics, SHAP data) from model files to create lightweight met
 This allows true lazy loading without loading full models at startup
 """
 
+import base64
 import joblib
 import json
 import os
+import sys
 from pathlib import Path
+from utils.artifacts import artifact_dir_for, read_manifest, save_artifact
+from utils.model_loader import DEFAULT_MODEL_PATHS
+from utils.static_plots import PLOTS_DIR, SHAP_PLOT_NAMES, StaticPlot, plot_file_path
+
+def save_plots(plots_dir, model_name, shap_data):
+    """Decode the base64 SHAP plots of a model into image files (metadata/plots/<model>_<plot>.png)"""
+    for plot_name in SHAP_PLOT_NAMES:
+        if not shap_data.get(plot_name):
+            continue
+        plot = StaticPlot(base64.b64decode(shap_data[plot_name]))
+        path = plot_file_path(plots_dir, model_name, plot_name, plot.extension)
+        with open(path, 'wb') as f:
+            f.write(plot.data)
+        print(f"   🖼️  {plot_name} saved to: {path} ({len(plot.data) / 1024:.1f}KB)")
+
+def split_metadata():
+    """Move the base64 plots out of existing metadata JSON files (no model files needed)"""
+    base_dir = Path(__file__).parent
+    metadata_dir = base_dir / 'metadata'
+    plots_dir = base_dir / PLOTS_DIR
+    plots_dir.mkdir(parents=True, exist_ok=True)
+    
+    for metadata_file in sorted(metadata_dir.glob('*_metadata.json')):
+        model_name = metadata_file.name[:-len('_metadata.json')]
+        with open(metadata_file, 'r') as f:
+            metadata = json.load(f)
+        
+        shap_data = metadata.get('shap', {})
+        if not any(shap_data.get(plot_name) for plot_name in SHAP_PLOT_NAMES):
+            print(f"✅ {model_name} metadata already split")
+            continue
+        
+        print(f"🔄 Splitting metadata of {model_name}...")
+        save_plots(plots_dir, model_name, shap_data)
+        metadata['shap'] = {key: value for key, value in shap_data.items() if key not in SHAP_PLOT_NAMES}
+        with open(metadata_file, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        print(f"   📊 Metadata size: {metadata_file.stat().st_size / 1024:.1f}KB")
 
 def extract_metadata():
     """Extract metadata from all model files"""
     base_dir = Path(__file__).parent
     saved_models_dir = base_dir / 'saved_models'
     metadata_dir = base_dir / 'metadata'
+    plots_dir = base_dir / PLOTS_DIR
     
     # Create metadata directory
     metadata_dir.mkdir(exist_ok=True)
+    plots_dir.mkdir(exist_ok=True)
     
     model_files = {
         "logistic-regression": "logistic_regression.pkl",
@@ -52,12 +94,12 @@ def extract_metadata():
                     # Convert non-serializable objects to strings
                     serializable_metrics[key] = str(value)
             
-            # Handle SHAP data - only keep essential info, not the full data
+            # Handle SHAP data - plots go to their own image files, not the JSON
+            save_plots(plots_dir, model_name, shap_data)
             serializable_shap = {}
             for key, value in shap_data.items():
-                if key in ['summary_plot', 'shap_importance']:
-                    # Keep these as they're base64 strings
-                    serializable_shap[key] = value
+                if key in SHAP_PLOT_NAMES:
+                    continue
                 elif key == 'masker':
                     # Skip masker as it's usually a large object
                     continue
@@ -91,5 +133,43 @@ def extract_metadata():
         except Exception as e:
             print(f"❌ Error extracting metadata from {model_name}: {e}")
 
+def split_artifacts():
+    """Convert every .pkl bundle in saved_models/ into a split artifact directory (see utils/artifacts.py)"""
+    base_dir = Path(__file__).parent
+    
+    for model_name, path in DEFAULT_MODEL_PATHS.items():
+        model_path = base_dir / path
+        if not model_path.exists():
+            print(f"⚠️  Model file not found: {model_path}")
+            continue
+        
+        try:
+            print(f"🔄 Splitting {model_name} into components...")
+            data = joblib.load(model_path)
+            artifact_dir = artifact_dir_for(str(model_path))
+            save_artifact(
+                artifact_dir,
+                data['model'],
+                metrics=data.get('metrics', {}),
+                shap=data.get('shap', {}),
+                scaler=data.get('scaler')
+            )
+            
+            artifact_files = read_manifest(artifact_dir)["files"].values()
+            artifact_size = sum((Path(artifact_dir) / name).stat().st_size for name in artifact_files) / (1024 * 1024)
+            print(f"✅ Artifact saved to: {artifact_dir}")
+            print(f"   📊 Bundle size: {model_path.stat().st_size / (1024 * 1024):.1f}MB")
+            print(f"   📊 Artifact size: {artifact_size:.1f}MB")
+            
+        except Exception as e:
+            print(f"❌ Error splitting {model_name}: {e}")
+
 if __name__ == "__main__":
-    extract_metadata()
+    # --split-existing: only split metadata JSON files that still embed the plots
+    # --split-artifacts: write saved_models/<name>/ split artifacts from the .pkl bundles
+    if "--split-existing" in sys.argv[1:]:
+        split_metadata()
+    elif "--split-artifacts" in sys.argv[1:]:
+        split_artifacts()
+    else:
+        extract_metadata()
@@ -0,0 +1,38 @@
+"""
+Gunicorn configuration for production deployment.
+
+With preload_app the Flask app (and all models, SHAP explainers and maskers) is
+loaded once in the master process; workers are forked from it and share those
+pages copy-on-write instead of each loading their own copy. GUNICORN_PRELOAD=false
+restores the previous behaviour (every worker imports the app itself).
+"""
+
+import gc
+import os
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 300))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# app.py reads this to skip starting process/thread pools in the master
+os.environ["GUNICORN_PRELOAD_APP"] = "true" if preload_app else "false"
+
+
+def when_ready(server):
+    # Everything allocated so far (models, explainers) is moved to a permanent GC generation,
+    # so collections in the workers do not touch those objects and un-share their pages
+    if preload_app:
+        gc.collect()
+        gc.freeze()
+        server.log.info("Preloaded app; %d objects frozen before forking workers", gc.get_freeze_count())
+
+
+def post_fork(server, worker):
+    # Only with preload: the app module already exists in the forked worker
+    app_module = sys.modules.get("app")
+    if app_module is not None and hasattr(app_module, "init_worker"):
+        app_module.init_worker()
+        server.log.info("Worker %s initialized (pid %s)", worker.age, worker.pid)
@@ -0,0 +1,63 @@
+import os
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+from utils.artifacts import MANIFEST_FILE, load_artifact, read_manifest, save_artifact
+
+
+def fitted(seed):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(50, 3))
+    y = (X[:, 0] > 0).astype(int)
+    return LogisticRegression().fit(X, y), StandardScaler().fit(X), X[:10]
+
+
+def save(directory, seed):
+    model, scaler, masker = fitted(seed)
+    save_artifact(str(directory), model, metrics={"seed": seed}, shap={"masker": masker}, scaler=scaler)
+    return masker
+
+
+def test_round_trip(tmp_path):
+    masker = save(tmp_path, 0)
+    artifact = load_artifact(str(tmp_path))
+    np.testing.assert_array_equal(artifact["shap"]["masker"], masker)
+    assert artifact["metrics"] == {"seed": 0}
+    assert artifact["scaler"] is not None
+
+
+def test_resave_leaves_mapped_files_untouched(tmp_path):
+    old_masker = save(tmp_path, 0)
+    mapped = load_artifact(str(tmp_path))["shap"]["masker"]
+    old_files = set(read_manifest(str(tmp_path))["files"].values())
+
+    new_masker = save(tmp_path, 1)
+    new_files = set(read_manifest(str(tmp_path))["files"].values())
+    assert not old_files & new_files
+    np.testing.assert_array_equal(mapped, old_masker)  # Would fault or change if rewritten in place
+    np.testing.assert_array_equal(load_artifact(str(tmp_path))["shap"]["masker"], new_masker)
+
+
+def test_old_generations_are_removed(tmp_path):
+    generations = []
+    for seed in range(4):
+        save(tmp_path, seed)
+        generations.append(set(read_manifest(str(tmp_path))["files"].values()))
+    assert read_manifest(str(tmp_path))["generation"] == 4
+    assert set(os.listdir(tmp_path)) == generations[-1] | generations[-2] | {MANIFEST_FILE}
+
+
+def test_failed_save_keeps_previous_manifest(tmp_path):
+    save(tmp_path, 0)
+    before = read_manifest(str(tmp_path))
+
+    class Unpicklable:
+        def __reduce__(self):
+            raise RuntimeError("cannot pickle")
+
+    with pytest.raises(RuntimeError):
+        save_artifact(str(tmp_path), Unpicklable())
+    assert read_manifest(str(tmp_path)) == before
+    assert load_artifact(str(tmp_path))["metrics"] == {"seed": 0}
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('.tmp-')]
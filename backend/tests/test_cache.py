@@ -0,0 +1,101 @@
+import os
+import time
+from utils.cache import ResultCache
+
+
+def spilled(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.pkl'))
+
+
+def age(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_spill_directory_keeps_newest_files(tmp_path):
+    cache = ResultCache(maxsize=2, ttl=3600, spill_dir=str(tmp_path), spill_max_files=3)
+    for i in range(10):
+        cache.set(f"k{i}", i)
+        if i >= 2:
+            age(tmp_path / f"k{i - 2}.pkl", 100 - i)  # Just spilled: distinct, increasing mtimes
+    assert spilled(tmp_path) == ['k5.pkl', 'k6.pkl', 'k7.pkl']
+    assert cache.get("k6") == 6
+    assert cache.get("k1") is None
+
+
+def test_spill_directory_byte_limit(tmp_path):
+    cache = ResultCache(maxsize=1, ttl=3600, spill_dir=str(tmp_path), spill_max_bytes=2500)
+    for i in range(6):
+        cache.set(f"k{i}", b"v" * 1000)
+    assert len(spilled(tmp_path)) == 2
+    assert cache.stats()["spill_bytes"] <= 2500
+
+
+class FakeClock:
+    """Stands in for the time module inside utils.cache (monotonic and wall clock move together)"""
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+def test_expired_files_swept_at_startup_and_on_spill(tmp_path):
+    (tmp_path / "old.pkl").write_bytes(b"x")
+    (tmp_path / "crashed.pkl.1.2.tmp").write_bytes(b"x")
+    (tmp_path / "recent.pkl").write_bytes(b"x")
+    age(tmp_path / "old.pkl", 7200)
+    age(tmp_path / "crashed.pkl.1.2.tmp", 7200)
+
+    cache = ResultCache(maxsize=1, ttl=3600, spill_dir=str(tmp_path), spill_sweep_interval=0)
+    assert sorted(os.listdir(tmp_path)) == ['recent.pkl']
+
+    age(tmp_path / "recent.pkl", 7200)
+    cache.set("a", 1)
+    cache.set("b", 2)  # Spills a, sweeping the now expired recent.pkl
+    assert spilled(tmp_path) == ['a.pkl']
+    assert cache.stats()["spill_removed"] == 3
+
+
+def test_spills_do_not_scan_the_directory_between_sweeps(tmp_path, monkeypatch):
+    cache = ResultCache(maxsize=1, ttl=3600, spill_dir=str(tmp_path), spill_max_files=5)
+    scans = []
+    original = os.scandir
+    monkeypatch.setattr(os, 'scandir', lambda path: scans.append(path) or original(path))
+    for i in range(50):
+        cache.set(f"k{i}", i)
+    assert scans == []
+    assert len(spilled(tmp_path)) == 5
+    assert cache.stats()["spill_files"] == 5
+
+
+def test_periodic_sweep_bounds_files_from_other_workers(tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr('utils.cache.time', clock)
+    cache = ResultCache(maxsize=1, ttl=3600, spill_dir=str(tmp_path), spill_max_files=3, spill_sweep_interval=60)
+    for i in range(5):
+        (tmp_path / f"other{i}.pkl").write_bytes(b"x")  # Spilled by another worker
+        age(tmp_path / f"other{i}.pkl", time.time() - clock.now + 100 + i)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert len(spilled(tmp_path)) == 6  # Not swept yet
+
+    clock.now += 61
+    cache.set("c", 3)
+    assert spilled(tmp_path) == ['a.pkl', 'b.pkl', 'other0.pkl']
+
+
+def test_spilled_entry_keeps_its_original_expiry(tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr('utils.cache.time', clock)
+    cache = ResultCache(maxsize=1, ttl=10, spill_dir=str(tmp_path))
+    cache.set("a", 1)
+    clock.now += 8
+    cache.set("b", 2)  # Spills a, created 8 seconds ago
+    clock.now += 1
+    assert cache.get("a") == 1  # Read back from disk
+    clock.now += 2
+    assert cache.get("a") is None  # 11 seconds after it was created
@@ -0,0 +1,67 @@
+import threading
+import numpy as np
+import pandas as pd
+from utils.dataset_index import MAX_CACHED_GROUPINGS, DatasetIndex
+
+
+def pandas_groups(df, group_by):
+    grouped = df.dropna(subset=group_by).groupby(group_by, observed=True)['risk']
+    counts = grouped.size()
+    bad = grouped.apply(lambda risk: int((risk == 0).sum()))
+    return {tuple(str(value) for value in (key if isinstance(key, tuple) else (key,))): (int(counts[key]), int(bad[key]))
+            for key in counts.index}
+
+
+def index_groups(result, group_by):
+    return {tuple(group[name] for name in group_by): (group["count"], group["bad"]) for group in result["groups"]}
+
+
+def test_group_by_matches_pandas():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "sex": rng.choice(["female", "male"], 5000),
+        "purpose": rng.choice(["new car", "used car", "education", None], 5000),
+        "duration": rng.integers(4, 72, 5000),
+        "risk": rng.integers(0, 2, 5000),
+    })
+    index = DatasetIndex.from_frame(df)
+    result = index.query(group_by=["sex", "purpose", "duration"])
+    assert index_groups(result, ["sex", "purpose", "duration"]) == pandas_groups(df, ["sex", "purpose", "duration"])
+
+
+def test_group_key_beyond_int64():
+    # 5 columns with ~28k distinct values each: 28k ** 5 possible groups do not fit in int64
+    rng = np.random.default_rng(1)
+    n = 100000
+    df = pd.DataFrame({f"c{i}": rng.integers(0, 30000, n).astype(float) for i in range(5)})
+    df["risk"] = rng.integers(0, 2, n)
+    index = DatasetIndex.from_frame(df)
+    group_by = ["c0", "c1", "c2", "c3", "c4"]
+    sizes = [len(index.columns[name].group_codes()[1]) for name in group_by]
+    assert np.prod(sizes, dtype=np.float64) > np.iinfo(np.int64).max
+
+    result = index.query(filters={"c0": {"max": 10000}}, group_by=group_by)
+    assert index_groups(result, group_by) == pandas_groups(df[df["c0"] <= 10000], group_by)
+
+
+def test_concurrent_queries_with_many_bin_settings():
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({"age": rng.integers(18, 80, 20000), "risk": rng.integers(0, 2, 20000)})
+    index = DatasetIndex.from_frame(df)
+    errors = []
+
+    def run(offset):
+        try:
+            for n_bins in range(2, 2 + 3 * MAX_CACHED_GROUPINGS):
+                result = index.query(group_by=["age"], bins={"age": n_bins + offset})
+                assert sum(group["count"] for group in result["groups"]) == len(df)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(offset,)) for offset in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(index.columns["age"]._group_codes) <= MAX_CACHED_GROUPINGS
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from utils.ensemble import VOTE_TIE_LABEL, combine_probabilities, ensemble_labels, ensemble_predict
+
+MODELS = ['logistic-regression', 'random-forest', 'xg-boost', 'mlp']
+
+
+class FixedModel:
+    """Model returning the same good-payer probability for every row"""
+    classes_ = np.array([0, 1])
+
+    def __init__(self, probability):
+        self.probability = probability
+
+    def predict_proba(self, data):
+        p = np.full(len(data), self.probability)
+        return np.column_stack([1 - p, p])
+
+
+class IdentityScaler:
+    def transform(self, data):
+        return data
+
+
+class FakeEntry:
+    def __init__(self, model):
+        self.model = model
+        self.scaler = IdentityScaler()
+
+
+class FakeLoader:
+    def __init__(self, probabilities):
+        self.model_paths = {name: f"{name}.pkl" for name in probabilities}
+        self._entries = {name: FakeEntry(FixedModel(p)) for name, p in probabilities.items()}
+
+    def get_entry(self, name):
+        return self._entries[name]
+
+    def get_metrics(self, name):
+        return None
+
+
+def vote(goods, total=4):
+    probabilities = {name: np.array([0.9 if i < goods else 0.1]) for i, name in enumerate(MODELS[:total])}
+    return combine_probabilities(probabilities, {name: 1.0 for name in probabilities}, method='vote')
+
+
+def test_vote_tie_is_bad_payer():
+    score = vote(2)
+    assert score.tolist() == [0.5]
+    assert VOTE_TIE_LABEL == "Mau Pagador"
+    assert ensemble_labels(score, 'vote') == ["Mau Pagador"]
+
+
+def test_vote_tie_ignores_threshold():
+    assert ensemble_labels(vote(2), 'vote', threshold=0.4) == ["Mau Pagador"]
+    assert ensemble_labels(vote(1), 'vote', threshold=0.2) == ["Bom Pagador"]
+
+
+def test_vote_strict_majority():
+    assert ensemble_labels(vote(3), 'vote') == ["Bom Pagador"]
+    assert ensemble_labels(vote(1), 'vote') == ["Mau Pagador"]
+
+
+def test_vote_tie_with_failed_models():
+    probabilities = {'logistic-regression': np.array([0.9]), 'random-forest': np.array([0.2]),
+                     'xg-boost': None, 'mlp': None}
+    score = combine_probabilities(probabilities, {name: 1.0 for name in MODELS}, method='vote')
+    assert ensemble_labels(score, 'vote') == ["Mau Pagador"]
+
+
+def test_mean_at_threshold_is_bad_payer():
+    # Not a vote: the usual strict "probability > threshold" rule
+    assert ensemble_labels(np.array([0.5]), 'mean') == ["Mau Pagador"]
+
+
+@pytest.mark.parametrize("goods, expected", [(2, "Mau Pagador"), (3, "Bom Pagador")])
+def test_ensemble_predict_vote(goods, expected):
+    loader = FakeLoader({name: 0.9 if i < goods else 0.1 for i, name in enumerate(MODELS)})
+    result = ensemble_predict(loader, np.zeros((1, 3)), method='vote', parallel=False)
+    assert result["probabilities"] == [goods / 4]
+    assert result["predictions"] == [expected]
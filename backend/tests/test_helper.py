@@ -0,0 +1,82 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from utils.helper import EXPECTED_FEATURES, TRAINED_FEATURES, mappings, preprocessing, preprocessing_batch
+
+DATASET = os.path.join(os.path.dirname(__file__), '..', 'data', 'syntetic_sample.csv')
+
+
+def pandas_preprocessing(input_data):
+    """Frozen copy of the pandas/get_dummies preprocessing the encoder replaced"""
+    data_df = pd.DataFrame([input_data])[EXPECTED_FEATURES]
+
+    for feature, mapping in mappings.items():
+        data_df[feature] = data_df[feature].map(mapping).astype(int)
+
+    data_dummies_df = pd.get_dummies(data_df, dtype=int)
+    for col in TRAINED_FEATURES:
+        if col not in data_dummies_df:
+            data_dummies_df[col] = 0
+
+    return data_dummies_df[TRAINED_FEATURES]
+
+
+def sample_records(n=200, seed=0):
+    df = pd.read_csv(DATASET).sample(n=n, random_state=seed)
+    return df[EXPECTED_FEATURES].to_dict(orient='records')
+
+
+def base_record():
+    return sample_records(n=1)[0]
+
+
+@pytest.mark.parametrize("record", sample_records())
+def test_matches_pandas_preprocessing(record):
+    expected = pandas_preprocessing(record).to_numpy(dtype=np.float64)
+    np.testing.assert_array_equal(preprocessing(record), expected)
+
+
+@pytest.mark.parametrize("overrides", [
+    {"housing": "for free"},                      # Category dropped by drop_first: no one-hot column
+    {"purpose": "car (new)"},                     # Category never seen in training
+    {"guarantors": "co-applicant", "property": "unk. / no property"},
+    {"age": 18.5, "credit_amount": 0, "duration": 72},
+    {"sex": "female", "job": "unemployed/unskilled non-resident", "savings": ">1000 DM"},
+])
+def test_matches_pandas_preprocessing_edge_cases(overrides):
+    record = {**base_record(), **overrides}
+    expected = pandas_preprocessing(record).to_numpy(dtype=np.float64)
+    np.testing.assert_array_equal(preprocessing(record), expected)
+
+
+def test_batch_matches_single_rows():
+    records = sample_records(n=50, seed=1)
+    batch = preprocessing_batch(records)
+    assert batch.shape == (50, len(TRAINED_FEATURES))
+    np.testing.assert_array_equal(batch, np.vstack([preprocessing(record) for record in records]))
+
+
+def test_float32_output():
+    records = sample_records(n=50, seed=2)
+    batch = preprocessing_batch(records, dtype=np.float32)
+    assert batch.dtype == np.float32
+    np.testing.assert_array_equal(batch, preprocessing_batch(records))
+    assert preprocessing(records[0], dtype=np.float32).dtype == np.float32
+
+
+def test_invalid_ordinal_value():
+    record = {**base_record(), "savings": "lots"}
+    with pytest.raises(ValueError):
+        pandas_preprocessing(record)
+    with pytest.raises(ValueError):
+        preprocessing(record)
+
+
+def test_missing_feature():
+    record = base_record()
+    del record["purpose"]
+    with pytest.raises(KeyError):
+        pandas_preprocessing(record)
+    with pytest.raises(KeyError):
+        preprocessing(record)
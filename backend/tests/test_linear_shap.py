@@ -0,0 +1,97 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import shap
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+from utils.helper import EXPECTED_FEATURES, TRAINED_FEATURES, preprocessing_batch
+from utils.linear_shap import LogisticRegressionExplainer
+
+DATASET = os.path.join(os.path.dirname(__file__), '..', 'data', 'syntetic_sample.csv')
+
+# Largest per-feature gap allowed between the 'probability' approximation and the permutation
+# explainer it replaced (run to 4000 evaluations); the values themselves reach about 0.4
+PROBABILITY_TOLERANCE = 0.03
+
+
+@pytest.fixture(scope='module')
+def pipeline():
+    """Scaler + logistic regression trained like the saved model, with a 100-row background"""
+    df = pd.read_csv(DATASET)
+    X = pd.DataFrame(preprocessing_batch(df[EXPECTED_FEATURES].to_dict(orient='records')), columns=TRAINED_FEATURES)
+    scaler = StandardScaler().fit(X)
+    model = LogisticRegression(max_iter=1000).fit(scaler.transform(X), df['risk'])
+    masker = X.sample(n=100, random_state=0).to_numpy()
+    return model, scaler, masker, X
+
+
+def samples(X, n=5):
+    return X.sample(n=n, random_state=1).to_numpy()
+
+
+def permutation_shap(model, scaler, masker, sample):
+    """The generic explainer the closed form replaced (probability of class 1)"""
+    def model_predict_proba_wrapper(data):
+        return model.predict_proba(scaler.transform(pd.DataFrame(data, columns=scaler.feature_names_in_)))
+
+    np.random.seed(42)
+    explainer = shap.Explainer(model_predict_proba_wrapper, masker)
+    explanation = explainer(sample.reshape(1, -1), max_evals=4000)
+    return explanation.values[0, :, 1], explanation.base_values[0, 1]
+
+
+def test_log_odds_is_exact(pipeline):
+    model, scaler, masker, X = pipeline
+    explainer = LogisticRegressionExplainer(model, scaler, masker, output='log_odds')
+    reference = shap.explainers.Linear(model, scaler.transform(masker))
+
+    X_test = samples(X)
+    values, base_values = explainer.shap_values(X_test)
+    np.testing.assert_allclose(values, reference.shap_values(scaler.transform(X_test)), atol=1e-10)
+    np.testing.assert_allclose(base_values + values.sum(axis=1), model.decision_function(scaler.transform(X_test)))
+
+
+def test_log_odds_is_the_default(pipeline):
+    model, scaler, masker, _ = pipeline
+    assert LogisticRegressionExplainer(model, scaler, masker).output == 'log_odds'
+
+
+@pytest.mark.parametrize('with_mean,with_std', [(False, True), (True, False), (False, False)])
+def test_log_odds_respects_scaler_options(pipeline, with_mean, with_std):
+    _, _, masker, X = pipeline
+    y = pd.read_csv(DATASET)['risk']
+    scaler = StandardScaler(with_mean=with_mean, with_std=with_std).fit(X)
+    model = LogisticRegression(max_iter=1000).fit(scaler.transform(X), y)
+    explainer = LogisticRegressionExplainer(model, scaler, masker, output='log_odds')
+
+    X_test = samples(X)
+    values, base_values = explainer.shap_values(X_test)
+    np.testing.assert_allclose(base_values + values.sum(axis=1), model.decision_function(scaler.transform(X_test)))
+
+
+def test_probability_adds_up_to_predict_proba(pipeline):
+    model, scaler, masker, X = pipeline
+    explainer = LogisticRegressionExplainer(model, scaler, masker, output='probability')
+
+    X_test = X.to_numpy()[:500]
+    values, base_values = explainer.shap_values(X_test)
+    expected = model.predict_proba(scaler.transform(pd.DataFrame(X_test, columns=TRAINED_FEATURES)))[:, 1]
+    np.testing.assert_allclose(base_values + values.sum(axis=1), expected, atol=1e-12)
+
+
+def test_probability_matches_permutation_explainer(pipeline):
+    model, scaler, masker, X = pipeline
+    explainer = LogisticRegressionExplainer(model, scaler, masker, output='probability')
+
+    for sample in samples(X, n=10):
+        expected_values, expected_base = permutation_shap(model, scaler, masker, sample)
+        values, base_values = explainer.shap_values(sample)
+        assert base_values[0] == pytest.approx(expected_base, abs=1e-12)
+        np.testing.assert_allclose(values[0], expected_values, atol=PROBABILITY_TOLERANCE)
+
+
+def test_unknown_output_space(pipeline):
+    model, scaler, masker, _ = pipeline
+    with pytest.raises(ValueError):
+        LogisticRegressionExplainer(model, scaler, masker, output='margin')
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import pytest
+from utils import model_downloader
+from utils.model_downloader import LocalSource, download_models
+
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    source_dir, saved_dir = tmp_path / "source", tmp_path / "saved_models"
+    source_dir.mkdir()
+    saved_dir.mkdir()
+    monkeypatch.setattr(model_downloader, 'SAVED_MODELS_DIR', saved_dir)
+    monkeypatch.setattr(model_downloader, 'MODEL_MANIFEST', None)
+    monkeypatch.setattr(model_downloader, 'DOWNLOAD_RETRIES', 1)
+    return source_dir, saved_dir
+
+
+def publish(source_dir, files, manifest=None):
+    """Write files into the source with a manifest (the real checksums unless overridden)"""
+    entries = {}
+    for name, data in files.items():
+        (source_dir / name).write_bytes(data)
+        entries[name] = {"sha256": hashlib.sha256(data).hexdigest(), "size": len(data)}
+    entries.update(manifest or {})
+    (source_dir / "manifest.json").write_text(json.dumps({"files": entries}))
+
+
+class RecordingSource(LocalSource):
+    """LocalSource that records the offset every fetch starts from"""
+    def __init__(self, root):
+        super().__init__(root)
+        self.offsets = []
+
+    def fetch(self, name, partial_path):
+        self.offsets.append(partial_path.stat().st_size if partial_path.exists() else 0)
+        super().fetch(name, partial_path)
+
+
+def test_resumes_partial_file(dirs):
+    source_dir, saved_dir = dirs
+    data = bytes(range(256)) * 400
+    publish(source_dir, {"a.pkl": data})
+    staging = saved_dir / ".download"
+    staging.mkdir()
+    (staging / "a.pkl.part").write_bytes(data[:30000])
+
+    source = RecordingSource(str(source_dir))
+    assert download_models(["a.pkl"], source=source)
+    assert source.offsets == [30000]
+    assert (saved_dir / "a.pkl").read_bytes() == data
+    assert not staging.exists()
+
+
+def test_checksum_mismatch_keeps_existing_models(dirs):
+    source_dir, saved_dir = dirs
+    publish(source_dir, {"a.pkl": b"tampered"}, manifest={"a.pkl": {"sha256": "0" * 64, "size": 8}})
+    (saved_dir / "a.pkl").write_bytes(b"current model")
+
+    assert not download_models(["a.pkl"], source=LocalSource(f"file://{source_dir}"))
+    assert (saved_dir / "a.pkl").read_bytes() == b"current model"
+    assert not (saved_dir / ".download" / "a.pkl.part").exists()  # Corrupt bytes are not resumed
+
+
+def test_one_failure_swaps_in_nothing(dirs):
+    source_dir, saved_dir = dirs
+    publish(source_dir, {"a.pkl": b"new a"})
+    (saved_dir / "a.pkl").write_bytes(b"old a")
+
+    assert not download_models(["a.pkl", "b.pkl"], source=LocalSource(str(source_dir)))
+    assert (saved_dir / "a.pkl").read_bytes() == b"old a"
+    assert not (saved_dir / "b.pkl").exists()
+    assert (saved_dir / ".download" / "a.pkl.part").read_bytes() == b"new a"  # Kept for the next attempt
+
+    publish(source_dir, {"a.pkl": b"new a", "b.pkl": b"new b"})
+    assert download_models(["a.pkl", "b.pkl"], source=LocalSource(str(source_dir)))
+    assert (saved_dir / "a.pkl").read_bytes() == b"new a"
+    assert (saved_dir / "b.pkl").read_bytes() == b"new b"
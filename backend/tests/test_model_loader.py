@@ -0,0 +1,54 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from utils import model_loader as loader_module
+from utils.model_loader import ModelLoader
+
+
+@pytest.fixture
+def model_paths(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 4))
+    y = (X[:, 0] > 0).astype(int)
+    model = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+    path = tmp_path / "random_forest.pkl"
+    joblib.dump({"model": model, "metrics": {}, "shap": {}}, path)
+    return {'random-forest': str(path)}
+
+
+@pytest.fixture
+def pickle_calls(monkeypatch):
+    calls = []
+    original = loader_module.pickled_size
+
+    def counting(*objects):
+        calls.append(len([obj for obj in objects if obj is not None]))
+        return original(*objects)
+
+    monkeypatch.setattr(loader_module, 'pickled_size', counting)
+    return calls
+
+
+def test_eager_loading_does_not_measure(model_paths, pickle_calls):
+    loader = ModelLoader(model_paths, strategy='eager')
+    loader.get_explainer('random-forest')
+    assert pickle_calls == []
+
+    sizes = loader.memory_stats()["models_mb"]
+    assert sizes['random-forest'] > 0
+    loader.memory_stats()
+    assert len(pickle_calls) == 2  # Model parts and explainer, once each
+
+
+def test_budget_counts_the_explainer_once(model_paths, pickle_calls):
+    loader = ModelLoader(model_paths, strategy='lru', memory_budget_mb=100)
+    entry = loader.get_entry('random-forest')
+    assert len(pickle_calls) == 1
+    model_bytes = entry.measure()
+
+    loader.get_explainer('random-forest')
+    assert len(pickle_calls) == 2
+    assert entry.measure() > model_bytes
+    loader.memory_stats()
+    assert len(pickle_calls) == 2
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+from utils.linear_shap import LogisticRegressionExplainer
+from utils.reason_codes import explain_batch, iter_reason_codes, top_k_reasons
+
+FEATURES = [f"f{i}" for i in range(6)]
+
+
+class LinearLoader:
+    """Loader serving one logistic regression explainer set to the slow 'probability' output"""
+    def __init__(self):
+        rng = np.random.default_rng(0)
+        X = pd.DataFrame(rng.normal(size=(300, len(FEATURES))), columns=FEATURES)
+        y = (X["f0"] - X["f1"] > 0).astype(int)
+        scaler = StandardScaler().fit(X)
+        self.model = LogisticRegression().fit(scaler.transform(X), y)
+        self.explainer = LogisticRegressionExplainer(self.model, scaler, X.to_numpy()[:50], output='probability')
+        self.scaler = scaler
+        self.X = X.to_numpy()
+        self.model_paths = {'logistic-regression': 'logistic_regression.pkl'}
+
+    def get_explainer(self, name):
+        return self.explainer
+
+
+@pytest.mark.parametrize('top_k', [0, -3])
+def test_top_k_below_one_is_rejected(top_k):
+    values = np.array([[-1.0, 0.5, -0.2]])
+    with pytest.raises(ValueError):
+        top_k_reasons(values, values, top_k=top_k, feature_names=["a", "b", "c"])
+    with pytest.raises(ValueError):
+        next(iter_reason_codes(LinearLoader(), 'logistic-regression', values, top_k=top_k))
+
+
+def test_top_k_reasons_order_and_direction():
+    values = np.array([[-1.0, 0.5, -0.2, -3.0]])
+    reasons = top_k_reasons(values, values, top_k=3, feature_names=["a", "b", "c", "d"])
+    assert [reason["feature"] for reason in reasons[0]] == ["d", "a", "c"]
+
+
+def test_logistic_regression_batch_uses_exact_log_odds():
+    loader = LinearLoader()
+    X = loader.X[:1000]
+    values, base_values, probabilities = explain_batch(loader, 'logistic-regression', X)
+
+    expected, _ = loader.explainer.shap_values(X, output='log_odds')
+    np.testing.assert_array_equal(values, expected)
+    margin = loader.model.decision_function(loader.scaler.transform(pd.DataFrame(X, columns=FEATURES)))
+    np.testing.assert_allclose(base_values + values.sum(axis=1), margin)
+    np.testing.assert_allclose(probabilities, 1 / (1 + np.exp(-margin)))
@@ -0,0 +1,47 @@
+import threading
+import numpy as np
+import pandas as pd
+from sklearn.neural_network import MLPClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from utils.shap import build_mlp_explainer, explain_mlp
+
+
+def mlp_pipeline():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(300, 12)), columns=[f"f{i}" for i in range(12)])
+    y = (X["f0"] + X["f1"] * X["f2"] > 0).astype(int)
+    model = Pipeline([("scaler", StandardScaler()), ("mlp", MLPClassifier(hidden_layer_sizes=(8,), max_iter=300, random_state=0))])
+    model.fit(X, y)
+    return model, X.to_numpy()
+
+
+def test_concurrent_mlp_explanations_match_serial():
+    model, X = mlp_pipeline()
+    explainer = build_mlp_explainer(model, X[:50])
+    samples = X[100:108]
+    serial = [explain_mlp(model, explainer, sample).values for sample in samples]
+
+    results = [None] * len(samples)
+    barrier = threading.Barrier(len(samples))
+
+    def run(i):
+        barrier.wait()
+        results[i] = explain_mlp(model, explainer, samples[i]).values
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(samples))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for expected, values in zip(serial, results):
+        np.testing.assert_array_equal(values, expected)
+
+
+def test_reseeding_elsewhere_does_not_change_mlp_explanations():
+    model, X = mlp_pipeline()
+    explainer = build_mlp_explainer(model, X[:50])
+    expected = explain_mlp(model, explainer, X[100]).values
+    np.random.seed(7)
+    np.random.random(100)
+    np.testing.assert_array_equal(explain_mlp(model, explainer, X[100]).values, expected)
@@ -0,0 +1,48 @@
+import numpy as np
+from utils.warmup import WarmupState, warm_up
+
+
+class FixedModel:
+    classes_ = np.array([0, 1])
+
+    def predict_proba(self, data):
+        return np.tile([0.3, 0.7], (len(data), 1))
+
+
+class Entry:
+    def __init__(self):
+        self.model = FixedModel()
+        self.scaler = None
+
+
+class LazyLoader:
+    """Loads a model on get_entry, like the lazy/LRU strategies"""
+    def __init__(self, loaded=()):
+        self.model_paths = {name: f"{name}.pkl" for name in ('random-forest', 'xg-boost', 'mlp')}
+        self.loaded = list(loaded)
+
+    def get_loaded_models(self):
+        return list(self.loaded)
+
+    def get_entry(self, name, with_explainer=False):
+        if name not in self.loaded:
+            self.loaded.append(name)
+        if with_explainer:
+            raise ValueError("no explainer in this test")
+        return Entry()
+
+
+def test_warm_up_does_not_load_models():
+    loader = LazyLoader()
+    state = warm_up(loader, WarmupState(), render=False)
+    assert state.ready
+    assert loader.get_loaded_models() == []
+    assert "predict" not in state.timings_ms
+
+
+def test_warm_up_predicts_only_loaded_models():
+    loader = LazyLoader(loaded=['xg-boost'])
+    state = warm_up(loader, WarmupState(), render=False)
+    assert loader.get_loaded_models() == ['xg-boost']
+    assert "predict" in state.timings_ms and "predict" not in state.errors
+    assert list(state.errors) == ['explainer:xg-boost']
@@ -0,0 +1,180 @@
+"""Split model artifacts: fast-start alternative to the single joblib bundle.
+
+A bundle `saved_models/<name>.pkl` ({model, metrics, shap, scaler}) can be
+split into a directory `saved_models/<name>/` with one file per component:
+
+    manifest.json               format version, generation, model format and file names
+    model.<gen>.ubj | .joblib   XGBoost in its native UBJSON format, sklearn models
+                                as uncompressed joblib (numpy arrays memory-mapped)
+    scaler.<gen>.joblib         optional, memory-mapped as well
+    masker.<gen>.npy            SHAP background data, loaded with mmap_mode='r'
+    metrics.<gen>.json          metrics only
+    <plot_name>.<gen>.png       precomputed SHAP plots as raw images
+
+Memory-mapped arrays are read lazily and their pages are shared by every
+worker process that maps the same file. Running workers keep those files
+mapped, so a save never rewrites them: every component of a new generation
+gets new file names and only the manifest is replaced, atomically. Files of
+older generations are removed once two newer ones exist (a worker that just
+read the previous manifest can still open its files).
+"""
+import base64
+import json
+import os
+import uuid
+import numpy as np
+import joblib
+from .static_plots import SHAP_PLOT_NAMES, StaticPlot
+
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+
+
+def artifact_dir_for(model_path):
+    """Split artifact directory of a bundle path (saved_models/xgboost.pkl -> saved_models/xgboost)"""
+    root, _ = os.path.splitext(model_path)
+    return root
+
+
+def has_artifact(directory):
+    return os.path.exists(os.path.join(directory, MANIFEST_FILE))
+
+
+def _is_xgboost(model):
+    return type(model).__module__.startswith('xgboost')
+
+
+def read_manifest(directory):
+    """Manifest of an artifact directory, or None when there is none (or it is unreadable)"""
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_new(directory, filename, write):
+    """Write a file under a temporary name and move it in place, so no reader sees it half written"""
+    # Keeps the extension: XGBoost picks its save format from it
+    tmp_path = os.path.join(directory, f".tmp-{uuid.uuid4().hex}-{filename}")
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, os.path.join(directory, filename))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return filename
+
+
+def _write_bytes(data):
+    def write(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+    return write
+
+
+def _remove_stale_files(directory, keep):
+    """Remove component files referenced by neither of the kept manifests (and leftover temp files)"""
+    for filename in os.listdir(directory):
+        if filename == MANIFEST_FILE or filename in keep:
+            continue
+        try:
+            os.remove(os.path.join(directory, filename))
+        except OSError:
+            pass
+
+
+def save_artifact(directory, model, metrics=None, shap=None, scaler=None):
+    """
+    Write a model bundle as a new generation of a split artifact directory. Files that
+    running workers may have memory-mapped are never modified (see the module docstring).
+    """
+    os.makedirs(directory, exist_ok=True)
+    shap = dict(shap or {})
+    previous = read_manifest(directory)
+    generation = (previous or {}).get("generation", 0) + 1
+    tag = f"{generation}-{uuid.uuid4().hex[:8]}"
+    manifest = {"format_version": ARTIFACT_FORMAT_VERSION, "generation": generation, "files": {}}
+    files = manifest["files"]
+
+    if _is_xgboost(model):
+        files["model"] = _write_new(directory, f"model.{tag}.ubj", model.save_model)
+        manifest["model_format"] = "xgboost-ubj"
+        manifest["model_class"] = type(model).__name__
+    else:
+        # Uncompressed so the numpy arrays inside can be memory-mapped on load
+        files["model"] = _write_new(directory, f"model.{tag}.joblib", lambda path: joblib.dump(model, path))
+        manifest["model_format"] = "joblib"
+
+    if scaler is not None:
+        files["scaler"] = _write_new(directory, f"scaler.{tag}.joblib", lambda path: joblib.dump(scaler, path))
+
+    masker = shap.pop('masker', None)
+    if masker is not None:
+        def write_masker(path):
+            with open(path, 'wb') as f:
+                np.save(f, np.asarray(masker, dtype=np.float64))
+        files["masker"] = _write_new(directory, f"masker.{tag}.npy", write_masker)
+
+    for plot_name in SHAP_PLOT_NAMES:
+        value = shap.pop(plot_name, None)
+        if not value:
+            continue
+        plot = value if isinstance(value, StaticPlot) else StaticPlot(base64.b64decode(value))
+        files[plot_name] = _write_new(directory, f"{plot_name}.{tag}.{plot.extension}", _write_bytes(plot.data))
+
+    metadata = json.dumps({"metrics": metrics or {}, "shap": shap}, indent=2).encode('utf-8')
+    files["metrics"] = _write_new(directory, f"metrics.{tag}.json", _write_bytes(metadata))
+
+    # The manifest is replaced last and atomically: it only ever points at complete files
+    _write_new(directory, MANIFEST_FILE, _write_bytes(json.dumps(manifest, indent=2).encode('utf-8')))
+
+    keep = set(files.values()) | set((previous or {}).get("files", {}).values())
+    _remove_stale_files(directory, keep)
+
+
+def load_artifact(directory, mmap_mode='r'):
+    """
+    Load a split artifact. Returns the same shape as the joblib bundle
+    ({model, metrics, shap, scaler}) plus "plots" ({plot_name: StaticPlot}).
+    """
+    manifest = read_manifest(directory)
+    if manifest is None:
+        raise FileNotFoundError(f"No readable {MANIFEST_FILE} in {directory}")
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version: {manifest.get('format_version')}")
+    files = manifest["files"]
+
+    def path(component):
+        return os.path.join(directory, files[component])
+
+    if manifest["model_format"] == "xgboost-ubj":
+        import xgboost as xgb
+
+        model = getattr(xgb, manifest.get("model_class", "XGBClassifier"))()
+        model.load_model(path("model"))
+    else:
+        model = joblib.load(path("model"), mmap_mode=mmap_mode)
+
+    with open(path("metrics"), 'r') as f:
+        metadata = json.load(f)
+
+    shap = dict(metadata.get("shap", {}))
+    if "masker" in files:
+        shap["masker"] = np.load(path("masker"), mmap_mode=mmap_mode)
+
+    plots = {}
+    for plot_name in SHAP_PLOT_NAMES:
+        if plot_name in files:
+            with open(path(plot_name), 'rb') as f:
+                plots[plot_name] = StaticPlot(f.read())
+
+    return {
+        "model": model,
+        "metrics": metadata.get("metrics", {}),
+        "shap": shap,
+        "scaler": joblib.load(path("scaler"), mmap_mode=mmap_mode) if "scaler" in files else None,
+        "plots": plots,
+    }
+
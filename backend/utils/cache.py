@@ -0,0 +1,268 @@
+"""Bounded in-process result cache (LRU + TTL) with optional on-disk spill.
+
+Keys are content addresses: a SHA-256 over the model name, the kind of result
+and the encoded feature row, so the same applicant profile always maps to the
+same entry no matter how the JSON payload was written.
+
+The spill directory is bounded too. Each cache keeps a running index of the
+files it spilled, so going over spill_max_files files or spill_max_bytes bytes
+deletes its oldest ones without listing the directory. A full sweep (scan,
+delete expired and leftover temporary files, trim to the limits) runs at
+startup and at most every spill_sweep_interval seconds, which also bounds the
+files other workers sharing the directory wrote. A spilled entry keeps its
+original expiry: the wall-clock deadline is pickled with the value.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(model_name, kind, row, *params):
+    """Content-addressed key for a result computed from one encoded feature row"""
+    digest = hashlib.sha256()
+    digest.update(f"{model_name}|{kind}|{params!r}|".encode('utf-8'))
+    digest.update(np.ascontiguousarray(row, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with a per-entry time to live.
+    When spill_dir is set, entries evicted for size are pickled there and read back on a miss;
+    the directory keeps at most spill_max_files files and spill_max_bytes bytes (oldest deleted first).
+    """
+    def __init__(self, maxsize=1024, ttl=3600, spill_dir=None, spill_max_files=4096, spill_max_bytes=256 * 1024 * 1024,
+                 spill_sweep_interval=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.spill_dir = spill_dir
+        self.spill_max_files = spill_max_files
+        self.spill_max_bytes = spill_max_bytes
+        self.spill_sweep_interval = spill_sweep_interval
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._spilled = OrderedDict()  # path -> size of the files this cache knows about, oldest first
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._spill_files = 0
+        self._spill_bytes = 0
+        self._spill_removed = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._sweep_spilled()
+
+    def get(self, key):
+        """Cached value for key, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+
+        spilled = self._read_spilled(key)
+        with self._lock:
+            if spilled is None:
+                self._misses += 1
+                return None
+            self._disk_hits += 1
+        expires_at_wall, value = spilled
+        # Back in memory with what is left of its original time to live
+        self._store(key, value, time.monotonic() + (expires_at_wall - time.time()))
+        return value
+
+    def set(self, key, value):
+        """Store value under key, evicting the least recently used entries beyond maxsize"""
+        self._store(key, value, time.monotonic() + self.ttl)
+
+    def _store(self, key, value, expires_at):
+        if self.maxsize <= 0:
+            return
+        evicted = []
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                evicted.append(self._entries.popitem(last=False))
+                self._evictions += 1
+        for evicted_key, (evicted_expires_at, evicted_value) in evicted:
+            self._spill(evicted_key, evicted_value, evicted_expires_at)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value or compute, store and return it"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        """Drop every entry (memory and disk)"""
+        with self._lock:
+            self._entries.clear()
+        if self.spill_dir:
+            for name in os.listdir(self.spill_dir):
+                if name.endswith('.pkl'):
+                    _remove(os.path.join(self.spill_dir, name))
+            self._sweep_spilled()
+
+    def reset_lock(self):
+        """New locks after fork (a lock held by another thread at fork time would never be released)"""
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round((self._hits + self._disk_hits) / lookups, 4) if lookups else 0.0,
+                "spill_dir": self.spill_dir,
+                "spill_files": self._spill_files,
+                "spill_bytes": self._spill_bytes,
+                "spill_removed": self._spill_removed,
+            }
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, f"{key}.pkl")
+
+    def _spill(self, key, value, expires_at):
+        if not self.spill_dir or expires_at <= time.monotonic():
+            return
+        path = self._spill_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        expires_at_wall = time.time() + (expires_at - time.monotonic())
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump((expires_at_wall, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            # mtime = when the entry was created, so the sweep expires it on time and deletes oldest first
+            created_at = expires_at_wall - self.ttl
+            os.utime(tmp_path, (created_at, created_at))
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not spill cache entry to disk: {e}")
+            _remove(tmp_path)
+            return
+
+        over_limit = []
+        with self._lock:
+            self._spill_bytes += size - self._spilled.pop(path, 0)
+            self._spilled[path] = size
+            while self._spilled and (len(self._spilled) > self.spill_max_files or self._spill_bytes > self.spill_max_bytes):
+                oldest, oldest_size = self._spilled.popitem(last=False)
+                self._spill_bytes -= oldest_size
+                over_limit.append(oldest)
+            self._spill_files = len(self._spilled)
+            sweep_due = time.monotonic() - self._last_sweep >= self.spill_sweep_interval
+        removed = sum(_remove(oldest) for oldest in over_limit)
+        if removed:
+            with self._lock:
+                self._spill_removed += removed
+        if sweep_due:
+            self._sweep_spilled()
+
+    def _forget_spilled(self, path):
+        """Drop a file read back or deleted outside a sweep from the running index"""
+        with self._lock:
+            size = self._spilled.pop(path, None)
+            if size is not None:
+                self._spill_bytes -= size
+                self._spill_files = len(self._spilled)
+
+    def _sweep_spilled(self):
+        """Delete expired spill files (and leftover temporary ones), then the oldest beyond the limits"""
+        if not self._sweep_lock.acquire(blocking=False):
+            return  # Another thread is sweeping
+        try:
+            self._sweep_directory()
+        finally:
+            self._sweep_lock.release()
+
+    def _sweep_directory(self):
+        now = time.time()
+        files = []
+        removed = 0
+        try:
+            with os.scandir(self.spill_dir) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(('.pkl', '.tmp')):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue  # Read or removed by another thread or worker meanwhile
+                    if now - stat.st_mtime > self.ttl:
+                        removed += _remove(entry.path)
+                    elif entry.name.endswith('.pkl'):
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError as e:
+            logger.warning(f"⚠️ Could not sweep cache spill directory: {e}")
+            return
+
+        files.sort()
+        total_bytes = sum(size for _, size, _ in files)
+        while files and (len(files) > self.spill_max_files or total_bytes > self.spill_max_bytes):
+            _, size, path = files.pop(0)
+            removed += _remove(path)
+            total_bytes -= size
+
+        with self._lock:
+            self._spilled = OrderedDict((path, size) for _, size, path in files)
+            self._spill_files = len(files)
+            self._spill_bytes = total_bytes
+            self._spill_removed += removed
+            self._last_sweep = time.monotonic()
+
+    def _read_spilled(self, key):
+        """(expires_at wall-clock time, value) of a spilled entry that has not expired, or None"""
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(key)
+        try:
+            with open(path, 'rb') as f:
+                expires_at_wall, value = pickle.load(f)
+            os.remove(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ Could not read spilled cache entry: {e}")
+            _remove(path)
+            return None
+        finally:
+            self._forget_spilled(path)
+        if expires_at_wall <= time.time():
+            return None
+        return expires_at_wall, value
+
+
+def _remove(path):
+    """1 when path was deleted, 0 when it was already gone"""
+    try:
+        os.remove(path)
+        return 1
+    except OSError:
+        return 0
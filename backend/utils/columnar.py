@@ -0,0 +1,204 @@
+"""Columnar, typed storage for the analysis dataset.
+
+`data/syntetic_sample.csv` is converted once into a directory
+`data/syntetic_sample.columns/` with one .npy file per column:
+
+    manifest.json      format version, row count, source CSV size/mtime and, per
+                       column, its kind, file, dtype and categories
+    <column>.npy       numeric columns as int64/float64; text columns as integer
+                       codes (-1 = missing) into the manifest's categories
+
+Categories are sorted, so groupby and get_dummies on the loaded Categorical
+columns order their groups exactly as on the CSV's text columns; the order in
+which they first appear in the file is kept as `first_seen` (value_counts
+breaks ties with it).
+
+Columns are opened with mmap_mode='r', so only the columns an analysis asks
+for are read, and their pages are shared by every worker. Numpy only: no
+pyarrow dependency.
+
+    python -m utils.columnar data/syntetic_sample.csv
+"""
+import hashlib
+import json
+import logging
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+CONVERT_CHUNK_SIZE = int(os.environ.get("COLUMNAR_CHUNK_SIZE", 500000))
+
+
+def columnar_dir_for(csv_path):
+    """Columnar directory of a CSV (data/syntetic_sample.csv -> data/syntetic_sample.columns)"""
+    root, _ = os.path.splitext(csv_path)
+    return f"{root}.columns"
+
+
+def _code_dtype(n_categories):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def convert_csv(csv_path, out_dir=None, chunksize=CONVERT_CHUNK_SIZE):
+    """Convert a CSV into the columnar format, reading it in chunks; returns the output directory"""
+    out_dir = out_dir or columnar_dir_for(csv_path)
+    os.makedirs(out_dir, exist_ok=True)
+    stat = os.stat(csv_path)
+
+    parts = {}       # column -> list of per-chunk arrays (numeric values or codes)
+    categories = {}  # text column -> {value: code}, in order of first appearance
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        for name in chunk.columns:
+            series = chunk[name]
+            if name not in parts:
+                parts[name] = []
+                if not pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+                    categories[name] = {}
+            if name in categories:
+                chunk_codes, uniques = pd.factorize(series)
+                mapping = categories[name]
+                lookup = np.array([mapping.setdefault(value, len(mapping)) for value in uniques] + [-1], dtype=np.int64)
+                parts[name].append(lookup[chunk_codes])  # factorize's -1 (missing) hits the trailing -1
+            elif pd.api.types.is_numeric_dtype(series.dtype):
+                parts[name].append(series.to_numpy())
+            else:
+                raise ValueError(f"Column {name} mixes numbers and text across chunks")
+
+    manifest = {"format_version": COLUMNAR_FORMAT_VERSION, "num_rows": 0, "columns": [],
+                "source": {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}}
+    for index, (name, arrays) in enumerate(parts.items()):
+        values = np.concatenate(arrays)
+        filename = f"{index:03d}.npy"  # Column names may not be valid file names
+        column = {"name": name, "file": filename}
+        if name in categories:
+            labels = list(categories[name])  # In order of first appearance
+            order = sorted(range(len(labels)), key=lambda code: labels[code])
+            rank = np.empty(len(labels) + 1, dtype=np.int64)
+            rank[order] = np.arange(len(labels))
+            rank[-1] = -1
+            column["kind"] = "categorical"
+            column["categories"] = [_to_json(labels[code]) for code in order]
+            column["first_seen"] = rank[:-1].tolist()
+            values = rank[values].astype(_code_dtype(len(labels)))
+        else:
+            column["kind"] = "numeric"
+        column["dtype"] = values.dtype.str
+        np.save(os.path.join(out_dir, filename), values)
+        manifest["columns"].append(column)
+        manifest["num_rows"] = len(values)
+
+    # The manifest is written last: a directory without it is an incomplete conversion
+    tmp_path = os.path.join(out_dir, f"{MANIFEST_FILE}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(out_dir, MANIFEST_FILE))
+    logger.info(f"✅ {csv_path} converted to {out_dir} ({manifest['num_rows']} rows, {len(parts)} columns)")
+    return out_dir
+
+
+def _to_json(value):
+    return value.item() if hasattr(value, 'item') else value
+
+
+class ColumnarDataset:
+    """A converted dataset; columns are memory-mapped on first access"""
+    def __init__(self, directory, mmap_mode='r'):
+        self.directory = directory
+        self.mmap_mode = mmap_mode
+        with open(os.path.join(directory, MANIFEST_FILE), 'r') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != COLUMNAR_FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar format version: {self.manifest.get('format_version')}")
+        self._columns = {column["name"]: column for column in self.manifest["columns"]}
+        self._arrays = {}
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    @property
+    def num_rows(self):
+        return self.manifest["num_rows"]
+
+    def is_categorical(self, name):
+        return self._columns[name]["kind"] == "categorical"
+
+    def categories(self, name):
+        """Category labels of a text column (index = code, sorted)"""
+        return self._columns[name].get("categories")
+
+    def first_seen(self, name):
+        """Codes of a text column in the order they first appear in the file"""
+        return self._columns[name].get("first_seen")
+
+    def array(self, name):
+        """Raw column: values of a numeric column, codes of a categorical one (memory-mapped)"""
+        if name not in self._columns:
+            raise KeyError(f"Unknown column: {name}")
+        if name not in self._arrays:
+            path = os.path.join(self.directory, self._columns[name]["file"])
+            self._arrays[name] = np.load(path, mmap_mode=self.mmap_mode)
+        return self._arrays[name]
+
+    def series(self, name):
+        """One column as a pandas Series (text columns as Categorical)"""
+        values = self.array(name)
+        if self.is_categorical(name):
+            values = pd.Categorical.from_codes(np.asarray(values), categories=self.categories(name))
+        return pd.Series(values, name=name)
+
+    def to_frame(self, columns=None):
+        """DataFrame with only the requested columns (all by default), in file order"""
+        columns = self.columns if columns is None else [name for name in self.columns if name in set(columns)]
+        return pd.DataFrame({name: self.series(name) for name in columns})
+
+
+def resolve_dataset(csv_path):
+    """
+    Where to read a dataset from: the columnar manifest when the directory is present
+    and was converted from the current CSV (or the CSV is gone), else the CSV itself.
+    """
+    manifest_path = os.path.join(columnar_dir_for(csv_path), MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return csv_path
+    if os.path.exists(csv_path):
+        with open(manifest_path, 'r') as f:
+            source = json.load(f).get("source", {})
+        stat = os.stat(csv_path)
+        if (source.get("size"), source.get("mtime_ns")) != (stat.st_size, stat.st_mtime_ns):
+            logger.warning(f"⚠️ {columnar_dir_for(csv_path)} is older than {csv_path}; reading the CSV")
+            return csv_path
+    return manifest_path
+
+
+def dataset_version(csv_path):
+    """Short identifier of the current contents of a dataset (changes when the file it is read from changes)"""
+    source = resolve_dataset(csv_path)
+    stat = os.stat(source)
+    return hashlib.sha256(f"{os.path.abspath(source)}|{stat.st_size}|{stat.st_mtime_ns}".encode('utf-8')).hexdigest()[:16]
+
+
+def is_columnar(path):
+    return os.path.basename(path) == MANIFEST_FILE
+
+
+def load_dataset(csv_path, columns=None):
+    """DataFrame of the dataset with only the given columns, from the columnar copy when available"""
+    source = resolve_dataset(csv_path)
+    if is_columnar(source):
+        return ColumnarDataset(os.path.dirname(source)).to_frame(columns)
+    return pd.read_csv(csv_path, usecols=columns)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    for path in sys.argv[1:] or ['data/syntetic_sample.csv']:
+        convert_csv(path)
@@ -0,0 +1,305 @@
+"""Precomputed distributions of the analysis dataset, served by /analyze.
+
+The profile keeps the exact value counts of every column (in order of first
+appearance, like pandas' value_counts), computed in a single pass over the
+file, read ANALYZE_CHUNK_SIZE rows at a time: memory grows with the number of
+distinct values per column, not with the number of rows.
+
+Every /analyze variant is derived from those counts: `top_n` truncates them
+and `include_bins` groups the numeric values into the same 10 equal-width
+bins pd.cut would build (the edges only depend on the min and max), so the
+output matches the DataFrame computation without reading the file again.
+
+Profiles are cached per file and keyed by its size and modification time.
+When the file only grew (rows appended to a CSV), just the new bytes are read
+and merged into the cached counts. A columnar copy of the dataset (see
+utils/columnar.py) is used instead of the CSV when present, one column at a
+time, with text columns counted straight from their codes.
+"""
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from .columnar import ColumnarDataset, is_columnar, resolve_dataset
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_BINS = 10
+ANALYZE_CHUNK_SIZE = int(os.environ.get("ANALYZE_CHUNK_SIZE", 100000))
+# Bytes before the previous end of file compared to tell an append from a rewrite
+TAIL_FINGERPRINT_BYTES = 64 * 1024
+
+# How the installed pandas labels missing values after pd.cut(...).astype(str): 'nan'
+# (counted as a bin) in pandas 2, a real missing value (dropped) in pandas 3
+_NAN_BIN_LABEL = pd.Series([np.nan]).astype(str).iloc[0]
+_MISSING = None  # Key of missing values in the counts
+
+
+class ColumnProfile:
+    """Exact value counts of one column, in order of first appearance"""
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind  # 'i' int, 'f' float, 'O' anything non-numeric
+        self.counts = {}
+        self.mixed = False  # Numbers and text in different chunks (labels are approximate)
+
+    @property
+    def is_numeric(self):
+        return self.kind in ('i', 'f')
+
+    def update(self, series):
+        """Add the values of a chunk of the column, widening the type like a full-file read would"""
+        kind = _column_kind(series)
+        if kind != self.kind:
+            if self.is_numeric and kind in ('i', 'f'):
+                self.kind = 'f'  # Ints and floats mixed: a float column (1 and 1.0 are the same key)
+            else:
+                # Numbers and text mixed: a text column, numbers counted by their label until
+                # the column is counted again from its raw text (see build_profile)
+                self.mixed = True
+                if self.is_numeric:
+                    counts = {}
+                    for value, count in self.counts.items():
+                        key = value if value is _MISSING else _format(value, self.kind)
+                        counts[key] = counts.get(key, 0) + count
+                    self.counts = counts
+                    self.kind = 'O'
+                if kind != 'O':
+                    series = series.map(lambda value: value if pd.isna(value) else _format(value, kind))
+        for value, count in series.value_counts(sort=False, dropna=False).items():
+            key = _MISSING if pd.isna(value) else (value.item() if hasattr(value, 'item') else value)
+            self.counts[key] = self.counts.get(key, 0) + int(count)
+
+    def update_codes(self, codes, categories, first_seen=None):
+        """Add a categorical column given as codes (-1 = missing) into categories, visited in first_seen order"""
+        counts = np.bincount(np.asarray(codes, dtype=np.int64) + 1, minlength=len(categories) + 1).tolist()
+        if counts[0]:
+            self.counts[_MISSING] = self.counts.get(_MISSING, 0) + counts[0]
+        for code in (first_seen if first_seen is not None else range(len(categories))):
+            if counts[code + 1]:
+                key = categories[code]
+                self.counts[key] = self.counts.get(key, 0) + counts[code + 1]
+
+    def distribution(self, top_n=None):
+        """{value: count} like df[col].value_counts() (missing values dropped, ties by first appearance)"""
+        items = [(_format(value, self.kind), count) for value, count in self.counts.items() if value is not _MISSING]
+        return _top(items, top_n)
+
+    def binned_distribution(self, top_n=None, bins=NUMERIC_BINS):
+        """{interval: count} like pd.cut(df[col], bins).astype(str).value_counts()"""
+        values = [value for value in self.counts if value is not _MISSING]
+        if not values:
+            return {}
+        labels = pd.cut(np.asarray(values, dtype=float), bins=bins).astype(str)
+        label_of = dict(zip(values, labels))
+
+        binned = {}
+        for value, count in self.counts.items():
+            label = _NAN_BIN_LABEL if value is _MISSING else label_of[value]
+            if isinstance(label, str):
+                binned[label] = binned.get(label, 0) + count
+        return _top(list(binned.items()), top_n)
+
+
+def _format(value, kind):
+    """Label of a value as str() of the value_counts index would print it"""
+    if kind == 'f':
+        return str(float(value))
+    if kind == 'i':
+        return str(int(value))
+    return str(value)
+
+
+def _top(items, top_n):
+    # Stable sort: equal counts keep their order of first appearance, as in value_counts
+    items.sort(key=lambda item: -item[1])
+    if top_n:
+        items = items[:top_n]
+    return {label: count for label, count in items}
+
+
+def _column_kind(series):
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return 'i'
+    if pd.api.types.is_float_dtype(series.dtype):
+        return 'f'
+    return 'O'
+
+
+class DatasetProfile:
+    """Value counts of every column of a dataset, updated chunk by chunk"""
+    def __init__(self):
+        self.columns = {}  # name -> ColumnProfile, in file order
+        self.total_rows = 0
+        self.source = {}
+        self.generated_at = None
+
+    def update(self, df):
+        """Merge a chunk of rows; returns False when its columns do not match the profile"""
+        if self.columns:
+            if list(df.columns) != list(self.columns):
+                return False
+        else:
+            self.columns = {name: ColumnProfile(name, _column_kind(df[name])) for name in df.columns}
+
+        for name, column in self.columns.items():
+            column.update(df[name])
+        self.total_rows += len(df)
+        self.generated_at = datetime.utcnow().isoformat()
+        return True
+
+    @property
+    def categorical_columns(self):
+        return [name for name, column in self.columns.items() if not column.is_numeric]
+
+    @property
+    def numeric_columns(self):
+        return [name for name, column in self.columns.items() if column.is_numeric]
+
+    def to_dict(self, top_n=None, include_bins=False):
+        """The /analyze response body"""
+        return {
+            "meta": {
+                "total_rows": self.total_rows,
+                "columns_count": len(self.columns),
+                "generated_at": self.generated_at
+            },
+            "categorical_distributions": {
+                name: self.columns[name].distribution(top_n) for name in self.categorical_columns
+            },
+            "numerical": {
+                name: (self.columns[name].binned_distribution(top_n) if include_bins else self.columns[name].distribution(top_n))
+                for name in self.numeric_columns
+            },
+        }
+
+
+def _tail_fingerprint(f, end):
+    """SHA-256 of the bytes just before offset end"""
+    start = max(0, end - TAIL_FINGERPRINT_BYTES)
+    f.seek(start)
+    return hashlib.sha256(f.read(end - start)).hexdigest()
+
+
+def _file_source(path):
+    stat = os.stat(path)
+    with open(path, 'rb') as f:
+        fingerprint = _tail_fingerprint(f, stat.st_size)
+        f.seek(max(0, stat.st_size - 1))
+        ends_with_newline = f.read(1) == b'\n'
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "tail_sha256": fingerprint,
+        "ends_with_newline": ends_with_newline,
+    }
+
+
+def build_profile(path):
+    """Profile of a CSV file or of a columnar manifest, computed in one pass"""
+    profile = DatasetProfile()
+    if is_columnar(path):
+        _update_from_columnar(profile, ColumnarDataset(os.path.dirname(path)))
+    else:
+        for chunk in pd.read_csv(path, chunksize=ANALYZE_CHUNK_SIZE):
+            profile.update(chunk)
+        _recount_mixed_columns(profile, path)
+    profile.source = {**_file_source(path), "path": path}
+    return profile
+
+
+def _recount_mixed_columns(profile, path):
+    """Second pass, as text, over the columns that mixed numbers and text across chunks"""
+    mixed = [name for name, column in profile.columns.items() if column.mixed]
+    if not mixed:
+        return
+    columns = {name: ColumnProfile(name, 'O') for name in mixed}
+    for chunk in pd.read_csv(path, usecols=mixed, dtype=str, chunksize=ANALYZE_CHUNK_SIZE):
+        for name, column in columns.items():
+            column.update(chunk[name])
+    profile.columns.update(columns)
+
+
+def _update_from_columnar(profile, dataset):
+    """Count a columnar dataset column by column (only one column is read at a time)"""
+    for name in dataset.columns:
+        if dataset.is_categorical(name):
+            column = ColumnProfile(name, 'O')
+            column.update_codes(dataset.array(name), dataset.categories(name), dataset.first_seen(name))
+        else:
+            column = ColumnProfile(name, _column_kind(pd.Series(dataset.array(name)[:0])))
+            column.update(pd.Series(dataset.array(name)))
+        profile.columns[name] = column
+    profile.total_rows = dataset.num_rows
+    profile.generated_at = datetime.utcnow().isoformat()
+
+
+def _append_rows(profile, path):
+    """Merge the rows appended to path since the profile was built; False when the file was rewritten"""
+    old = profile.source
+    if not old.get("ends_with_newline"):
+        return False
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size <= old["size"] or _tail_fingerprint(f, old["size"]) != old["tail_sha256"]:
+            return False
+        f.seek(old["size"])
+        total_rows = profile.total_rows
+        for chunk in pd.read_csv(f, header=None, names=list(profile.columns), chunksize=ANALYZE_CHUNK_SIZE):
+            if not profile.update(chunk):
+                return False
+    if any(column.mixed for column in profile.columns.values()):
+        return False  # Needs the text of the old rows too: rebuild
+    profile.source = {**_file_source(path), "path": path}
+    logger.info(f"📊 Profile of {path} updated with {profile.total_rows - total_rows} appended rows")
+    return True
+
+
+class ProfileCache:
+    """Dataset profiles per file, rebuilt (or extended with appended rows) when the file changes"""
+    def __init__(self):
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """Current profile of a dataset; raises FileNotFoundError when it does not exist"""
+        with self._lock:
+            source = resolve_dataset(path)
+            stat = os.stat(source)
+            profile = self._profiles.get(path)
+            if profile is not None and profile.source["path"] == source:
+                if (profile.source["size"], profile.source["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+                    return profile
+
+                if not is_columnar(source) and stat.st_size > profile.source["size"]:
+                    # Work on a copy: a failed merge must not leave a half-updated profile behind
+                    candidate = _copy_profile(profile)
+                    if _append_rows(candidate, source):
+                        self._profiles[path] = candidate
+                        return candidate
+
+            logger.info(f"📊 Building profile of {source}...")
+            profile = build_profile(source)
+            self._profiles[path] = profile
+            return profile
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+    def reset_lock(self):
+        """New lock after fork"""
+        self._lock = threading.Lock()
+
+
+def _copy_profile(profile):
+    copy = DatasetProfile()
+    for name, column in profile.columns.items():
+        copy.columns[name] = ColumnProfile(name, column.kind)
+        copy.columns[name].counts = dict(column.counts)
+    copy.total_rows = profile.total_rows
+    copy.source = dict(profile.source)
+    copy.generated_at = profile.generated_at
+    return copy
@@ -0,0 +1,113 @@
+import os
+import joblib
+import numpy as np
+from .predictor import DEFAULT_THRESHOLD, labels_for, predict_proba_with_models, resolve_thresholds
+
+# mean:    plain average of the good-payer probabilities
+# f1:      average weighted by each model's macro F1 (from the metrics stored with the model)
+# vote:    share of models whose own label is "Bom Pagador" (the client-side majority vote);
+#          a tie (exactly half of the models that answered) is labelled VOTE_TIE_LABEL
+# stacked: meta-model over the four probabilities, loaded from ENSEMBLE_STACKER_PATH
+ENSEMBLE_METHODS = ('mean', 'f1', 'vote', 'stacked')
+
+# Optional joblib file with a fitted classifier (e.g. LogisticRegression) whose input columns are
+# the good-payer probabilities of each model, in model_loader.model_paths order
+ENSEMBLE_STACKER_PATH = os.environ.get("ENSEMBLE_STACKER_PATH")
+
+# Label of a tied vote (2 of 4 models, or 1 of 2 when two failed), whatever the ensemble threshold:
+# approval needs a strict majority, as in the frontend's consensus (good votes > total / 2)
+VOTE_TIE_LABEL = "Mau Pagador"
+
+_stacker = None
+
+
+def get_stacker():
+    """Load the stacking meta-model once"""
+    global _stacker
+    if _stacker is None:
+        if not ENSEMBLE_STACKER_PATH or not os.path.exists(ENSEMBLE_STACKER_PATH):
+            raise ValueError("Stacked ensemble requires ENSEMBLE_STACKER_PATH pointing to a saved meta-model")
+        _stacker = joblib.load(ENSEMBLE_STACKER_PATH)
+    return _stacker
+
+
+def f1_weight(metrics):
+    """Macro F1 of a model from its classification report (1.0 when not available)"""
+    try:
+        return float(metrics['classification_report']['macro avg']['f1-score'])
+    except (KeyError, TypeError, ValueError):
+        return 1.0
+
+
+def model_weights(model_loader, method, model_names):
+    """Weight of every model under the given combination method"""
+    if method == 'f1':
+        return {name: f1_weight(model_loader.get_metrics(name)) for name in model_names}
+    return {name: 1.0 for name in model_names}
+
+
+def combine_probabilities(probabilities, weights, method='mean', thresholds=None):
+    """
+    Combine per-model good-payer probabilities (arrays with one entry per row) into a single score.
+    Models that failed (None) are left out of the combination.
+    """
+    if method not in ENSEMBLE_METHODS:
+        raise ValueError(f"Unknown ensemble method: {method}. Use one of {', '.join(ENSEMBLE_METHODS)}")
+    
+    if method == 'stacked':
+        if any(proba is None for proba in probabilities.values()):
+            raise ValueError("Stacked ensemble requires every model to produce a probability")
+        features = np.column_stack(list(probabilities.values()))
+        stacker = get_stacker()
+        positive_index = list(stacker.classes_).index(1)
+        return stacker.predict_proba(features)[:, positive_index]
+    
+    available = {name: proba for name, proba in probabilities.items() if proba is not None}
+    if not available:
+        raise ValueError("No model produced a prediction")
+    
+    total_weight = sum(weights[name] for name in available)
+    score = 0.0
+    for name, proba in available.items():
+        if method == 'vote':
+            threshold = (thresholds or {}).get(name, DEFAULT_THRESHOLD)
+            proba = (proba > threshold).astype(float)
+        score = score + weights[name] * proba
+    return score / total_weight
+
+
+def ensemble_labels(score, method='mean', threshold=DEFAULT_THRESHOLD):
+    """
+    Final labels of combined scores: "Bom Pagador" above the threshold. For the vote method a tie
+    (a share of exactly 0.5) is always VOTE_TIE_LABEL, so the threshold only moves the other shares.
+    """
+    labels = labels_for(score, threshold)
+    if method == 'vote':
+        tied = np.isclose(score, 0.5)
+        labels = [VOTE_TIE_LABEL if tie else label for label, tie in zip(labels, tied.tolist())]
+    return labels
+
+
+def ensemble_predict(model_loader, input_data, method='mean', threshold=DEFAULT_THRESHOLD, model_thresholds=None, parallel=None):
+    """
+    Score preprocessed rows with every model once and combine them into one ensemble probability.
+    Returns {"probabilities": [...], "predictions": [...], "weights": {...}, "models": {...}} where
+    "models" holds the per-model probabilities the ensemble was built from.
+    """
+    probabilities, timings = predict_proba_with_models(model_loader, input_data, parallel=parallel)
+    weights = model_weights(model_loader, method, probabilities.keys())
+    model_thresholds = resolve_thresholds(probabilities.keys(), model_thresholds)
+    
+    score = combine_probabilities(probabilities, weights, method, model_thresholds)
+    
+    return {
+        "method": method,
+        "threshold": threshold,
+        "weights": weights if method != 'stacked' else None,
+        "probabilities": score.tolist(),
+        "predictions": ensemble_labels(score, method, threshold),
+        "models": {
+            name: None if proba is None else proba.tolist() for name, proba in probabilities.items()
+        },
+        "timings_ms": timings,
+    }
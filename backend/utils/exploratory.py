@@ -1,40 +1,51 @@
 """Utilities to generate exploratory analysis plots and return them as base64 PNGs.
 
 This mirrors the approach used in `backend/utils/shap.py` for SHAP waterfall
-plots: create matplotlib figures, serialize to PNG in-memory, return base64
-strings. The module also provides a CLI-friendly `main()` to save all plots to
-the frontend `public/exploratory` directory.
+plots: draw on explicit matplotlib Figures (no pyplot state, safe in any
+thread or renderer process), serialize in-memory, return the image. Plots are
+served on demand by `/exploratory/<plot_name>`, and the module also provides a
+CLI-friendly `main()` that renders all plots in parallel into the frontend
+`public/exploratory` directory.
 """
 import base64
 import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pandas as pd
 import matplotlib
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import matplotlib.ticker as ticker
 import textwrap
+from .columnar import load_dataset
 
 
 OUT_DIR = Path(__file__).resolve().parents[2] / 'frontend' / 'public' / 'exploratory'
-OUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# Output formats of render_plot and their mimetypes
+PLOT_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+AGE_GROUP_BINS = [18, 25, 32, 45, 55, 60, 100]
+AGE_GROUP_LABELS = ['18-25', '26-32', '33-45', '46-54', '55-60', '60+']
 
-def _fig_to_base64(fig, dpi=300, transparent=True):
+
+def _fig_to_bytes(fig, dpi=300, fmt='png', transparent=True):
     buf = io.BytesIO()
     try:
         fig.patch.set_alpha(0)
     except Exception:
         pass
-    fig.savefig(buf, format='png', bbox_inches='tight', dpi=dpi, pad_inches=0.08, transparent=transparent)
-    buf.seek(0)
-    img_b64 = base64.b64encode(buf.read()).decode('utf-8')
-    plt.close(fig)
-    return img_b64
+    fig.savefig(buf, format=fmt, bbox_inches='tight', dpi=dpi, pad_inches=0.08, transparent=transparent)
+    return buf.getvalue()
 
 
-def generate_secondary_plot(df, group_by, custom_order=None):
-    """Create the bar+line style plot used in exploratory analysis and return base64 PNG."""
+def _fig_to_base64(fig, dpi=300, transparent=True):
+    return base64.b64encode(_fig_to_bytes(fig, dpi, transparent=transparent)).decode('utf-8')
+
+
+def secondary_figure(df, group_by, custom_order=None):
+    """Bar (customers per group) + line (bad risk share) figure used in exploratory analysis."""
     risk_counts = df.groupby([group_by], observed=True)['risk'].value_counts(normalize=True).unstack('risk')
     total_counts = df.groupby([group_by], observed=True)['risk'].count()
 
@@ -42,7 +53,8 @@ def generate_secondary_plot(df, group_by, custom_order=None):
         risk_counts = risk_counts.reindex(custom_order)
         total_counts = total_counts.reindex(custom_order)
 
-    fig, ax = plt.subplots(figsize=(8, 5))
+    fig = Figure(figsize=(8, 5))
+    ax = fig.subplots()
     ax = total_counts.plot(kind='bar', color='#4538FF', ax=ax)
     ax.set_ylabel('# Customers')
     ax.set_xlabel(f'{group_by.capitalize()}')
@@ -60,10 +72,15 @@ def generate_secondary_plot(df, group_by, custom_order=None):
         for i, value in enumerate(risk_counts['bad']):
             ax2.annotate(f'{value:.2f}%', xy=(i, value), xytext=(3, 10), textcoords='offset points', ha='center', va='bottom', fontweight='bold', color='#FF2B80', fontsize=9, bbox=dict(facecolor='white', alpha=0.8, edgecolor='none', boxstyle='round,pad=0.3'))
 
-    return _fig_to_base64(fig)
+    return fig
 
 
-def generate_credit_amount_plot(df):
+def generate_secondary_plot(df, group_by, custom_order=None):
+    """Create the bar+line style plot used in exploratory analysis and return base64 PNG."""
+    return _fig_to_base64(secondary_figure(df, group_by, custom_order))
+
+
+def credit_amount_figure(df):
     df_local = df.copy()
     total_bad_risk = df_local[df_local['risk'] == 'bad'].shape[0]
     df_local['credit_bin'] = pd.cut(df_local['credit_amount'], bins=range(0, int(df_local['credit_amount'].max()) + 750, 750))
@@ -74,7 +91,8 @@ def generate_credit_amount_plot(df):
     credit_bin_plot = pd.merge(bad_risk_in_credit_bin.to_frame(name='bad_risk_in_credit_bin'), bad_risk_percentage.to_frame(name='bad_risk_percentage'), left_index=True, right_index=True, how='inner')
     credit_bin_plot.drop(credit_bin_plot[credit_bin_plot['bad_risk_percentage']==0].index, inplace=True)
 
-    fig, ax1 = plt.subplots(figsize=(10, 6))
+    fig = Figure(figsize=(10, 6))
+    ax1 = fig.subplots()
     credit_bin_plot.index = credit_bin_plot.index.astype(str)
     ax1.plot(credit_bin_plot.index, credit_bin_plot['bad_risk_in_credit_bin'], color='#4538FF', label='Bad Risk Cumulative')
     ax1.set_xlabel('Credit Amount Interval')
@@ -102,12 +120,16 @@ def generate_credit_amount_plot(df):
     lines2, labels2 = ax2.get_legend_handles_labels()
     ax2.legend(lines + lines2, labels + labels2, loc='upper left')
 
-    plt.title('Credit Amount vs. Bad Risk')
-    plt.tight_layout()
-    return _fig_to_base64(fig)
+    ax2.set_title('Credit Amount vs. Bad Risk')  # The twin axes are the current ones, as with plt.title
+    fig.tight_layout()
+    return fig
 
 
-def generate_correlation_matrix(df):
+def generate_credit_amount_plot(df):
+    return _fig_to_base64(credit_amount_figure(df))
+
+
+def correlation_matrix_figure(df):
     df_local = df.copy()
     mappings = {
         'sex': {'female': 0, 'male': 1},
@@ -123,7 +145,8 @@ def generate_correlation_matrix(df):
 
     df_dummies = pd.get_dummies(df_local, dtype=int)
 
-    fig, ax = plt.subplots(figsize=(10, 8))
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots()
     corr = df_dummies.corr()
     im = ax.imshow(corr, cmap='coolwarm', vmin=-1, vmax=1)
     ax.set_xticks(range(len(corr.columns)))
@@ -131,28 +154,64 @@ def generate_correlation_matrix(df):
     ax.set_yticks(range(len(corr.columns)))
     ax.set_yticklabels(corr.columns, fontsize=8)
     fig.colorbar(im, ax=ax, fraction=0.02, pad=0.04)
-    plt.title('Correlation Matrix')
-    plt.tight_layout()
-    return _fig_to_base64(fig)
+    ax.set_title('Correlation Matrix')
+    fig.tight_layout()
+    return fig
+
+
+def generate_correlation_matrix(df):
+    return _fig_to_base64(correlation_matrix_figure(df))
+
+
+# Plot name -> (figure builder, dataset columns it reads; None = every column)
+PLOTS = {
+    'age_distribution': (lambda df: secondary_figure(df, 'age_group'), ['age', 'risk']),
+    'sex_vs_risk': (lambda df: secondary_figure(df, 'sex'), ['sex', 'risk']),
+    'credit_amount_vs_risk': (credit_amount_figure, ['credit_amount', 'risk']),
+    'jobs_vs_risk': (lambda df: secondary_figure(df, 'job'), ['job', 'risk']),
+    'employee_since_vs_risk': (lambda df: secondary_figure(df, 'present_employee_since'), ['present_employee_since', 'risk']),
+    'savings_vs_risk': (lambda df: secondary_figure(df, 'savings'), ['savings', 'risk']),
+    'checking_account_vs_risk': (lambda df: secondary_figure(df, 'checking_account'), ['checking_account', 'risk']),
+    'correlation_matrix': (correlation_matrix_figure, None),
+}
+
+
+def prepare_frame(df):
+    """Map risk to 'bad'/'good' labels and add age_group, as the plots expect"""
+    df = df.copy()
+    df['risk'] = df['risk'].map({0: 'bad', 1: 'good'})
+    if 'age' in df.columns and 'age_group' not in df.columns:
+        df['age_group'] = pd.cut(df['age'], bins=AGE_GROUP_BINS, labels=AGE_GROUP_LABELS)
+    return df
+
+
+def render_plot(plot_name, df, dpi=300, fmt='png'):
+    """Image bytes of one plot from a prepared DataFrame"""
+    if plot_name not in PLOTS:
+        raise ValueError(f"Unknown plot: {plot_name}. Use one of {', '.join(PLOTS)}")
+    if fmt not in PLOT_FORMATS:
+        raise ValueError(f"Unknown format: {fmt}. Use one of {', '.join(PLOT_FORMATS)}")
+    figure_builder, _ = PLOTS[plot_name]
+    return _fig_to_bytes(figure_builder(df), dpi, fmt)
+
+
+def render_plot_from_dataset(dataset_path, plot_name, dpi=300, fmt='png'):
+    """Load only the columns a plot reads and render it (picklable entry point for process pools)"""
+    if plot_name not in PLOTS:
+        raise ValueError(f"Unknown plot: {plot_name}. Use one of {', '.join(PLOTS)}")
+    _, columns = PLOTS[plot_name]
+    # Typed, memory-mapped columnar copy when available (python -m utils.columnar)
+    return render_plot(plot_name, prepare_frame(load_dataset(dataset_path, columns)), dpi, fmt)
 
 
 def generate_all(df):
     """Return dict of name -> base64 PNG for all exploratory plots."""
-    plots = {
-        'age_distribution': generate_secondary_plot(df, 'age_group'),
-        'sex_vs_risk': generate_secondary_plot(df, 'sex'),
-        'credit_amount_vs_risk': generate_credit_amount_plot(df),
-        'jobs_vs_risk': generate_secondary_plot(df, 'job'),
-        'employee_since_vs_risk': generate_secondary_plot(df, 'present_employee_since'),
-        'savings_vs_risk': generate_secondary_plot(df, 'savings'),
-        'checking_account_vs_risk': generate_secondary_plot(df, 'checking_account'),
-        'correlation_matrix': generate_correlation_matrix(df),
-    }
-    return plots
+    return {name: base64.b64encode(render_plot(name, df)).decode('utf-8') for name in PLOTS}
 
 
 def save_all_to_dir(df, out_dir=OUT_DIR):
     """Generate all plots and save them as PNG files into `out_dir`."""
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
     plots = generate_all(df)
     for name, b64 in plots.items():
         path = Path(out_dir) / f"{name}.png"
@@ -161,13 +220,23 @@ def save_all_to_dir(df, out_dir=OUT_DIR):
         print('Saved', path)
 
 
+def render_all_to_dir(dataset_path, out_dir=OUT_DIR, dpi=300, workers=None):
+    """Render every plot in parallel (one process per plot, each reading only its columns) into `out_dir`."""
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=workers or min(len(PLOTS), os.cpu_count() or 1)) as executor:
+        futures = {name: executor.submit(render_plot_from_dataset, str(dataset_path), name, dpi) for name in PLOTS}
+        for name, future in futures.items():
+            path = Path(out_dir) / f"{name}.png"
+            with open(path, 'wb') as f:
+                f.write(future.result())
+            print('Saved', path)
+
+
 def main():
-    csv_path = Path(__file__).resolve().parents[2] / 'data' / 'syntetic_sample.csv'
-    df = pd.read_csv(csv_path)
-    df['risk'] = df['risk'].map({0: 'bad', 1: 'good'})
-    if 'age_group' not in df.columns:
-        df['age_group'] = pd.cut(df['age'], bins=[18,25,32,45,55,60,100], labels=['18-25','26-32','33-45','46-54','55-60','60+'])
-    save_all_to_dir(df, OUT_DIR)
+    # Same dataset as the app's /analyze (ANALYZE_DATASET), else backend/data/syntetic_sample.csv
+    default_csv = os.environ.get("ANALYZE_DATASET") or Path(__file__).resolve().parents[1] / 'data' / 'syntetic_sample.csv'
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else default_csv
+    render_all_to_dir(csv_path, OUT_DIR)
 
 
 if __name__ == '__main__':
@@ -1,4 +1,4 @@
-import pandas as pd
+import numpy as np
 mappings = {
     'sex': {
         'female': 0,
@@ -59,19 +59,85 @@ TRAINED_FEATURES = [
     'other_installment_plans_none', 'other_installment_plans_stores'
 ]
 
-def preprocessing(input_data):
-    print("Preprocessing input data...")
-    data_df = pd.DataFrame([input_data])[EXPECTED_FEATURES]
+class FeatureEncoder:
+    """
+    Precompiled encoder from raw applicant dicts to the TRAINED_FEATURES matrix.
+    Every ordinal, numeric and one-hot input is resolved once to a fixed column index,
+    so encoding a request only writes values into a preallocated NumPy block.
+    """
+    def __init__(self, mappings, expected_features, trained_features, dtype=np.float64):
+        self.feature_names = list(trained_features)
+        self.dtype = dtype
+        column_index = {col: i for i, col in enumerate(self.feature_names)}
 
-    for feature, mapping in mappings.items():
-        data_df[feature] = data_df[feature].map(mapping).astype(int)
+        self._ordinal = []   # (feature, column, mapping)
+        self._numeric = []   # (feature, column)
+        self._one_hot = []   # (feature, {category: column})
+        for feature in expected_features:
+            if feature in mappings:
+                self._ordinal.append((feature, column_index[feature], mappings[feature]))
+            elif feature in column_index:
+                self._numeric.append((feature, column_index[feature]))
+            else:
+                prefix = f"{feature}_"
+                categories = {
+                    col[len(prefix):]: i for col, i in column_index.items() if col.startswith(prefix)
+                }
+                self._one_hot.append((feature, categories))
 
-    # TODO: Refactor dummies to use OneHotEncoder
-    data_dummies_df = pd.get_dummies(data_df, dtype=int)
-    for col in TRAINED_FEATURES:
-        if col not in data_dummies_df:
-            data_dummies_df[col] = 0
+    @property
+    def n_features(self):
+        return len(self.feature_names)
 
-    data_dummies_df = data_dummies_df[TRAINED_FEATURES]
-    
-    return data_dummies_df
\ No newline at end of file
+    def transform(self, records, out=None, dtype=None):
+        """Encode a list of applicant dicts into an (n_records, n_features) array (dtype defaults to the encoder's)"""
+        n = len(records)
+        if out is None:
+            out = np.zeros((n, self.n_features), dtype=dtype or self.dtype)
+        else:
+            if out.shape != (n, self.n_features):
+                raise ValueError(f"Output block must have shape {(n, self.n_features)}, got {out.shape}")
+            out.fill(0)
+
+        for feature, column, mapping in self._ordinal:
+            values = self._column_values(records, feature)
+            try:
+                out[:, column] = [mapping[value] for value in values]
+            except KeyError as e:
+                raise ValueError(f"Invalid value {e.args[0]!r} for feature '{feature}'")
+
+        for feature, column in self._numeric:
+            out[:, column] = self._column_values(records, feature)
+
+        rows = np.arange(n)
+        for feature, categories in self._one_hot:
+            values = self._column_values(records, feature)
+            columns = np.fromiter(
+                (categories.get(value if isinstance(value, str) else str(value), -1) for value in values),
+                dtype=np.intp,
+                count=n
+            )
+            known = columns >= 0
+            out[rows[known], columns[known]] = 1
+
+        return out
+
+    @staticmethod
+    def _column_values(records, feature):
+        try:
+            return [record[feature] for record in records]
+        except KeyError:
+            raise KeyError(f"Missing feature '{feature}' in input data")
+
+
+feature_encoder = FeatureEncoder(mappings, EXPECTED_FEATURES, TRAINED_FEATURES)
+
+def preprocessing_batch(records, out=None, dtype=None):
+    """
+    Preprocess a list of applicant dicts into a single feature matrix (one row per applicant).
+    float64 by default; pass dtype=np.float32 for a half-size block.
+    """
+    return feature_encoder.transform(list(records), out=out, dtype=dtype)
+
+def preprocessing(input_data, dtype=None):
+    return feature_encoder.transform([input_data], dtype=dtype)
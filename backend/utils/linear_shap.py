@@ -0,0 +1,100 @@
+"""SHAP values for the StandardScaler + LogisticRegression model without calling the model.
+
+For a linear model over standardized features the interventional SHAP value of
+feature i in log-odds space is analytic: coef_i * (scaled x_i - mean of scaled
+background_i). The 'log_odds' output (the default) is exactly that: closed
+form, vectorized over rows, microseconds per explanation. It replaces the
+generic permutation explainer, which called predict_proba thousands of times
+per explanation.
+
+The 'probability' output is an approximation, not a closed form (sigmoid is
+not linear). It estimates the interventional values the permutation explainer
+computed on predict_proba by walking fixed feature orders from every
+background row to x and averaging each feature's step in sigmoid(margin): a
+Monte Carlo estimate over 64 orders (a fixed seed, each order used with its
+reverse) that costs about 10 ms per row. Its values add up exactly to
+predict_proba(x) - mean predict_proba(background), but each one is only within
+about 0.03 of the converged permutation explainer (the tolerance pinned in
+tests/test_linear_shap.py). Use it when the waterfall must share the
+probability scale of the other models.
+"""
+import numpy as np
+
+# 'log_odds' gives the exact attributions of the linear model; 'probability' approximates them on
+# predict_proba, adding up to predict_proba(x) - mean predict_proba(background)
+OUTPUT_SPACES = ('log_odds', 'probability')
+
+# Feature orders walked per background row for the 'probability' output (half random, half reversed)
+PROBABILITY_PERMUTATIONS = 64
+
+
+class LogisticRegressionExplainer:
+    """SHAP explainer for a scaler + logistic regression pipeline (exact in log-odds, estimated in probability)"""
+    def __init__(self, trained_model, scaler, masker, output='log_odds', n_permutations=PROBABILITY_PERMUTATIONS, seed=42):
+        if output not in OUTPUT_SPACES:
+            raise ValueError(f"Unknown output space: {output}. Use one of {', '.join(OUTPUT_SPACES)}")
+        self.output = output
+        self.feature_names = list(scaler.feature_names_in_)
+
+        background = np.asarray(masker, dtype=np.float64)
+        # Same steps as StandardScaler.transform: no centering with with_mean=False, no scaling with with_std=False
+        n_features = background.shape[1]
+        mean = scaler.mean_ if getattr(scaler, 'with_mean', True) and scaler.mean_ is not None else np.zeros(n_features)
+        scale = scaler.scale_ if getattr(scaler, 'with_std', True) and scaler.scale_ is not None else np.ones(n_features)
+        positive_index = list(trained_model.classes_).index(1)
+        sign = 1.0 if positive_index == 1 else -1.0
+
+        coef = sign * np.asarray(trained_model.coef_[0], dtype=np.float64)
+        intercept = sign * float(trained_model.intercept_[0])
+
+        # phi_i = coef_i / scale_i * (x_i - background_mean_i): the scaler mean cancels out
+        self._weights = coef / scale
+        self._background = background
+        self._background_mean = background.mean(axis=0)
+        self.expected_log_odds = intercept + float(np.dot(coef, ((self._background_mean - mean) / scale)))
+        self._intercept = intercept - float(np.dot(coef, mean / scale))
+
+        self._background_log_odds = background @ self._weights + self._intercept
+        self._background_probability = _sigmoid(self._background_log_odds)
+        self.expected_probability = float(np.mean(self._background_probability))
+
+        rng = np.random.default_rng(seed)
+        orders = np.array([rng.permutation(len(self._weights)) for _ in range(max(1, n_permutations // 2))])
+        self._orders = np.concatenate([orders, orders[:, ::-1]])
+        self._positions = np.argsort(self._orders, axis=1)  # Step at which each feature joins, per order
+
+    def log_odds(self, X):
+        """Model margin (log-odds of a good payer) for every row of X"""
+        return np.asarray(X, dtype=np.float64) @ self._weights + self._intercept
+
+    def shap_values(self, X, output=None):
+        """
+        SHAP values and base values for every row of X (unscaled TRAINED_FEATURES matrix).
+        Returns (values with shape (n_rows, n_features), base_values with shape (n_rows,)).
+        """
+        output = output or self.output
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        n_rows = X.shape[0]
+
+        if output == 'log_odds':
+            return (X - self._background_mean) * self._weights, np.full(n_rows, self.expected_log_odds)
+
+        values = np.empty_like(X)
+        for row, x in enumerate(X):
+            values[row] = self._probability_values(x)
+        return values, np.full(n_rows, self.expected_probability)
+
+    def _probability_values(self, x):
+        """Mean step in predict_proba of every feature, along every order from every background row"""
+        deltas = (x - self._background) * self._weights  # (background, features) margin changes
+        margins = self._background_log_odds[:, None, None] + np.cumsum(deltas[:, self._orders], axis=2)
+        probabilities = _sigmoid(margins)
+        steps = np.diff(probabilities, axis=2, prepend=np.broadcast_to(
+            self._background_probability[:, None, None], (len(self._background), len(self._orders), 1)
+        ))
+        positions = np.broadcast_to(self._positions, steps.shape)
+        return np.take_along_axis(steps, positions, axis=2).mean(axis=(0, 1))
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
@@ -1,162 +1,304 @@
 """
-Utility to download saved models from Google Drive
+Utility to download saved models from Google Drive (or another model source)
 Used by the Flask app to ensure models are available at startup
+
+Files are fetched in parallel into saved_models/.download/, resumed from where a
+previous attempt stopped, verified against a SHA-256 manifest and only then moved
+into saved_models/ with os.replace, so a failed download never leaves a
+half-written model behind.
+
+Sources (MODEL_SOURCE):
+    gdrive:<folder_id>             Google Drive folder (default, needs gdown)
+    https://host/path/             HTTP(S) base URL, resumed with Range requests
+    file:///path/to/dir or a path  local directory (useful for tests and mounted volumes)
+
+Manifest (MODEL_MANIFEST, default saved_models/manifest.json or manifest.json at the source):
+    {"files": {"xgboost.pkl": {"sha256": "<hex>", "size": 123456}, ...}}
+Generate it next to trained models with: python -m utils.model_downloader --write-manifest
 """
 
+import hashlib
+import json
 import os
 import sys
+import shutil
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import logging
-import shutil
+from .artifacts import artifact_dir_for, has_artifact
+from .model_loader import DEFAULT_MODEL_PATHS
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def download_models_from_gdrive():
+GDRIVE_FOLDER_ID = '1JsWol8h8m6f_mjFfOcJkz784FGC178vb'
+MODEL_SOURCE = os.environ.get("MODEL_SOURCE", f"gdrive:{GDRIVE_FOLDER_ID}")
+MODEL_MANIFEST = os.environ.get("MODEL_MANIFEST")
+DOWNLOAD_WORKERS = int(os.environ.get("DOWNLOAD_WORKERS", 4))
+DOWNLOAD_RETRIES = int(os.environ.get("DOWNLOAD_RETRIES", 3))
+# Hash every model on startup (otherwise only sizes are checked against the manifest)
+VERIFY_MODEL_CHECKSUMS = os.environ.get("VERIFY_MODEL_CHECKSUMS", "false").lower() == "true"
+
+REQUIRED_MODELS = [os.path.basename(path) for path in DEFAULT_MODEL_PATHS.values()]
+SAVED_MODELS_DIR = Path(__file__).parent.parent / 'saved_models'  # Go up one level to backend/saved_models
+MANIFEST_FILE = 'manifest.json'
+CHUNK_SIZE = 1024 * 1024
+
+
+class ChecksumError(Exception):
+    """A downloaded file does not match the manifest"""
+
+
+def sha256_of(path):
+    """SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def verify_file(path, expected):
+    """Check a file against its manifest entry ({"sha256", "size"}); raises ChecksumError"""
+    size = os.path.getsize(path)
+    if expected.get("size") is not None and size != expected["size"]:
+        raise ChecksumError(f"{os.path.basename(path)}: size {size} != {expected['size']}")
+    if expected.get("sha256") and sha256_of(path) != expected["sha256"]:
+        raise ChecksumError(f"{os.path.basename(path)}: SHA-256 mismatch")
+
+
+class LocalSource:
+    """Model files in a local directory (also file:// URLs)"""
+    def __init__(self, root):
+        self.root = Path(root[len("file://"):] if root.startswith("file://") else root)
+
+    def read_manifest(self):
+        path = self.root / MANIFEST_FILE
+        if path.exists():
+            with open(path, 'r') as f:
+                return json.load(f)
+        return None
+
+    def fetch(self, name, partial_path):
+        """Append the missing bytes of name to partial_path (resumes an interrupted copy)"""
+        offset = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+        if offset > os.path.getsize(self.root / name):
+            offset = 0  # Left over from a different file: start over
+            os.remove(partial_path)
+        with open(self.root / name, 'rb') as src, open(partial_path, 'ab') as dst:
+            src.seek(offset)
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+
+class HttpSource:
+    """Model files under an HTTP(S) base URL; interrupted downloads resume with a Range request"""
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.timeout = timeout
+
+    def read_manifest(self):
+        try:
+            with urllib.request.urlopen(self.base_url + MANIFEST_FILE, timeout=self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+
+    def fetch(self, name, partial_path):
+        offset = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+        request = urllib.request.Request(self.base_url + name)
+        if offset:
+            request.add_header('Range', f'bytes={offset}-')
+        try:
+            response = urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 416:  # Range not satisfiable: the partial file is already complete
+                return
+            raise
+        with response:
+            # 206: the server honoured the range; 200: it sent the whole file, start over
+            mode = 'ab' if offset and response.status == 206 else 'wb'
+            with open(partial_path, mode) as dst:
+                shutil.copyfileobj(response, dst, CHUNK_SIZE)
+
+
+class GDriveSource:
+    """Files of a Google Drive folder, listed once and downloaded one by one with gdown"""
+    def __init__(self, folder_id):
+        try:
+            import gdown
+        except ImportError:
+            raise ImportError("gdown not installed. Please add gdown to requirements.txt")
+
+        self.gdown = gdown
+        self.folder_id = folder_id
+        self._files = None
+
+    def _list(self):
+        if self._files is None:
+            folder_url = f"https://drive.google.com/drive/folders/{self.folder_id}"
+            logger.info(f"📁 Listing folder: {folder_url}")
+            listing = self.gdown.download_folder(folder_url, skip_download=True, quiet=True, use_cookies=False)
+            self._files = {os.path.basename(item.path): item.id for item in listing or []}
+        return self._files
+
+    def read_manifest(self):
+        if MANIFEST_FILE not in self._list():
+            return None
+        path = SAVED_MODELS_DIR / '.download' / MANIFEST_FILE
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.gdown.download(id=self._list()[MANIFEST_FILE], output=str(path), quiet=True, use_cookies=False)
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def fetch(self, name, partial_path):
+        if name not in self._list():
+            raise FileNotFoundError(f"{name} not found in the Google Drive folder")
+        # gdown keeps its own temporary file next to the output and resumes it
+        self.gdown.download(id=self._list()[name], output=str(partial_path), quiet=True, use_cookies=False, resume=True)
+
+
+def get_source(source=None):
+    """Model source for a MODEL_SOURCE string"""
+    source = source or MODEL_SOURCE
+    if source.startswith("gdrive:"):
+        return GDriveSource(source[len("gdrive:"):])
+    if source.startswith(("http://", "https://")):
+        return HttpSource(source)
+    return LocalSource(source)
+
+
+def load_manifest(source=None):
+    """Expected checksums: MODEL_MANIFEST, else saved_models/manifest.json, else the source's manifest"""
+    candidates = [MODEL_MANIFEST] if MODEL_MANIFEST else [str(SAVED_MODELS_DIR / MANIFEST_FILE)]
+    for path in candidates:
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+    if source is not None:
+        try:
+            return source.read_manifest()
+        except Exception as e:
+            logger.warning(f"⚠️  Could not read the source manifest: {e}")
+    return None
+
+
+def _download_one(source, name, staging_dir, expected):
+    """Fetch one file into the staging directory, retrying (and resuming) on failure"""
+    partial_path = staging_dir / f"{name}.part"
+    for attempt in range(1, DOWNLOAD_RETRIES + 1):
+        try:
+            source.fetch(name, partial_path)
+            if expected:
+                verify_file(partial_path, expected)
+            logger.info(f"✅ Downloaded {name} ({partial_path.stat().st_size / (1024*1024):.1f}MB)")
+            return partial_path
+        except ChecksumError as e:
+            # Corrupt rather than incomplete: resuming would keep the bad bytes
+            logger.warning(f"⚠️  {e} (attempt {attempt}/{DOWNLOAD_RETRIES})")
+            partial_path.unlink(missing_ok=True)
+        except Exception as e:
+            logger.warning(f"⚠️  Download of {name} failed: {e} (attempt {attempt}/{DOWNLOAD_RETRIES})")
+        if attempt < DOWNLOAD_RETRIES:
+            time.sleep(min(2 ** attempt, 30))
+    raise RuntimeError(f"Could not download {name}")
+
+
+def download_models(names=None, source=None):
     """
-    Download models and data folder from Google Drive if any files are missing locally
+    Download the given model files (default: the missing ones) in parallel, verify them
+    and move them into saved_models/ only when every file succeeded. Returns True on success.
     """
-    try:
-        import gdown
-    except ImportError:
-        logger.error("gdown not installed. Please add gdown to requirements.txt")
-        return False
-    
-    FOLDER_ID = '1JsWol8h8m6f_mjFfOcJkz784FGC178vb'
-    
-    if FOLDER_ID.startswith('YOUR_'):
-        logger.warning("⚠️  Please update the Google Drive folder ID in utils/model_downloader.py")
-        return False
-    
-    # Get the directory where this script is located
-    current_dir = Path(__file__).parent
-    saved_models_dir = current_dir.parent / 'saved_models'  # Go up one level to backend/saved_models
-    
-    # Create saved_models directory if it doesn't exist
-    saved_models_dir.mkdir(exist_ok=True)
-    
-    # Check if all models exist and are valid
-    required_models = [
-        'logistic_regression.pkl',
-        'mlp.pkl', 
-        'random_forest.pkl',
-        'xgboost.pkl'
-    ]
-    
-    # Check if synthetic sample data exists
-    # data_dir = current_dir.parent / 'data'
-    # data_dir.mkdir(exist_ok=True)
-    # synthetic_sample_path = data_dir / 'syntetic_sample.csv'
-    
-    missing_models = []
-    for model in required_models:
-        model_path = saved_models_dir / model
-        if not model_path.exists() or model_path.stat().st_size < 1024 * 1024:  # Less than 1MB
-            missing_models.append(model)
-    
-    missing_data = []
-    # if not synthetic_sample_path.exists() or synthetic_sample_path.stat().st_size < 1024:  # Less than 1KB
-    #     missing_data.append('syntetic_sample.csv')
-    
-    if not missing_models and not missing_data:
+    names = names if names is not None else check_models_available()[1]
+    if not names:
         logger.info("✅ All models and data already present locally!")
         return True
-    
-    logger.info(f"📥 Missing models: {missing_models}")
-    # logger.info(f"📥 Missing data: {missing_data}")
-    logger.info("🚀 Downloading models and data folder from Google Drive...")
-    
+
+    staging_dir = SAVED_MODELS_DIR / '.download'
+    staging_dir.mkdir(parents=True, exist_ok=True)
     try:
-        # Create a temporary directory for the download
-        temp_dir = current_dir.parent / 'temp_models'
-        temp_dir.mkdir(exist_ok=True)
-        
-        # Download the entire folder
-        folder_url = f"https://drive.google.com/drive/folders/{FOLDER_ID}"
-        logger.info(f"📁 Downloading folder from: {folder_url}")
-        
-        # Use gdown to download the folder
-        gdown.download_folder(folder_url, output=str(temp_dir), quiet=False, use_cookies=False)
-        
-        # Move downloaded files to appropriate directories
-        downloaded_pkl_files = list(temp_dir.rglob('*.pkl'))
-        # downloaded_csv_files = list(temp_dir.rglob('*.csv'))
-        
-        logger.info(f"📦 Found {len(downloaded_pkl_files)} .pkl files in downloaded folder")
-        
-        moved_models = 0
-        # moved_data = 0
-        
-        # Move model files
-        for pkl_file in downloaded_pkl_files:
-            filename = pkl_file.name
-            destination = saved_models_dir / filename
-            
-            # Only move files that are in our required list
-            if filename in required_models:
-                shutil.move(str(pkl_file), str(destination))
-                logger.info(f"✅ Moved model {filename} ({destination.stat().st_size / (1024*1024):.1f}MB)")
-                moved_models += 1
-            else:
-                logger.info(f"ℹ️  Skipping {filename} (not in required models)")
-        
-        # Move data files
-        # for csv_file in downloaded_csv_files:
-        #     filename = csv_file.name
-        #     if filename == 'syntetic_sample.csv':
-        #         destination = data_dir / filename
-        #         shutil.move(str(csv_file), str(destination))
-        #         logger.info(f"✅ Moved data {filename} ({destination.stat().st_size / (1024*1024):.1f}MB)")
-        #         moved_data += 1
-        #     else:
-        #         logger.info(f"ℹ️  Skipping {filename} (not required data file)")
-        
-        # Clean up temporary directory
-        shutil.rmtree(temp_dir, ignore_errors=True)
-        
-        total_moved = moved_models
-        if total_moved > 0:
-            logger.info(f"🎉 Successfully downloaded {moved_models} models!")
-        else:
-            logger.warning("⚠️  No files were downloaded. Check your folder ID and folder structure.")
-            
-        return True
-        
+        if source is None or isinstance(source, str):
+            source = get_source(source)
+        manifest_data = load_manifest(source) or {}
+        manifest = manifest_data.get("files", {})
+        if not manifest:
+            logger.warning("⚠️  No model manifest: downloads will not be checksum-verified")
+
+        logger.info(f"📥 Downloading {len(names)} model file(s) with {DOWNLOAD_WORKERS} workers...")
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+            futures = {name: executor.submit(_download_one, source, name, staging_dir, manifest.get(name)) for name in names}
+            downloaded = {name: future.result() for name, future in futures.items()}
     except Exception as e:
-        logger.error(f"❌ Error downloading models folder: {e}")
-        # Clean up temporary directory on error
-        temp_dir = current_dir.parent / 'temp_models'
-        if temp_dir.exists():
-            shutil.rmtree(temp_dir, ignore_errors=True)
+        # Partial files stay in the staging directory so the next attempt resumes them
+        logger.error(f"❌ Error downloading models: {e}")
         return False
 
+    # Every file is complete and verified: swap them in (os.replace is atomic per file)
+    for name, partial_path in downloaded.items():
+        os.replace(partial_path, SAVED_MODELS_DIR / name)
+    if manifest and not (SAVED_MODELS_DIR / MANIFEST_FILE).exists():
+        # Keep the manifest so startup checks can validate the files later
+        with open(SAVED_MODELS_DIR / MANIFEST_FILE, 'w') as f:
+            json.dump(manifest_data, f, indent=2)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    logger.info(f"🎉 Successfully downloaded {len(downloaded)} models!")
+    return True
+
+
+def download_models_from_gdrive():
+    """
+    Download models from the configured source (Google Drive by default) if any files are missing locally
+    """
+    return download_models(source=MODEL_SOURCE)
+
+
 def check_models_available():
     """
     Check if all required models and data are available
     """
-    current_dir = Path(__file__).parent
-    saved_models_dir = current_dir.parent / 'saved_models'  # Go up one level to backend/saved_models
-    # data_dir = current_dir.parent / 'data'
-    
-    required_models = [
-        'logistic_regression.pkl',
-        'mlp.pkl', 
-        'random_forest.pkl',
-        'xgboost.pkl'
-    ]
-    
+    manifest = (load_manifest() or {}).get("files", {})
+
     missing_models = []
-    for model in required_models:
-        model_path = saved_models_dir / model
-        if not model_path.exists() or model_path.stat().st_size < 1024 * 1024:  # Less than 1MB
+    for model in REQUIRED_MODELS:
+        model_path = SAVED_MODELS_DIR / model
+        # A split artifact directory (saved_models/<name>/manifest.json) replaces the .pkl
+        if has_artifact(artifact_dir_for(str(model_path))):
+            continue
+        if not model_path.exists():
             missing_models.append(model)
-    
-    missing_data = []
-    # synthetic_sample_path = data_dir / 'syntetic_sample.csv'
-    # if not synthetic_sample_path.exists() or synthetic_sample_path.stat().st_size < 1024:  # Less than 1KB
-        # missing_data.append('syntetic_sample.csv')
-    
-    all_missing = missing_models + missing_data
-    return len(all_missing) == 0, all_missing
+        elif model in manifest:
+            expected = manifest[model] if VERIFY_MODEL_CHECKSUMS else {"size": manifest[model].get("size")}
+            try:
+                verify_file(model_path, expected)
+            except ChecksumError as e:
+                logger.warning(f"⚠️  {e}")
+                missing_models.append(model)
+        elif model_path.stat().st_size < 1024 * 1024:  # Less than 1MB
+            missing_models.append(model)
+
+    return len(missing_models) == 0, missing_models
+
+
+def write_manifest(directory=SAVED_MODELS_DIR):
+    """Write manifest.json with the size and SHA-256 of every required model in directory"""
+    directory = Path(directory)
+    files = {}
+    for model in REQUIRED_MODELS:
+        path = directory / model
+        if path.exists():
+            files[model] = {"sha256": sha256_of(path), "size": path.stat().st_size}
+    with open(directory / MANIFEST_FILE, 'w') as f:
+        json.dump({"files": files}, f, indent=2)
+    logger.info(f"✅ Manifest with {len(files)} files written to {directory / MANIFEST_FILE}")
+
 
+if __name__ == "__main__":
+    if "--write-manifest" in sys.argv[1:]:
+        write_manifest()
+    else:
+        download_models()
@@ -1,107 +1,437 @@
 import joblib
 import os
+import gc
 import json
+import pickle
+import threading
+import time
+from collections import OrderedDict
 from typing import Dict, Optional
 import logging
+from .artifacts import artifact_dir_for, has_artifact, load_artifact
+from .static_plots import PLOTS_DIR, load_plot_files, pop_base64_plots
 
 logger = logging.getLogger(__name__)
 
+# Model name -> saved model file, relative to the backend directory
+DEFAULT_MODEL_PATHS = {
+    "logistic-regression": "saved_models/logistic_regression.pkl",
+    "random-forest": "saved_models/random_forest.pkl",
+    "xg-boost": "saved_models/xgboost.pkl",
+    "mlp": "saved_models/mlp.pkl",
+}
+
+# Load the split artifact directory (saved_models/<name>/, see utils/artifacts.py) instead of
+# the .pkl bundle when one exists: memory-mapped arrays, native XGBoost format, faster start
+USE_SPLIT_ARTIFACTS = os.environ.get("USE_SPLIT_ARTIFACTS", "true").lower() == "true"
+
+# eager: every model loaded at startup and kept (default)
+# lazy:  each model loaded on first use and kept until unloaded
+# lru:   loaded on first use; least recently used models are unloaded to stay within
+#        MODEL_MEMORY_BUDGET_MB (the model being served is never evicted)
+LOADING_STRATEGIES = ('eager', 'lazy', 'lru')
+MODEL_LOADING_STRATEGY = os.environ.get("MODEL_LOADING_STRATEGY", "eager")
+MODEL_MEMORY_BUDGET_MB = float(os.environ.get("MODEL_MEMORY_BUDGET_MB", 0)) or None
+
+
+class _ByteCounter:
+    """File-like sink that only counts what pickle writes to it"""
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        # Large buffers arrive as PickleBuffer/memoryview objects, not bytes
+        self.size += memoryview(data).nbytes
+
+
+def pickled_size(*objects):
+    """Size of the pickled form of objects, each shared object counted once; raises when one is unpicklable"""
+    counter = _ByteCounter()
+    pickle.dump(tuple(obj for obj in objects if obj is not None), counter, protocol=pickle.HIGHEST_PROTOCOL)
+    return counter.size
+
+
+def measure_bytes(*objects):
+    """Approximate memory footprint of loaded objects: the size of their pickled form (0 when unpicklable)"""
+    try:
+        return pickled_size(*objects)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not measure model size: {e}")
+        return 0
+
+
+class ModelEntry:
+    """
+    Everything held in memory for one loaded model. Entries are never modified once
+    published (apart from building the explainer): a reload publishes a new entry, and
+    requests holding the old one finish on it. Sizes are measured only when asked for
+    (memory budget, /memory), each part once.
+    """
+    __slots__ = ('model', 'scaler', 'shap', 'explainer', 'version', 'metrics', 'plots', '_model_bytes', '_explainer_bytes')
+
+    def __init__(self, model, scaler=None, shap=None, version=1, metrics=None, plots=None):
+        self.model = model
+        self.scaler = scaler
+        self.shap = shap or {}
+        self.explainer = None
+        self.version = version
+        self.metrics = metrics
+        self.plots = plots or {}
+        self._model_bytes = None
+        self._explainer_bytes = None
+
+    def measure(self):
+        """Approximate footprint in bytes: model, scaler and masker, plus the explainer once built"""
+        if self._model_bytes is None:
+            self._model_bytes = measure_bytes(self.model, self.scaler, self.shap.get('masker'))
+        if self.explainer is not None and self._explainer_bytes is None:
+            try:
+                # TreeExplainer keeps its own copy of the trees
+                self._explainer_bytes = pickled_size(self.explainer)
+            except Exception:
+                # Not picklable (the MLP's wraps a local function); it holds little beyond the model and masker
+                self._explainer_bytes = 0
+        return self._model_bytes + (self._explainer_bytes or 0)
+
+
 class ModelLoader:
     """
-    Eager loading system for models - loads all models at startup
-    Optimized for environments with sufficient memory (2GB+)
+    Model cache with a configurable loading strategy (see LOADING_STRATEGIES).
+    Metrics and SHAP plots are always available; models, scalers, maskers and
+    explainers are loaded per model under a lock, so concurrent requests never
+    load the same model twice, and can be unloaded to free memory.
     """
-    def __init__(self, model_paths: Dict[str, str]):
+    def __init__(self, model_paths: Dict[str, str], strategy: Optional[str] = None, memory_budget_mb: Optional[float] = None):
+        strategy = strategy or MODEL_LOADING_STRATEGY
+        if strategy not in LOADING_STRATEGIES:
+            raise ValueError(f"Unknown loading strategy: {strategy}. Use one of {', '.join(LOADING_STRATEGIES)}")
         self.model_paths = model_paths
+        self.strategy = strategy
+        budget_mb = memory_budget_mb if memory_budget_mb is not None else MODEL_MEMORY_BUDGET_MB
+        self.memory_budget_bytes = int(budget_mb * 1024 * 1024) if strategy == 'lru' and budget_mb else None
         self.base_dir = os.path.dirname(__file__)
-        self._models = {}
+        self._entries = OrderedDict()  # name -> ModelEntry, least recently used first
         self._metrics = {}
-        self._shap = {}
-        self._scalers = {}
-        
-        # Load all models immediately
-        logger.info("🔄 Loading all models eagerly...")
-        self._load_all_models()
-        logger.info(f"✅ All {len(self._models)} models loaded successfully!")
-    
+        self._plots = {}
+        self._metadata_shap = {}
+        self._errors = {}
+        self._evictions = 0
+        self._versions = {name: 1 for name in model_paths}  # Bumped by every reload
+        self._reloads = {}
+        self._cache_lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in model_paths}
+        self._explainer_locks = {name: threading.Lock() for name in model_paths}
+
+        # Lightweight metadata (metrics, SHAP plots) for every model, without loading it
+        self._load_all_metadata()
+
+        if strategy == 'eager':
+            # Load all models immediately
+            logger.info("🔄 Loading all models eagerly...")
+            self._load_all_models()
+            logger.info(f"✅ All {len(self._entries)} models loaded successfully!")
+        else:
+            budget = f" (budget {budget_mb:.0f}MB)" if self.memory_budget_bytes else ""
+            logger.info(f"💤 Models will be loaded on first use ({strategy} strategy{budget})")
+
+    def _load_all_metadata(self):
+        """Load metrics and plots from the metadata files"""
+        for name in self.model_paths.keys():
+            metadata_path = os.path.join(self.base_dir, '..', f'metadata/{name}_metadata.json')
+            metadata = {}
+            if os.path.exists(metadata_path):
+                try:
+                    with open(metadata_path, 'r') as f:
+                        metadata = json.load(f)
+                except Exception as e:
+                    logger.error(f"❌ Error loading metadata for {name}: {e}")
+            self._metrics[name] = metadata.get('metrics', {})
+            self._metadata_shap[name] = metadata.get('shap', {})
+            self._plots[name] = self._load_plots(name, self._metadata_shap[name])
+
     def _load_all_models(self):
         """Load all models at startup"""
-        for name, path in self.model_paths.items():
+        for name in self.model_paths.keys():
             try:
-                full_path = os.path.join(self.base_dir, '..', path)
-                logger.info(f"🔄 Loading model {name}...")
-                
-                data = joblib.load(full_path)
-                self._models[name] = data['model']
-                
-                # Load metrics
-                if 'metrics' in data:
-                    self._metrics[name] = data['metrics']
-                else:
-                    # Try to load from metadata file
-                    metadata_path = os.path.join(self.base_dir, '..', f'metadata/{name}_metadata.json')
-                    if os.path.exists(metadata_path):
-                        with open(metadata_path, 'r') as f:
-                            metadata = json.load(f)
-                            self._metrics[name] = metadata.get('metrics', {})
-                    else:
-                        self._metrics[name] = {}
-                
-                # Load SHAP data
-                if 'shap' in data:
-                    self._shap[name] = data['shap']
-                else:
-                    # Try to load from metadata file
-                    metadata_path = os.path.join(self.base_dir, '..', f'metadata/{name}_metadata.json')
-                    if os.path.exists(metadata_path):
-                        with open(metadata_path, 'r') as f:
-                            metadata = json.load(f)
-                            self._shap[name] = metadata.get('shap', {})
-                    else:
-                        self._shap[name] = {}
-                
-                # Load scaler if it exists
-                if 'scaler' in data:
-                    self._scalers[name] = data['scaler']
-                
-                logger.info(f"✅ Model {name} loaded successfully")
-                
-            except Exception as e:
-                logger.error(f"❌ Error loading model {name}: {e}")
-                # Create minimal defaults to prevent crashes
-                self._models[name] = None
-                self._metrics[name] = {}
-                self._shap[name] = {}
-    
-    def get_model(self, model_name: str):
-        """Get a model (already loaded)"""
-        if model_name not in self._models:
+                self._ensure_loaded(name)
+            except Exception:
+                pass  # Logged in _load_model; get_model retries and raises
+
+    def _read_model_file(self, full_path: str):
+        """Read a model bundle: the split artifact directory when available, else the .pkl"""
+        artifact_dir = artifact_dir_for(full_path)
+        if USE_SPLIT_ARTIFACTS and has_artifact(artifact_dir):
+            return load_artifact(artifact_dir)
+        return joblib.load(full_path)
+
+    def _load_plots(self, name: str, shap_data: dict, artifact_plots: Optional[dict] = None):
+        """Decode the plots embedded in the SHAP data; split-out plot files take precedence"""
+        plots = pop_base64_plots(shap_data)
+        plots.update(load_plot_files(os.path.join(self.base_dir, '..', PLOTS_DIR), name))
+        plots.update(artifact_plots or {})
+        return plots
+
+    def _load_model(self, name: str, version: int = None):
+        """Read one model bundle from disk into a ModelEntry (not yet published)"""
+        full_path = os.path.join(self.base_dir, '..', self.model_paths[name])
+        logger.info(f"🔄 Loading model {name}...")
+        try:
+            data = self._read_model_file(full_path)
+        except Exception as e:
+            logger.error(f"❌ Error loading model {name}: {e}")
+            self._errors[name] = str(e)
+            raise ValueError(f"Model {name} failed to load")
+
+        shap_data = data.get('shap') or dict(self._metadata_shap.get(name, {}))
+        plots = self._load_plots(name, shap_data, data.get('plots'))
+        entry = ModelEntry(
+            data['model'],
+            data.get('scaler'),
+            shap_data,
+            version=version or self._versions[name],
+            metrics=data.get('metrics'),
+            plots=plots
+        )
+        self._errors.pop(name, None)
+        if self.memory_budget_bytes is not None:
+            # Measured here, outside _cache_lock, before the budget is applied on publish
+            logger.info(f"✅ Model {name} loaded successfully ({entry.measure() / 1024 / 1024:.1f}MB)")
+        else:
+            logger.info(f"✅ Model {name} loaded successfully")
+        return entry
+
+    def _publish(self, name: str, entry: ModelEntry):
+        """Make an entry the one served for name (caller holds _cache_lock)"""
+        # Metrics and plots from the bundle win over the metadata files
+        if entry.metrics:
+            self._metrics[name] = entry.metrics
+        self._plots[name] = {**self._plots.get(name, {}), **entry.plots}
+        self._entries[name] = entry
+        self._entries.move_to_end(name)
+        self._evict_over_budget(keep=name)
+
+    def _ensure_loaded(self, model_name: str) -> ModelEntry:
+        """Return the model entry, loading it (once, even under concurrency) if needed"""
+        if model_name not in self.model_paths:
             raise ValueError(f"Model {model_name} not found")
-        if self._models[model_name] is None:
-            raise ValueError(f"Model {model_name} failed to load")
-        return self._models[model_name]
-    
+
+        with self._cache_lock:
+            entry = self._entries.get(model_name)
+            if entry is not None:
+                self._entries.move_to_end(model_name)
+                return entry
+
+        # Only one thread loads a given model; the others wait and reuse it
+        with self._load_locks[model_name]:
+            with self._cache_lock:
+                entry = self._entries.get(model_name)
+            if entry is None:
+                entry = self._load_model(model_name)
+                with self._cache_lock:
+                    self._publish(model_name, entry)
+            return entry
+
+    def _evict_over_budget(self, keep: str):
+        """Drop least recently used models until the budget is met (caller holds _cache_lock)"""
+        if self.memory_budget_bytes is None:
+            return
+        evicted = []
+        while self._total_bytes() > self.memory_budget_bytes:
+            victim = next((name for name in self._entries if name != keep), None)
+            if victim is None:
+                break  # A single model larger than the budget stays loaded
+            del self._entries[victim]
+            self._evictions += 1
+            evicted.append(victim)
+        if evicted:
+            logger.info(f"🗑️ Evicted {', '.join(evicted)} to stay within the memory budget")
+            gc.collect()
+
+    def _total_bytes(self):
+        return sum(entry.measure() for entry in self._entries.values())
+
+    def get_entry(self, model_name: str, with_explainer: bool = False) -> ModelEntry:
+        """
+        Get the current entry of a model, loading it if necessary. Use it when a request needs
+        several parts (model, scaler, explainer) so they all come from the same version.
+        """
+        entry = self._ensure_loaded(model_name)
+        if with_explainer:
+            self._build_explainer(model_name, entry)
+        return entry
+
+    def get_model(self, model_name: str):
+        """Get a model, loading it if necessary"""
+        return self._ensure_loaded(model_name).model
+
     def get_metrics(self, model_name: str = None):
         """Get metrics for a specific model or all models"""
         if model_name:
             return self._metrics.get(model_name)
         return self._metrics
-    
+
     def get_shap(self, model_name: str):
-        """Get SHAP data for a model"""
-        return self._shap.get(model_name)
-    
+        """Get SHAP data for a model (the masker only while the model is loaded)"""
+        if model_name not in self.model_paths:
+            return None
+        entry = self._entries.get(model_name)
+        return entry.shap if entry is not None else self._metadata_shap.get(model_name, {})
+
+    def get_plot(self, model_name: str, plot_name: str):
+        """Get a precomputed SHAP plot (StaticPlot) or None"""
+        return self._plots.get(model_name, {}).get(plot_name)
+
+    def get_plots(self, model_name: str):
+        """Get every precomputed SHAP plot of a model, or None for an unknown model"""
+        return self._plots.get(model_name)
+
     def get_scaler(self, model_name: str):
-        """Get scaler for a model"""
-        return self._scalers.get(model_name)
-    
+        """Get scaler for a model, loading the model if necessary"""
+        if model_name not in self.model_paths:
+            return None
+        return self._ensure_loaded(model_name).scaler
+
+    def get_explainer(self, model_name: str):
+        """Get the SHAP explainer for a model, building it once on first use"""
+        return self._build_explainer(model_name, self._ensure_loaded(model_name))
+
+    def _build_explainer(self, model_name: str, entry: ModelEntry):
+        """Build the explainer of an entry once (concurrent callers wait and reuse it)"""
+        if entry.explainer is not None:
+            return entry.explainer
+
+        # Only one thread builds a given explainer; the others wait and reuse it
+        with self._explainer_locks[model_name]:
+            if entry.explainer is None:
+                from .shap import build_explainer
+
+                logger.info(f"🔄 Building SHAP explainer for {model_name}...")
+                entry.explainer = build_explainer(
+                    model_name,
+                    entry.model,
+                    entry.shap.get('masker'),
+                    entry.scaler
+                )
+                self._apply_budget_with_explainer(model_name, entry)
+                logger.info(f"✅ SHAP explainer for {model_name} ready")
+            return entry.explainer
+
+    def _apply_budget_with_explainer(self, model_name: str, entry: ModelEntry):
+        """Count the new explainer in the entry's size and re-apply the budget (only when there is one)"""
+        if self.memory_budget_bytes is None:
+            return
+        entry.measure()
+        with self._cache_lock:
+            if self._entries.get(model_name) is entry:
+                self._evict_over_budget(keep=model_name)
+
+    def build_explainers(self):
+        """Build every SHAP explainer of the loaded models up front (failures are logged and skipped)"""
+        for name in self.get_loaded_models():
+            try:
+                self.get_explainer(name)
+            except Exception as e:
+                logger.error(f"❌ Error building SHAP explainer for {name}: {e}")
+
+    def reload_model(self, model_name: str, validate=None):
+        """
+        Load a new version of a model from disk and swap it in atomically (RCU style).
+        The current version keeps serving while the new one is read, validated with
+        validate(model_name, entry) (raising on failure) and gets its explainer built;
+        requests already holding the old entry finish on it. On failure the current
+        version stays in place and the error is raised.
+        Returns {"model", "version", "load_ms", "size_mb"} (size_mb only under a memory budget).
+        """
+        if model_name not in self.model_paths:
+            raise ValueError(f"Model {model_name} not found")
+
+        # Serialized with first loads and unloads of the same model; readers are not blocked
+        with self._load_locks[model_name]:
+            start = time.perf_counter()
+            with self._cache_lock:
+                old = self._entries.get(model_name)
+                version = self._versions[model_name] + 1
+            try:
+                entry = self._load_model(model_name, version=version)
+                if validate is not None:
+                    validate(model_name, entry)
+                if old is None or old.explainer is not None:
+                    # The first request on the new version should not pay for it
+                    self._build_explainer(model_name, entry)
+            except Exception as e:
+                logger.error(f"❌ Reload of {model_name} rejected, keeping the current version: {e}")
+                self._errors[model_name] = f"reload: {e}"
+                raise
+
+            with self._cache_lock:
+                self._versions[model_name] = version
+                self._publish(model_name, entry)
+            self._errors.pop(model_name, None)
+            result = {
+                "model": model_name,
+                "version": version,
+                "load_ms": round((time.perf_counter() - start) * 1000, 2),
+                "size_mb": round(entry.measure() / 1024 / 1024, 2) if self.memory_budget_bytes is not None else None,
+            }
+            self._reloads[model_name] = {**result, "reloaded_at": time.time()}
+
+        del old
+        gc.collect()
+        logger.info(f"🔁 Model {model_name} reloaded (version {version}, {result['load_ms']:.0f}ms)")
+        return result
+
+    def get_version(self, model_name: str):
+        """Version of a model: 1 at startup, incremented by every successful reload"""
+        return self._versions.get(model_name)
+
+    def unload_model(self, model_name: str):
+        """Unload a model (and its scaler, masker and explainer) to free memory"""
+        if model_name not in self.model_paths:
+            raise ValueError(f"Model {model_name} not found")
+        with self._load_locks[model_name]:
+            with self._cache_lock:
+                entry = self._entries.pop(model_name, None)
+        if entry is not None:
+            gc.collect()
+            logger.info(f"🗑️ Unloaded model {model_name}")
+            return True
+        return False
+
+    def unload_all_models(self):
+        """Unload all models to free memory; returns the names that were unloaded"""
+        return [name for name in list(self.model_paths.keys()) if self.unload_model(name)]
+
+    def reset_locks(self):
+        """Recreate every lock after fork (a lock held at fork time is never released in the child)"""
+        self._cache_lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in self.model_paths}
+        self._explainer_locks = {name: threading.Lock() for name in self.model_paths}
+        for entry in list(self._entries.values()):
+            if hasattr(entry.explainer, 'reset_lock'):
+                entry.explainer.reset_lock()
+
     def get_loaded_models(self):
-        """Get list of all loaded models"""
-        return list(self._models.keys())
-    
+        """Get list of currently loaded models (least recently used first)"""
+        with self._cache_lock:
+            return list(self._entries.keys())
+
+    def memory_stats(self):
+        """Loading strategy, budget and the measured size of each loaded model (measured on first call)"""
+        with self._cache_lock:
+            entries = list(self._entries.items())
+        sizes = {name: round(entry.measure() / 1024 / 1024, 2) for name, entry in entries}
+        return {
+            "strategy": self.strategy,
+            "budget_mb": round(self.memory_budget_bytes / 1024 / 1024, 2) if self.memory_budget_bytes else None,
+            "loaded_mb": round(sum(sizes.values()), 2),
+            "models_mb": sizes,
+            "evictions": self._evictions,
+            "versions": dict(self._versions),
+            "reloads": dict(self._reloads),
+            "errors": dict(self._errors),
+        }
+
     @property
     def all_loaded(self) -> bool:
         """Check if all models are loaded"""
-        return len(self._models) == len(self.model_paths) and all(
-            self._models[name] is not None for name in self.model_paths.keys()
-        )
+        return all(name in self._entries for name in self.model_paths.keys())
@@ -0,0 +1,91 @@
+"""Reload models when their files in saved_models/ change.
+
+A daemon thread polls the modification time and size of every model bundle
+(`saved_models/<name>.pkl`) and split artifact manifest
+(`saved_models/<name>/manifest.json`). A change is acted on once the signature
+has been stable for one more poll, so a file still being copied is not read
+half-written; the reload itself goes through ModelLoader.reload_model, which
+validates the new version before swapping it in.
+
+Polling (instead of inotify) needs no extra dependency and works on bind mounts
+and network volumes. Each gunicorn worker runs its own watcher, so every worker
+picks up the new file.
+"""
+import logging
+import os
+import threading
+from .artifacts import MANIFEST_FILE, artifact_dir_for
+
+logger = logging.getLogger(__name__)
+
+
+def file_signature(path):
+    """(mtime_ns, size) of a file, or None when it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ModelWatcher:
+    """Polls the model files every interval seconds and reloads the models whose files changed"""
+    def __init__(self, model_loader, interval=5.0, validate=None):
+        self.model_loader = model_loader
+        self.interval = interval
+        self.validate = validate
+        self._signatures = {}
+        self._pending = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _paths(self, model_name):
+        full_path = os.path.join(self.model_loader.base_dir, '..', self.model_loader.model_paths[model_name])
+        return full_path, os.path.join(artifact_dir_for(full_path), MANIFEST_FILE)
+
+    def _signature(self, model_name):
+        return tuple(file_signature(path) for path in self._paths(model_name))
+
+    def start(self):
+        """Record the current files (no reload for them) and start polling"""
+        self._signatures = {name: self._signature(name) for name in self.model_loader.model_paths}
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"👀 Watching saved models for changes every {self.interval:g}s")
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"❌ Model watcher error: {e}")
+
+    def poll(self):
+        """Check every model once; returns the names that were reloaded"""
+        reloaded = []
+        for name in self.model_loader.model_paths:
+            signature = self._signature(name)
+            if signature == self._signatures.get(name):
+                self._pending.pop(name, None)
+                continue
+            if all(part is None for part in signature):
+                continue  # Deleted (or being replaced): keep serving the loaded version
+            if self._pending.get(name) != signature:
+                # Changed since the last poll: wait until it stops changing
+                self._pending[name] = signature
+                continue
+
+            self._pending.pop(name, None)
+            self._signatures[name] = signature
+            logger.info(f"📦 New file for model {name} detected")
+            try:
+                self.model_loader.reload_model(name, validate=self.validate)
+            except Exception:
+                continue  # Logged by reload_model; a later change is tried again
+            reloaded.append(name)
+        return reloaded
@@ -1,28 +1,204 @@
-def predict_with_models(model_loader, input_data, scalers=None):
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Probability of "Bom Pagador" above which a model labels the applicant as a good payer.
+# 0.5 reproduces model.predict(); override per model with the DECISION_THRESHOLDS env var,
+# e.g. DECISION_THRESHOLDS='{"xg-boost": 0.6, "mlp": 0.55}', or per request via query params.
+DEFAULT_THRESHOLD = 0.5
+DECISION_THRESHOLDS = json.loads(os.environ.get("DECISION_THRESHOLDS", "{}"))
+
+# Concurrent multi-model inference. Random forest and XGBoost release the GIL in native code,
+# so dispatching the four models to a shared pool brings latency close to the slowest model.
+PARALLEL_INFERENCE = os.environ.get("PARALLEL_INFERENCE", "false").lower() == "true"
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", 4))
+
+_inference_executor = None
+_inference_executor_lock = threading.Lock()
+
+
+def get_inference_executor():
+    """Process-wide bounded thread pool shared by every request"""
+    global _inference_executor
+    if _inference_executor is None:
+        with _inference_executor_lock:
+            if _inference_executor is None:
+                _inference_executor = ThreadPoolExecutor(
+                    max_workers=INFERENCE_WORKERS,
+                    thread_name_prefix="inference"
+                )
+    return _inference_executor
+
+
+def shutdown_inference_executor():
+    """Drop the shared pool (it is recreated on next use)"""
+    global _inference_executor
+    with _inference_executor_lock:
+        if _inference_executor is not None:
+            _inference_executor.shutdown(wait=False)
+            _inference_executor = None
+
+
+def reset_inference_executor():
     """
-    Predict using pre-loaded models (eager loading)
+    Forget the pool inherited from a forked parent: its threads do not exist in the child.
+    Called by the gunicorn post_fork hook; the pool is recreated on next use.
     """
+    global _inference_executor, _inference_executor_lock
+    _inference_executor = None
+    _inference_executor_lock = threading.Lock()
+
+
+def resolve_thresholds(model_names, overrides=None):
+    """Merge default, configured and per-request thresholds for every model"""
+    thresholds = {}
+    for name in model_names:
+        threshold = (overrides or {}).get(name, DECISION_THRESHOLDS.get(name, DEFAULT_THRESHOLD))
+        threshold = float(threshold)
+        if not 0.0 <= threshold <= 1.0:
+            raise ValueError(f"Threshold for {name} must be between 0 and 1, got {threshold}")
+        thresholds[name] = threshold
+    return thresholds
+
+
+def label_for(probability, threshold=DEFAULT_THRESHOLD):
+    """Map a good-payer probability to the label used across the API"""
+    return "Bom Pagador" if probability > threshold else "Mau Pagador"
+
+
+def labels_for(probabilities, threshold=DEFAULT_THRESHOLD):
+    """Vectorized label_for over an array of probabilities"""
+    return np.where(probabilities > threshold, "Bom Pagador", "Mau Pagador").tolist()
+
+
+def _positive_class_proba(model, data):
+    """Probability of class 1 (good payer) for every row in data"""
+    proba = model.predict_proba(data)
+    positive_index = list(model.classes_).index(1)
+    return proba[:, positive_index]
+
+
+def _predict_proba_one(model_loader, name, input_data):
+    """Good-payer probabilities of a single model plus its wall time in ms (None on failure)"""
+    start = time.perf_counter()
+    try:
+        # Get the model (already loaded); model and scaler from the same version
+        entry = model_loader.get_entry(name)
+        model = entry.model
+        
+        # For logistic regression, we need to scale the data
+        if name == 'logistic-regression':
+            scaler = entry.scaler
+            if scaler is None:
+                raise ValueError("Scaler is required for logistic regression model")
+            data = scaler.transform(input_data)
+        # For other models (random-forest, xg-boost), no scaling needed
+        else:
+            data = input_data
+        
+        proba = _positive_class_proba(model, data)
+        
+    except Exception as e:
+        print(f"Error predicting with {name}: {e}")
+        proba = None
+    
+    return proba, (time.perf_counter() - start) * 1000
+
+
+def predict_proba_with_models(model_loader, input_data, parallel=None, models=None):
+    """
+    Run predict_proba once per model (every model, or only those named in models) over the
+    preprocessed rows, serially or, when parallel (default PARALLEL_INFERENCE), concurrently
+    on the shared inference pool.
+    Returns ({model_name: array of good-payer probabilities or None}, {model_name: elapsed ms}).
+    """
+    if parallel is None:
+        parallel = PARALLEL_INFERENCE
+    names = list(model_loader.model_paths.keys()) if models is None else list(models)
+    
+    if parallel:
+        executor = get_inference_executor()
+        futures = {
+            name: executor.submit(_predict_proba_one, model_loader, name, input_data)
+            for name in names
+        }
+        outcomes = {name: future.result() for name, future in futures.items()}
+    else:
+        outcomes = {name: _predict_proba_one(model_loader, name, input_data) for name in names}
+    
+    probabilities = {name: proba for name, (proba, _) in outcomes.items()}
+    timings = {name: round(elapsed, 3) for name, (_, elapsed) in outcomes.items()}
+    return probabilities, timings
+
+
+def _describe(probability, threshold, cutoffs=None):
+    """Detailed result for one row of one model"""
+    if probability is None:
+        return {"prediction": "Error", "probability": None, "threshold": threshold}
+    
+    result = {
+        "prediction": label_for(probability, threshold),
+        "probability": probability,
+        "threshold": threshold,
+    }
+    if cutoffs:
+        result["cutoffs"] = {str(cutoff): label_for(probability, cutoff) for cutoff in cutoffs}
+    return result
+
+
+def predict_with_models(model_loader, input_data, scalers=None, thresholds=None, details=False, cutoffs=None, parallel=None):
+    """
+    Predict a single preprocessed row using pre-loaded models (eager loading).
+    By default returns {model_name: label}; with details=True each model also reports its
+    probability, the threshold applied, its inference time and, optionally, the label under
+    every cut-off in cutoffs.
+    """
+    probabilities, timings = predict_proba_with_models(model_loader, input_data, parallel=parallel)
+    thresholds = resolve_thresholds(probabilities.keys(), thresholds)
+    
     results = {}
-    for name in model_loader.model_paths.keys():
-        try:
-            # Get the model (already loaded)
-            model = model_loader.get_model(name)
-            
-            # For logistic regression, we need to scale the data
-            if name == 'logistic-regression':
-                scaler = model_loader.get_scaler(name)
-                if scaler is None:
-                    raise ValueError("Scaler is required for logistic regression model")
-                scaled_data = scaler.transform(input_data)
-                pred = model.predict(scaled_data)[0]
-            # For other models (random-forest, xg-boost), no scaling needed
-            else:
-                pred = model.predict(input_data)[0]
-            
-            results[name] = "Bom Pagador" if pred == 1 else "Mau Pagador"
-            
-        except Exception as e:
-            print(f"Error predicting with {name}: {e}")
-            results[name] = "Error"
-    
-    return results
\ No newline at end of file
+    for name, proba in probabilities.items():
+        probability = None if proba is None else float(proba[0])
+        result = _describe(probability, thresholds[name], cutoffs)
+        result["elapsed_ms"] = timings[name]
+        results[name] = result if details else result["prediction"]
+    
+    return results
+
+
+def predict_batch_with_models(model_loader, input_data, thresholds=None, cutoffs=None, parallel=None):
+    """
+    Predict a whole preprocessed batch with each model in a single vectorized call.
+    Returns {model_name: {"predictions": [...], "probabilities": [...], "threshold": t, "elapsed_ms": ms}}
+    with one entry per row (plus "cutoffs" -> {cutoff: [...]} when cutoffs are given).
+    """
+    probabilities, timings = predict_proba_with_models(model_loader, input_data, parallel=parallel)
+    thresholds = resolve_thresholds(probabilities.keys(), thresholds)
+    
+    results = {}
+    for name, proba in probabilities.items():
+        threshold = thresholds[name]
+        if proba is None:
+            results[name] = {
+                "predictions": ["Error"] * len(input_data),
+                "probabilities": [None] * len(input_data),
+                "threshold": threshold,
+                "elapsed_ms": timings[name],
+            }
+            continue
+        
+        results[name] = {
+            "predictions": labels_for(proba, threshold),
+            "probabilities": proba.tolist(),
+            "threshold": threshold,
+            "elapsed_ms": timings[name],
+        }
+        if cutoffs:
+            results[name]["cutoffs"] = {
+                str(cutoff): labels_for(proba, cutoff) for cutoff in cutoffs
+            }
+    
+    return results
@@ -0,0 +1,107 @@
+"""Dedicated pool of renderer processes for CPU-bound matplotlib work.
+
+Rendering a figure holds the GIL for most of its time, so threads in one
+gunicorn worker cannot render in parallel. Render calls are shipped to a small
+process pool instead; RENDER_PROCESSES=0 renders inline in the calling thread.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+RENDER_PROCESSES = int(os.environ.get("RENDER_PROCESSES", min(4, os.cpu_count() or 1)))
+
+# Modules of the functions rendered in the pool (preloaded by the fork server)
+RENDER_MODULES = ['utils.waterfall', 'utils.exploratory']
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def _noop():
+    return None
+
+
+def _mp_context(at_startup):
+    """
+    fork for the pool created at startup: start_render_pool runs before any request thread
+    exists, and the renderers share the already imported matplotlib/numpy pages with the parent.
+    A pool created later (lazily, or to replace a broken one) is created from a request thread of
+    a multithreaded process, where fork could copy locks held by other threads into the renderers
+    and deadlock them, so it uses forkserver (or spawn) instead.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    if at_startup and "fork" in methods:
+        return multiprocessing.get_context("fork")
+    if "forkserver" in methods:
+        context = multiprocessing.get_context("forkserver")
+        # Import the render functions once in the fork server instead of in every renderer
+        context.set_forkserver_preload(RENDER_MODULES)
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _create_render_pool(at_startup):
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(max_workers=RENDER_PROCESSES, mp_context=_mp_context(at_startup))
+        return _render_pool
+
+
+def get_render_pool():
+    """Process-wide renderer pool (None when rendering inline)"""
+    if RENDER_PROCESSES <= 0:
+        return None
+    pool = _render_pool
+    if pool is None:
+        # Not started at startup, or dropped after a renderer died
+        pool = _create_render_pool(at_startup=False)
+    return pool
+
+
+def start_render_pool():
+    """Create the pool (forked) and launch its processes now rather than on the first request"""
+    if RENDER_PROCESSES > 0:
+        pool = _create_render_pool(at_startup=True)
+        for future in [pool.submit(_noop) for _ in range(RENDER_PROCESSES)]:
+            future.result()
+        logger.info(f"✅ Renderer pool started with {RENDER_PROCESSES} processes")
+
+
+def shutdown_render_pool(pool=None):
+    """Drop the pool, or only the given pool if it is still the current one (it is recreated on next use)"""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is not None and (pool is None or pool is _render_pool):
+            _render_pool.shutdown(wait=False, cancel_futures=True)
+            _render_pool = None
+
+
+def reset_render_pool():
+    """
+    Forget the pool inherited from a forked parent without shutting it down (its processes
+    and management thread belong to the parent). Called by the gunicorn post_fork hook.
+    """
+    global _render_pool, _render_pool_lock
+    _render_pool = None
+    _render_pool_lock = threading.Lock()
+
+
+def render(fn, *args, **kwargs):
+    """Run a picklable render function in the pool and return its result"""
+    pool = get_render_pool()
+    if pool is None:
+        return fn(*args, **kwargs)
+    try:
+        return pool.submit(fn, *args, **kwargs).result()
+    except BrokenProcessPool:
+        # A renderer died (e.g. OOM-killed): drop the pool (the next render starts a new one
+        # through the fork server) and render this one inline
+        logger.warning("⚠️ Renderer pool broken, restarting it")
+        shutdown_render_pool(pool)
+        return fn(*args, **kwargs)
@@ -1,16 +1,19 @@
 import shap
 import base64
-import io
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import random
 import threading
 import logging
+import os
 import warnings
 from .helper import TRAINED_FEATURES
+from .linear_shap import LogisticRegressionExplainer
+from .xgboost_shap import XGBoostExplainer
+from .render_pool import render
+from .waterfall import render_waterfall_png
 
 # Suppress sklearn warnings about feature names
 warnings.filterwarnings('ignore', category=UserWarning, module='sklearn')
@@ -19,58 +22,52 @@ warnings.filterwarnings('ignore', category=UserWarning, module='sklearn')
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Thread lock for matplotlib operations
-matplotlib_lock = threading.Lock()
+# Output space of the logistic regression attributions: 'log_odds' (default, the exact linear
+# attributions) or 'probability' (same scale as the other models' waterfalls, a ~10 ms Monte Carlo
+# approximation described in utils/linear_shap.py)
+LR_SHAP_OUTPUT = os.environ.get("LR_SHAP_OUTPUT", "log_odds")
+
+# The permutation explainer shuffles with the global np.random: seeding and explaining must
+# happen under one lock, or a concurrent request reseeds or consumes the RNG in between
+_rng_lock = threading.RLock()
 
 def set_deterministic_seeds():
     """Set random seeds for deterministic behavior"""
-    np.random.seed(42)
-    random.seed(42)
-    # Note: torch.manual_seed(42) would be needed if using PyTorch models
+    with _rng_lock:
+        np.random.seed(42)
+        random.seed(42)
+        # Note: torch.manual_seed(42) would be needed if using PyTorch models
 
 
-def generate_logistic_regression_waterfall(trained_model, sample, scaler, masker):
-    """Generate waterfall plot for Logistic Regression model"""
-    set_deterministic_seeds()
-    
-    # Convert numpy array to DataFrame for scaling
-    sample_flat = np.array(sample).flatten()
-    sample_df = pd.DataFrame([sample_flat], columns=scaler.feature_names_in_)
-    sample_scaled = scaler.transform(sample_df)
-    
-    # Create a wrapper function that handles scaling internally
-    def model_predict_proba_wrapper(data):
-        """Wrapper function that scales data before prediction"""
-        if isinstance(data, pd.DataFrame):
-            scaled_data = scaler.transform(data)
-        else:
-            # Convert to DataFrame if needed
-            data_df = pd.DataFrame(data, columns=scaler.feature_names_in_)
-            scaled_data = scaler.transform(data_df)
-        return trained_model.predict_proba(scaled_data)
-    
-    # Create explainer using the wrapper function with original data masker
-    explainer = shap.Explainer(model_predict_proba_wrapper, masker)
-    shap_values = explainer(sample_df)  # Use original unscaled data
-    sample_shap_value = shap_values[0, :, 1]  # Get SHAP values for class 1 (positive class)
-    
-    # Create waterfall plot with feature names
-    sample_shap_value_with_names = shap.Explanation(
-        values=sample_shap_value,
-        feature_names=scaler.feature_names_in_,
-        data=sample_flat  # Use original unscaled data for display
-    )
-    shap.plots.waterfall(sample_shap_value_with_names, max_display=10, show=False)
-    
-    return shap_values, sample_shap_value
+def build_logistic_regression_explainer(trained_model, scaler, masker):
+    """Build the linear SHAP explainer for the Logistic Regression model (scaling handled inside)"""
+    return LogisticRegressionExplainer(trained_model, scaler, masker, output=LR_SHAP_OUTPUT)
 
-def generate_mlp_waterfall(trained_model, sample, masker):
-    """Generate waterfall plot for MLP model"""
-    set_deterministic_seeds()
+class SerializedExplainer:
+    """
+    Wraps an explainer whose masker keeps per-call state (shap's Independent masker reuses
+    internal buffers), so one cached instance can be shared safely across request threads.
+    With seeded=True every call reseeds the global RNGs and explains while holding the RNG
+    lock, so the same sample always gets the same values.
+    """
+    def __init__(self, explainer, seeded=False):
+        self.explainer = explainer
+        self.seeded = seeded
+        self._lock = threading.Lock()
     
-    # Convert sample to 2D array
-    sample_2d = np.array(sample).reshape(1, -1)
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            if not self.seeded:
+                return self.explainer(*args, **kwargs)
+            with _rng_lock:
+                set_deterministic_seeds()
+                return self.explainer(*args, **kwargs)
     
+    def reset_lock(self):
+        self._lock = threading.Lock()
+
+def build_mlp_explainer(trained_model, masker):
+    """Build the SHAP explainer for the MLP pipeline"""
     # Create a wrapper function that handles the full pipeline
     def mlp_pipeline_predict_proba(data):
         """Wrapper function that uses the full pipeline"""
@@ -79,15 +76,53 @@ def generate_mlp_waterfall(trained_model, sample, masker):
     # Create masker and explainer using the wrapper function
     masker_array = np.array(masker)
     masker_df = shap.maskers.Independent(masker_array)
-    explainer = shap.Explainer(mlp_pipeline_predict_proba, masker_df)
+    return SerializedExplainer(shap.Explainer(mlp_pipeline_predict_proba, masker_df), seeded=True)
+
+def build_explainer(model_name, trained_model, masker=None, scaler=None):
+    """
+    Build the SHAP explainer for a model. Construction is the expensive part
+    (tree traversal, masker setup), so ModelLoader builds each one once and reuses it.
+    """
+    if model_name == 'logistic-regression':
+        if scaler is None or masker is None:
+            raise ValueError("Scaler and masker are required for the logistic regression explainer")
+        return build_logistic_regression_explainer(trained_model, scaler, masker)
+    elif model_name == 'mlp':
+        if masker is None:
+            raise ValueError("Masker is required for the MLP explainer")
+        return build_mlp_explainer(trained_model, masker)
+    elif model_name == 'random-forest':
+        return shap.Explainer(trained_model)
+    elif model_name == 'xg-boost':
+        # Native pred_contribs: exact TreeSHAP and the prediction in a single booster pass
+        return XGBoostExplainer(trained_model)
+    raise ValueError(f"Unknown model name: {model_name}")
+
+
+def explain_logistic_regression(explainer, sample, scaler):
+    """Compute the SHAP explanation of one sample for the Logistic Regression model"""
+    sample_flat = np.array(sample).flatten()
     
-    # Get SHAP values using original unscaled data
-    set_deterministic_seeds()
-    shap_values = explainer(sample_2d)
+    # Linear attributions (closed form in log-odds): no model calls needed
+    shap_values, base_values = explainer.shap_values(sample_flat)
+    sample_shap_value = shap_values[0]
+    
+    
+    # Explanation with feature names
+    return shap.Explanation(
+        values=sample_shap_value,
+        base_values=base_values[0],
+        feature_names=list(scaler.feature_names_in_),
+        data=sample_flat  # Use original unscaled data for display
+    )
+
+def explain_mlp(trained_model, explainer, sample):
+    """Compute the SHAP explanation of one sample for the MLP model"""
+    # Convert sample to 2D array
+    sample_2d = np.array(sample).reshape(1, -1)
     
-    # Get the actual prediction to ensure consistency
-    proba = trained_model.predict_proba(sample_2d)
-    prob_class_1 = proba[0, 1]
+    # Get SHAP values using original unscaled data (the explainer seeds under its RNG lock)
+    shap_values = explainer(sample_2d)
     
     # Extract SHAP values for class 1
     if len(shap_values.shape) == 3:
@@ -97,233 +132,131 @@ def generate_mlp_waterfall(trained_model, sample, masker):
         sample_shap_value = shap_values.values[0] if hasattr(shap_values, 'values') else shap_values[0]
         base_value = shap_values.base_values[0]
     
-    # Create waterfall plot with feature names
+    # Explanation with feature names
     scaler = trained_model.named_steps['scaler']
-    sample_shap_value_with_names = shap.Explanation(
+    return shap.Explanation(
         values=sample_shap_value,
         base_values=base_value,
-        feature_names=scaler.feature_names_in_,
+        feature_names=list(scaler.feature_names_in_),
         data=sample_2d[0]  # Use flattened data
     )
-    shap.plots.waterfall(sample_shap_value_with_names, max_display=10, show=False)
-    
-    return shap_values, sample_shap_value
 
-def generate_random_forest_waterfall(trained_model, sample):
-    """Generate waterfall plot for Random Forest model"""
+def explain_random_forest(explainer, sample):
+    """Compute the SHAP explanation of one sample for the Random Forest model"""
     set_deterministic_seeds()
     
     # Convert sample to 2D array
     sample_2d = np.array(sample).reshape(1, -1)
     
-    # Create explainer and get SHAP values
-    explainer = shap.Explainer(trained_model)
+    # Get SHAP values
     shap_values = explainer(sample_2d)
-    sample_shap_value = shap_values[:,1]  # Class 1 SHAP values
     
-    # Create waterfall plot with feature names
-    sample_shap_value_with_names = shap.Explanation(
+    # Explanation with feature names
+    return shap.Explanation(
         values=shap_values.values[0,:,1],  # Use the values for class 1
         base_values=shap_values.base_values[0, 1],  # Use the base value for class 1
         feature_names=TRAINED_FEATURES,
         data=np.array(sample).flatten()
     )
-    shap.plots.waterfall(sample_shap_value_with_names, max_display=10, show=False)
-    
-    return shap_values, sample_shap_value
 
-def generate_xgboost_waterfall(trained_model, sample):
-    """Generate waterfall plot for XGBoost model"""
-    set_deterministic_seeds()
-    
-    # Convert sample to 2D array
+def explain_xgboost(explainer, sample):
+    """Compute the SHAP explanation of one sample for the XGBoost model"""
     sample_2d = np.array(sample).reshape(1, -1)
     
-    # Use TreeExplainer for XGBoost (most reliable for tree models)
-    explainer = shap.TreeExplainer(trained_model)
-    shap_values = explainer(sample_2d)
-    
-    # Get the probability prediction to match SHAP values
-    proba = trained_model.predict_proba(sample_2d)
-    prob_class_1 = proba[0, 1]
+    # Probability-space values derived from the same margin that gives the prediction
+    shap_values, base_values = explainer.shap_values(sample_2d)
     
-    # For TreeExplainer, shap_values is typically for the positive class
-    # We need to convert logit-based SHAP values to probability-based
-    if len(shap_values.shape) == 2:
-        # Binary classification - shap_values is for positive class
-        sample_shap_value = shap_values.values[0] if hasattr(shap_values, 'values') else shap_values[0]
-        base_value_logit = explainer.expected_value
-    else:
-        # Multi-class case
-        sample_shap_value = shap_values.values[0, :, 1] if hasattr(shap_values, 'values') else shap_values[0, :, 1]
-        base_value_logit = explainer.expected_value[1]
-    
-    # Convert logit-based base value to probability
-    import math
-    base_value_prob = 1 / (1 + math.exp(-base_value_logit))
-    
-    # Scale SHAP values to match probability space
-    # The sum of SHAP values should equal the difference between prediction and base
-    current_sum = float(np.sum(sample_shap_value))
-    target_sum = prob_class_1 - base_value_prob
-    
-    if abs(current_sum) > 1e-10:  # Avoid division by zero
-        scale_factor = target_sum / current_sum
-        sample_shap_value = sample_shap_value * scale_factor
-    
-    # Create waterfall plot with feature names
-    sample_shap_value_with_names = shap.Explanation(
-        values=sample_shap_value,
-        base_values=base_value_prob,
+    # Explanation with feature names
+    return shap.Explanation(
+        values=shap_values[0],
+        base_values=base_values[0],
         feature_names=TRAINED_FEATURES,
-        data=np.array(sample).flatten()
+        data=sample_2d[0]
     )
-    shap.plots.waterfall(sample_shap_value_with_names, max_display=10, show=False)
+
+def explain_sample(trained_model, sample, model_name, explainer, scaler=None):
+    """
+    Compute the SHAP explanation (class 1) of one preprocessed sample.
+    Returns a single-row shap.Explanation; no matplotlib involved.
+    """
+    if model_name == 'logistic-regression':
+        return explain_logistic_regression(explainer, sample, scaler)
+    elif model_name == 'mlp':
+        return explain_mlp(trained_model, explainer, sample)
+    elif model_name == 'random-forest':
+        return explain_random_forest(explainer, sample)
+    elif model_name == 'xg-boost':
+        return explain_xgboost(explainer, sample)
+    raise ValueError(f"Unknown model name: {model_name}")
+
+def explanation_to_dict(explanation, max_display=None):
+    """
+    JSON-serializable form of an explanation: base value, model output and the per-feature
+    contributions ordered by absolute impact (the same order the waterfall plot uses).
+    With max_display, the remaining features are summed into a single "other features" entry.
+    """
+    values = np.asarray(explanation.values, dtype=float)
+    data = np.asarray(explanation.data, dtype=float)
+    feature_names = list(explanation.feature_names)
+    base_value = float(np.asarray(explanation.base_values, dtype=float).reshape(-1)[0])
+    order = np.argsort(-np.abs(values), kind='stable')
     
-    return shap_values, sample_shap_value
+    contributions = [
+        {"feature": feature_names[i], "value": float(data[i]), "shap_value": float(values[i])}
+        for i in order
+    ]
+    if max_display is not None and len(contributions) > max_display:
+        rest = contributions[max_display - 1:]
+        contributions = contributions[:max_display - 1] + [{
+            "feature": f"{len(rest)} other features",
+            "value": None,
+            "shap_value": float(sum(item["shap_value"] for item in rest)),
+        }]
+    
+    return {
+        "base_value": base_value,
+        "output_value": base_value + float(values.sum()),
+        "contributions": contributions,
+    }
+
+def render_waterfall_plot(explanation, max_display=10):
+    """Render a single-row explanation as a base64 PNG waterfall (drawn in a renderer process)"""
+    png_bytes = render(
+        render_waterfall_png,
+        np.asarray(explanation.values, dtype=float),
+        float(np.asarray(explanation.base_values).reshape(-1)[0]),
+        np.asarray(explanation.data, dtype=float),
+        list(explanation.feature_names),
+        max_display
+    )
+    return base64.b64encode(png_bytes).decode('utf-8')
 
-def generate_waterfall_plot(trained_model, sample, model_name, masker=None, scaler=None):
+def generate_waterfall_plot(trained_model, sample, model_name, explainer, scaler=None, explanation=None):
     """
     Generates a SHAP waterfall plot for the given model and sample.
     Args:
         trained_model: The trained model for which the SHAP values are to be computed.
         sample: A sample of data that has been validated and preprocessed.
         model_name: Name of the model ('logistic-regression', 'mlp', 'random-forest', 'xg-boost')
-        masker: Optional masker for SHAP explainer
+        explainer: Prebuilt SHAP explainer for the model (see build_explainer / ModelLoader.get_explainer)
         scaler: Optional scaler for models that need scaling
+        explanation: Optional precomputed (e.g. cached) explanation of the sample
     """
     logger.info(f"Generating waterfall plot for {model_name}")
     
     try:
-        # Use thread lock for matplotlib operations to prevent segfaults
-        with matplotlib_lock:
-            # Call the appropriate model-specific function
-            if model_name == 'logistic-regression':
-                shap_values, sample_shap_value = generate_logistic_regression_waterfall(trained_model, sample, scaler, masker)
-            elif model_name == 'mlp':
-                shap_values, sample_shap_value = generate_mlp_waterfall(trained_model, sample, masker)
-            elif model_name == 'random-forest':
-                shap_values, sample_shap_value = generate_random_forest_waterfall(trained_model, sample)
-            elif model_name == 'xg-boost':
-                shap_values, sample_shap_value = generate_xgboost_waterfall(trained_model, sample)
-            else:
-                raise ValueError(f"Unknown model name: {model_name}")
-
-            # Convert plot to base64
-            fig = plt.gcf()
-            
-            # Customize colors: invert the default SHAP colors
-            # Default: red = positive, blue = negative
-            # We want: blue = positive (good credit), red = negative (bad credit)
-            
-            # Set this to False to disable color customization if it causes issues
-            ENABLE_COLOR_CUSTOMIZATION = True
-            
-            BLUE_NORMALIZED = [0., 0.54337757, 0.98337906]
-            RED_NORMALIZED = [1., 0., 0.31796406]
-
-            if ENABLE_COLOR_CUSTOMIZATION:
-                try:
-                    import numpy as np
-                    
-                    def swap_colors(color):
-                        """Helper function to swap red and blue colors"""
-                        try:
-                            if len(color) >= 3:
-                                r, g, b = color[0], color[1], color[2]
-                                alpha = color[3] if len(color) > 3 else 1.0
-                                
-                                # Check if this is a red-ish color (positive SHAP value)
-                                if r > g and r > b and r > 0.5:
-                                    # Convert red to blue
-                                    if len(color) > 3:
-                                        return BLUE_NORMALIZED + [alpha]
-                                    else:
-                                        return BLUE_NORMALIZED
-                                # Check if this is a blue-ish color (negative SHAP value)
-                                elif b > r and b > g and b > 0.5:
-                                    # Convert blue to red
-                                    if len(color) > 3:
-                                        return RED_NORMALIZED + [alpha]
-                                    else:
-                                        return RED_NORMALIZED
-                        except (IndexError, TypeError):
-                            pass
-                        return color
-                    
-                    for ax in fig.get_axes():
-                        # Handle collections (bars, lines, etc.)
-                        for collection in ax.collections:
-                            try:
-                                if hasattr(collection, 'get_facecolors'):
-                                    colors = collection.get_facecolors()
-                                    if len(colors) > 0:
-                                        new_colors = [swap_colors(color) for color in colors]
-                                        collection.set_facecolors(new_colors)
-                                
-                                if hasattr(collection, 'get_edgecolors'):
-                                    colors = collection.get_edgecolors()
-                                    if len(colors) > 0:
-                                        new_colors = [swap_colors(color) for color in colors]
-                                        collection.set_edgecolors(new_colors)
-                            except Exception as e:
-                                logger.warning(f"Error processing collection colors: {e}")
-                                continue
-                        
-                        # Handle patches (rectangles in waterfall plots)
-                        for patch in ax.patches:
-                            try:
-                                if hasattr(patch, 'get_facecolor'):
-                                    color = patch.get_facecolor()
-                                    new_color = swap_colors(color)
-                                    # Use numpy array comparison to avoid ambiguity
-                                    if not np.array_equal(new_color, color):
-                                        patch.set_facecolor(new_color)
-                                
-                                if hasattr(patch, 'get_edgecolor'):
-                                    color = patch.get_edgecolor()
-                                    new_color = swap_colors(color)
-                                    if not np.array_equal(new_color, color):
-                                        patch.set_edgecolor(new_color)
-                            except Exception as e:
-                                logger.warning(f"Error processing patch colors: {e}")
-                                continue
-                        
-                        # Handle text elements
-                        for text in ax.texts:
-                            try:
-                                if hasattr(text, 'get_color'):
-                                    color = text.get_color()
-                                    # Handle matplotlib color objects properly
-                                    if hasattr(color, '__len__') and len(color) >= 3:
-                                        new_color = swap_colors(color)
-                                        # Use numpy array comparison to avoid ambiguity
-                                        if not np.array_equal(new_color, color):
-                                            text.set_color(new_color)
-                                    elif isinstance(color, str):
-                                        # Handle named colors like 'red', 'blue', etc.
-                                        if color.lower() in ['red', 'darkred', 'crimson']:
-                                            text.set_color('blue')
-                                        elif color.lower() in ['blue', 'darkblue', 'navy']:
-                                            text.set_color('red')
-                            except Exception as e:
-                                logger.warning(f"Error processing text colors: {e}")
-                                continue
-                                
-                except Exception as e:
-                    logger.warning(f"Error in color customization: {e}. Proceeding with original colors.")
-            
-            img_bytes = io.BytesIO()
-            fig.savefig(img_bytes, format='png', bbox_inches='tight', dpi=100)
-            img_bytes.seek(0)
-            img_b64 = base64.b64encode(img_bytes.read()).decode('utf-8')
-            plt.close(fig)
-            
-            logger.info(f"Waterfall plot generated successfully!")
+        # SHAP values are computed in the request thread, outside any lock
+        if explanation is None:
+            explanation = explain_sample(trained_model, sample, model_name, explainer, scaler)
+        
+        # Drawing happens on an explicit Figure in a renderer process
+        img_b64 = render_waterfall_plot(explanation)
+        
+        logger.info(f"Waterfall plot generated successfully!")
 
-            return img_b64
+        return img_b64
             
     except Exception as e:
         logger.error(f"Error generating waterfall plot for {model_name}: {e}")
         # Return a placeholder image or raise the error
-        raise RuntimeError(f"Failed to generate waterfall plot: {str(e)}")
\ No newline at end of file
+        raise RuntimeError(f"Failed to generate waterfall plot: {str(e)}")
@@ -0,0 +1,78 @@
+"""Precomputed SHAP plots (summary plot, feature importance) held as raw image bytes.
+
+The plots used to travel as base64 strings inside the model metadata JSON and
+the /shap/plots response. They are decoded once at load time and served as
+binary responses with a strong ETag, so browsers revalidate instead of
+downloading them again.
+"""
+import base64
+import hashlib
+import os
+
+SHAP_PLOT_NAMES = ('summary_plot', 'shap_importance')
+
+# Directory (relative to the backend) with the split-out plot files: <model_name>_<plot_name>.png
+PLOTS_DIR = 'metadata/plots'
+
+_MAGIC_MIMETYPES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'RIFF', 'image/webp'),
+)
+_EXTENSIONS = {'image/png': 'png', 'image/jpeg': 'jpg', 'image/webp': 'webp'}
+
+
+class StaticPlot:
+    """Immutable image bytes with their content type, ETag and (on demand) base64 form"""
+    __slots__ = ('data', 'mimetype', 'etag', '_b64')
+
+    def __init__(self, data):
+        self.data = bytes(data)
+        self.mimetype = sniff_mimetype(self.data)
+        self.etag = hashlib.sha256(self.data).hexdigest()[:32]
+        self._b64 = None
+
+    @property
+    def extension(self):
+        return _EXTENSIONS[self.mimetype]
+
+    def b64(self):
+        """Base64 string for the legacy JSON endpoint (encoded once)"""
+        if self._b64 is None:
+            self._b64 = base64.b64encode(self.data).decode('ascii')
+        return self._b64
+
+
+def sniff_mimetype(data):
+    """Content type from the image magic bytes (PNG when unknown)"""
+    for magic, mimetype in _MAGIC_MIMETYPES:
+        if data.startswith(magic):
+            return mimetype
+    return 'image/png'
+
+
+def plot_file_path(plots_dir, model_name, plot_name, extension='png'):
+    return os.path.join(plots_dir, f"{model_name}_{plot_name}.{extension}")
+
+
+def load_plot_files(plots_dir, model_name):
+    """Plots of a model found in plots_dir, as {plot_name: StaticPlot}"""
+    plots = {}
+    for plot_name in SHAP_PLOT_NAMES:
+        for extension in _EXTENSIONS.values():
+            path = plot_file_path(plots_dir, model_name, plot_name, extension)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    plots[plot_name] = StaticPlot(f.read())
+                break
+    return plots
+
+
+def pop_base64_plots(shap_data):
+    """Remove the base64 plots from a model's SHAP dict and return them decoded as {plot_name: StaticPlot}"""
+    plots = {}
+    for plot_name in SHAP_PLOT_NAMES:
+        value = shap_data.pop(plot_name, None)
+        if value:
+            plots[plot_name] = StaticPlot(base64.b64decode(value))
+    return plots
@@ -0,0 +1,157 @@
+"""Start-up warm-up and readiness state.
+
+The first real request after a deploy used to pay for lazy native
+initialization: XGBoost thread pools, sklearn input validation, SHAP explainer
+setup, matplotlib font cache and the renderer processes. The warm-up pushes a
+synthetic applicant through the same path (preprocessing, every loaded model,
+every explainer, one waterfall per renderer process) before /readyz reports
+the worker as ready.
+"""
+import logging
+import threading
+import time
+import numpy as np
+from .helper import preprocessing, preprocessing_batch
+from .predictor import _positive_class_proba, predict_proba_with_models
+from .render_pool import RENDER_PROCESSES, get_render_pool
+from .shap import explain_sample
+from .waterfall import render_waterfall_png
+
+logger = logging.getLogger(__name__)
+
+# Synthetic applicant (same payload as the README example)
+SAMPLE_APPLICANT = {
+    "sex": "female",
+    "marrital_status": "divorced",
+    "age": 58,
+    "n_of_liables": 1,
+    "job": "unskilled resident",
+    "foreign_worker": 1,
+    "present_employee_since": ">=7y",
+    "telephone": 0,
+    "housing": "for free",
+    "present_residence_since": 4,
+    "property": "unk. / no property",
+    "checking_account": "< 0 DM",
+    "savings": "<100 DM",
+    "purpose": "used car",
+    "credit_history": 5,
+    "duration": 48,
+    "credit_amount": 6416,
+    "guarantors": None,
+    "other_installment_plans": "bank",
+    "credits_at_bank": 2
+}
+
+
+class WarmupState:
+    """Progress of the warm-up, reported by /readyz"""
+    def __init__(self):
+        self.status = "pending"  # pending -> running -> ready
+        self.started_at = None
+        self.finished_at = None
+        self.timings_ms = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.status == "ready"
+
+    def _step(self, name, fn):
+        """Run one warm-up step, recording its time; failures are recorded, not raised"""
+        start = time.perf_counter()
+        try:
+            return fn()
+        except Exception as e:
+            logger.warning(f"⚠️ Warm-up step {name} failed: {e}")
+            with self._lock:
+                self.errors[name] = str(e)
+            return None
+        finally:
+            with self._lock:
+                self.timings_ms[name] = round((time.perf_counter() - start) * 1000, 2)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "status": self.status,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "timings_ms": dict(self.timings_ms),
+                "errors": dict(self.errors),
+            }
+
+
+def smoke_test(model_name, entry):
+    """Predict the synthetic applicant with a freshly loaded (not yet served) entry; raises if unusable"""
+    sample = preprocessing(SAMPLE_APPLICANT)
+    if model_name == 'logistic-regression':
+        if entry.scaler is None:
+            raise ValueError("Scaler is required for logistic regression model")
+        sample = entry.scaler.transform(sample)
+    proba = np.asarray(_positive_class_proba(entry.model, sample), dtype=float)
+    if proba.shape != (1,) or not np.isfinite(proba).all() or not 0 <= proba[0] <= 1:
+        raise ValueError(f"Smoke prediction returned {proba!r}")
+    return float(proba[0])
+
+
+def warm_up(model_loader, state, render=True):
+    """Run the synthetic requests; always ends with state.status == 'ready'"""
+    state.status = "running"
+    state.started_at = time.time()
+    logger.info("🔥 Warming up models and explainers...")
+
+    sample = state._step("preprocessing", lambda: preprocessing(SAMPLE_APPLICANT))
+    state._step("preprocessing_batch", lambda: preprocessing_batch([SAMPLE_APPLICANT] * 8))
+
+    # Only the models already loaded are warmed: under the lazy/LRU strategies predicting with
+    # every model would load them all (and churn the LRU budget) before the first request
+    model_names = model_loader.get_loaded_models()
+    if sample is not None and model_names:
+        state._step("predict", lambda: predict_proba_with_models(model_loader, sample, parallel=False, models=model_names))
+        state._step("predict_parallel", lambda: predict_proba_with_models(model_loader, sample, parallel=True, models=model_names))
+
+        explanation = None
+        for name in model_names:
+            if name not in model_loader.get_loaded_models():
+                continue  # Evicted by the LRU budget meanwhile: do not load it back
+            explanation = state._step(f"explainer:{name}", lambda name=name: _explain(model_loader, name, sample[0])) or explanation
+
+        if render and explanation is not None:
+            state._step("waterfall", lambda: _warm_renderers(explanation))
+
+    state.finished_at = time.time()
+    state.status = "ready"
+    logger.info(f"✅ Warm-up finished in {(state.finished_at - state.started_at) * 1000:.0f}ms")
+    return state
+
+
+def _explain(model_loader, name, sample):
+    entry = model_loader.get_entry(name, with_explainer=True)
+    return explain_sample(entry.model, sample, name, entry.explainer, entry.scaler)
+
+
+def _warm_renderers(explanation):
+    """One waterfall per renderer process (font cache, Agg canvas), or inline without a pool"""
+    args = (
+        np.asarray(explanation.values, dtype=float),
+        float(np.asarray(explanation.base_values).reshape(-1)[0]),
+        np.asarray(explanation.data, dtype=float),
+        list(explanation.feature_names),
+    )
+    pool = get_render_pool()
+    if pool is None:
+        render_waterfall_png(*args)
+        return
+    for future in [pool.submit(render_waterfall_png, *args) for _ in range(RENDER_PROCESSES)]:
+        future.result()
+
+
+def start_warmup(model_loader, state, background=True, render=True):
+    """Warm up in a daemon thread (the worker answers /healthz meanwhile) or inline"""
+    if not background:
+        return warm_up(model_loader, state, render)
+    thread = threading.Thread(target=warm_up, args=(model_loader, state, render), name="warmup", daemon=True)
+    thread.start()
+    return state
@@ -0,0 +1,197 @@
+"""Object-oriented SHAP waterfall renderer.
+
+Draws the same chart as `shap.plots.waterfall` on an explicit matplotlib
+`Figure` (Agg canvas, no pyplot global state), so several plots can be
+rendered concurrently. The inputs are plain arrays, which keeps the render
+call picklable for the renderer process pool (see `utils/render_pool.py`).
+"""
+import io
+import re
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.transforms import ScaledTranslation
+
+# Default SHAP palette: red = pushes the prediction up, blue = pushes it down
+SHAP_PALETTE = {
+    "positive": (1.0, 0.0, 0.31796406),
+    "negative": (0.0, 0.54337757, 0.98337906),
+}
+# Palette used by the API: blue = positive (good credit), red = negative (bad credit)
+CREDIT_PALETTE = {
+    "positive": SHAP_PALETTE["negative"],
+    "negative": SHAP_PALETTE["positive"],
+}
+HLINES_COLOR = "#cccccc"
+VLINES_COLOR = "#bbbbbb"
+TEXT_COLOR = "white"
+TICK_LABELS_COLOR = "#999999"
+
+
+def format_value(value, format_str):
+    """Strips trailing zeros and uses a unicode minus sign (same as shap)"""
+    s = format_str % value
+    s = re.sub(r"\.?0+$", "", s)
+    if len(s) > 0 and s[0] == "-":
+        s = "\u2212" + s[1:]
+    return s
+
+
+def draw_waterfall(values, base_value, data, feature_names, max_display=10, palette=None):
+    """Draw a SHAP waterfall chart on a new Figure and return it"""
+    palette = palette or SHAP_PALETTE
+    values = np.asarray(values, dtype=float)
+    data = np.asarray(data, dtype=float)
+    base_value = float(base_value)
+
+    num_features = min(max_display, len(values))
+    row_height = 0.5
+    rng = range(num_features - 1, -1, -1)
+    order = np.argsort(-np.abs(values))
+
+    fig = Figure(figsize=(8, num_features * row_height + 1.5))
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    pos_lefts, pos_inds, pos_widths = [], [], []
+    neg_lefts, neg_inds, neg_widths = [], [], []
+    loc = base_value + values.sum()
+    yticklabels = ["" for _ in range(num_features + 1)]
+
+    num_individual = num_features if num_features == len(values) else num_features - 1
+    for i in range(num_individual):
+        sval = values[order[i]]
+        loc -= sval
+        if sval >= 0:
+            pos_inds.append(rng[i])
+            pos_widths.append(sval)
+            pos_lefts.append(loc)
+        else:
+            neg_inds.append(rng[i])
+            neg_widths.append(sval)
+            neg_lefts.append(loc)
+        if num_individual != num_features or i + 4 < num_individual:
+            ax.plot([loc, loc], [rng[i] - 1 - 0.4, rng[i] + 0.4],
+                    color=VLINES_COLOR, linestyle="--", linewidth=0.5, zorder=-1)
+        yticklabels[rng[i]] = format_value(float(data[order[i]]), "%0.03f") + " = " + str(feature_names[order[i]])
+
+    # The remaining features are collapsed into a single row
+    if num_features < len(values):
+        yticklabels[0] = f"{len(values) - num_features + 1} other features"
+        remaining_impact = base_value - loc
+        if remaining_impact < 0:
+            pos_inds.append(0)
+            pos_widths.append(-remaining_impact)
+            pos_lefts.append(loc + remaining_impact)
+        else:
+            neg_inds.append(0)
+            neg_widths.append(-remaining_impact)
+            neg_lefts.append(loc + remaining_impact)
+
+    points = (
+        pos_lefts + list(np.array(pos_lefts) + np.array(pos_widths))
+        + neg_lefts + list(np.array(neg_lefts) + np.array(neg_widths))
+    )
+    dataw = np.max(points) - np.min(points)
+
+    # Invisible bars set the x limits with room for the labels
+    label_padding = np.array([0.1 * dataw if w < 1 else 0 for w in pos_widths])
+    ax.barh(pos_inds, np.array(pos_widths) + label_padding + 0.02 * dataw,
+            left=np.array(pos_lefts) - 0.01 * dataw, color=palette["positive"], alpha=0)
+    label_padding = np.array([-0.1 * dataw if -w < 1 else 0 for w in neg_widths])
+    ax.barh(neg_inds, np.array(neg_widths) + label_padding - 0.02 * dataw,
+            left=np.array(neg_lefts) + 0.01 * dataw, color=palette["negative"], alpha=0)
+
+    head_length = 0.08
+    bar_width = 0.8
+    xlen = ax.get_xlim()[1] - ax.get_xlim()[0]
+    bbox = ax.get_window_extent().transformed(fig.dpi_scale_trans.inverted())
+    bbox_to_xscale = xlen / bbox.width
+    hl_scaled = bbox_to_xscale * head_length
+    renderer = canvas.get_renderer()
+
+    for inds, lefts, widths, color, sign in (
+        (pos_inds, pos_lefts, pos_widths, palette["positive"], 1),
+        (neg_inds, neg_lefts, neg_widths, palette["negative"], -1),
+    ):
+        for i in range(len(inds)):
+            dist = widths[i]
+            arrow_obj = ax.arrow(
+                lefts[i], inds[i], dist - sign * hl_scaled, 0,
+                head_length=min(sign * dist, hl_scaled),
+                color=color, width=bar_width, head_width=bar_width,
+            )
+            txt_obj = ax.text(
+                lefts[i] + 0.5 * dist, inds[i], format_value(dist, "%+0.02f"),
+                horizontalalignment="center", verticalalignment="center",
+                color=TEXT_COLOR, fontsize=12,
+            )
+            # Labels that do not fit inside the arrow go next to it, in the arrow color
+            text_bbox = txt_obj.get_window_extent(renderer=renderer)
+            arrow_bbox = arrow_obj.get_window_extent(renderer=renderer)
+            if text_bbox.width > arrow_bbox.width:
+                txt_obj.remove()
+                ax.text(
+                    lefts[i] + sign * (5 / 72) * bbox_to_xscale + dist, inds[i], format_value(dist, "%+0.02f"),
+                    horizontalalignment="left" if sign > 0 else "right", verticalalignment="center",
+                    color=color, fontsize=12,
+                )
+
+    ytick_pos = list(range(num_features)) + list(np.arange(num_features) + 1e-8)
+    ax.set_yticks(ytick_pos, yticklabels[:-1] + [label.split("=")[-1] for label in yticklabels[:-1]], fontsize=13)
+
+    for i in range(num_features):
+        ax.axhline(i, color=HLINES_COLOR, lw=0.5, dashes=(1, 5), zorder=-1)
+
+    fx = base_value + values.sum()
+    ax.axvline(base_value, 0, 1 / num_features, color=VLINES_COLOR, linestyle="--", linewidth=0.5, zorder=-1)
+    ax.axvline(fx, 0, 1, color=VLINES_COLOR, linestyle="--", linewidth=0.5, zorder=-1)
+
+    ax.xaxis.set_ticks_position("bottom")
+    ax.yaxis.set_ticks_position("none")
+    for spine in ("right", "top", "left"):
+        ax.spines[spine].set_visible(False)
+    ax.tick_params(labelsize=13)
+
+    # E[f(X)] and f(x) annotations on twin axes
+    xmin, xmax = ax.get_xlim()
+    ax2 = ax.twiny()
+    ax2.set_xlim(xmin, xmax)
+    ax2.set_xticks([base_value, base_value + min(1e-8, xmax * 1e-10)])
+    ax2.set_xticklabels(["\n$E[f(X)]$", "\n$ = " + format_value(base_value, "%0.03f") + "$"], fontsize=12, ha="left")
+    ax3 = ax2.twiny()
+    ax3.set_xlim(xmin, xmax)
+    ax3.set_xticks([fx, fx + min(1e-8, xmax * 1e-10)])
+    ax3.set_xticklabels(["$f(x)$", "$ = " + format_value(fx, "%0.03f") + "$"], fontsize=12, ha="left")
+    for twin in (ax2, ax3):
+        for spine in ("right", "top", "left"):
+            twin.spines[spine].set_visible(False)
+
+    for twin, (dx_label, dx_value, dy_value) in ((ax3, (-10, 12, 0)), (ax2, (-20, 22, -1))):
+        tick_labels = twin.xaxis.get_majorticklabels()
+        tick_labels[0].set_transform(
+            tick_labels[0].get_transform() + ScaledTranslation(dx_label / 72.0, 0, fig.dpi_scale_trans)
+        )
+        tick_labels[1].set_transform(
+            tick_labels[1].get_transform() + ScaledTranslation(dx_value / 72.0, dy_value / 72.0, fig.dpi_scale_trans)
+        )
+        tick_labels[1].set_color(TICK_LABELS_COLOR)
+
+    tick_labels = ax.yaxis.get_majorticklabels()
+    for i in range(num_features):
+        tick_labels[i].set_color(TICK_LABELS_COLOR)
+
+    return fig
+
+
+def figure_to_png(fig, dpi=100):
+    """Serialize a Figure to PNG bytes"""
+    img_bytes = io.BytesIO()
+    fig.savefig(img_bytes, format='png', bbox_inches='tight', dpi=dpi)
+    return img_bytes.getvalue()
+
+
+def render_waterfall_png(values, base_value, data, feature_names, max_display=10, dpi=100, palette=CREDIT_PALETTE):
+    """Draw a waterfall with the credit color scheme and return PNG bytes (runs in renderer processes)"""
+    fig = draw_waterfall(values, base_value, data, feature_names, max_display=max_display, palette=palette)
+    return figure_to_png(fig, dpi=dpi)
@@ -0,0 +1,62 @@
+"""Exact TreeSHAP for the XGBoost model through the booster's native pred_contribs.
+
+`booster.predict(dmatrix, pred_contribs=True)` returns the per-feature
+contributions plus a bias column, all in margin (log-odds) space, and their
+row sum is the model margin itself. One pass gives both the explanation and
+the prediction, so no TreeExplainer and no second predict_proba are needed.
+"""
+import numpy as np
+import xgboost as xgb
+from .linear_shap import OUTPUT_SPACES, _sigmoid
+
+
+class XGBoostExplainer:
+    """Native TreeSHAP explainer for an XGBClassifier (binary, class 1 = good payer)"""
+    def __init__(self, trained_model, output='probability'):
+        if output not in OUTPUT_SPACES:
+            raise ValueError(f"Unknown output space: {output}. Use one of {', '.join(OUTPUT_SPACES)}")
+        self.output = output
+        self.booster = trained_model.get_booster()
+        self.feature_names = self.booster.feature_names
+        self.feature_types = self.booster.feature_types
+        # Trees beyond the early-stopping point are ignored, like predict_proba does
+        try:
+            best_iteration = trained_model.best_iteration
+        except AttributeError:  # no early stopping: every tree
+            best_iteration = None
+        self.iteration_range = (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+
+    def contributions(self, X):
+        """
+        Margin-space contributions for every row of X.
+        Returns (contributions (n_rows, n_features), bias (n_rows,), margin (n_rows,)).
+        """
+        dmatrix = xgb.DMatrix(
+            np.atleast_2d(np.asarray(X, dtype=np.float32)),
+            feature_names=self.feature_names,
+            feature_types=self.feature_types
+        )
+        contribs = self.booster.predict(dmatrix, pred_contribs=True, iteration_range=self.iteration_range)
+        contributions = contribs[:, :-1].astype(np.float64)
+        bias = contribs[:, -1].astype(np.float64)
+        return contributions, bias, bias + contributions.sum(axis=1)
+
+    def shap_values(self, X, output=None):
+        """
+        SHAP values and base values for every row of X.
+        In probability space base_values + values.sum(axis=1) is exactly predict_proba(X)[:, 1].
+        """
+        output = output or self.output
+        contributions, bias, margin = self.contributions(X)
+        if output == 'log_odds':
+            return contributions, bias
+
+        # Base value sigmoid(bias); the probability change is distributed proportionally
+        # to the exact log-odds contributions, row by row
+        base_values = _sigmoid(bias)
+        target = _sigmoid(margin) - base_values
+        total = contributions.sum(axis=1)
+        safe_total = np.where(np.abs(total) > 1e-12, total, 1.0)
+        scale = np.where(np.abs(total) > 1e-12, target / safe_total, 0.0)
+        return contributions * scale[:, None], base_values
+
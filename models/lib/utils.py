@@ -47,9 +47,13 @@ def get_metrics_dict(confusion_matrix, classification_report):
     }
 
 def save_to_pickle(model, metrics, shap, path, scaler=None):
+    # The masker stays a numpy array: as a list of floats it is slow to unpickle in the backend
+    masker = shap.get("masker")
+    shap = make_serializable({k: v for k, v in shap.items() if k != "masker"})
+    shap["masker"] = np.asarray(masker) if masker is not None else None
     joblib.dump({
         "model": model,
         "metrics": make_serializable(metrics),
-        "shap": make_serializable(shap),
+        "shap": shap,
         "scaler": scaler
     }, path)